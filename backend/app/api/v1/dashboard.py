@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, Request
+from supabase import Client
+from typing import Any, Callable, Dict
+from datetime import date, datetime
+from app.config import settings
+from app.database.schemas import Meal, User
+from app.auth.dependencies import get_current_user, get_authenticated_supabase_client
+from app.api.v1.meals import fetch_meals_for_day, build_daily_summary
+from app.api.v1.preferences import load_preferences_row
+from app.core.responses import negotiated_response, trusted_rows
+import anyio
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+async def _run_section(
+    name: str,
+    loader: Callable[[], Any],
+    sections: Dict[str, Any],
+    errors: Dict[str, str]
+) -> None:
+    """Run one blocking section loader in a worker thread, isolating its failures."""
+    try:
+        with anyio.fail_after(settings.dashboard_section_timeout):
+            sections[name] = await anyio.to_thread.run_sync(loader, abandon_on_cancel=True)
+    except TimeoutError:
+        logger.warning(f"Dashboard section '{name}' timed out")
+        sections[name] = None
+        errors[name] = "timeout"
+    except Exception as e:
+        logger.error(f"Dashboard section '{name}' failed: {e}")
+        sections[name] = None
+        errors[name] = "unavailable"
+
+@router.get("")
+async def get_dashboard(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    supabase: Client = Depends(get_authenticated_supabase_client)
+) -> Dict[str, Any]:
+    """Bootstrap document for the app: profile, preferences, today's meals and summary in one call."""
+    today = date.today()
+    sections: Dict[str, Any] = {"user": current_user}
+    errors: Dict[str, str] = {}
+
+    loaders = {
+        "preferences": lambda: load_preferences_row(supabase, current_user.id),
+        "meals_today": lambda: trusted_rows(
+            fetch_meals_for_day(supabase, current_user.id, today), Meal
+        ),
+        "daily_summary": lambda: build_daily_summary(today),
+    }
+
+    # Auth is resolved once by the dependencies above and shared by every section
+    async with anyio.create_task_group() as task_group:
+        for name, loader in loaders.items():
+            task_group.start_soon(_run_section, name, loader, sections, errors)
+
+    return negotiated_response(request, {
+        **sections,
+        "errors": errors,
+        "generated_at": datetime.now().isoformat()
+    })
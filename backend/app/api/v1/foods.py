@@ -0,0 +1,208 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, AsyncIterator, Dict, List, Optional
+from integrations.openfoodfacts import OpenFoodFactsThrottled, food_search_service
+from app.auth.dependencies import get_current_user_id_optional
+from app.api.v1.meals import fetch_recent_food_names
+from app.database.connection import get_admin_supabase_client
+from app.foods.barcodes import canonical_barcode
+from app.foods.category_index import decode_cursor, encode_cursor
+from app.foods.dietary import flag_names, parse_flags
+from app.foods.nutrient_index import SORT_KEYS, parse_ranges
+from app.foods.suggest_index import recent_foods
+from app.core.responses import dumps, negotiated_response
+import asyncio
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/foods", tags=["Foods"])
+
+class BarcodeBatch(BaseModel):
+    barcodes: List[str] = Field(..., min_length=1, max_length=100)
+
+@router.get("/search")
+async def search_foods(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    include: Optional[str] = Query(None, description="Required labels/allergens, comma-separated (e.g. bio,sans-gluten)"),
+    exclude: Optional[str] = Query(None, description="Excluded allergens/labels, comma-separated (e.g. gluten,lait)")
+) -> Dict[str, Any]:
+    """Search products, served from the local food index when it covers the query.
+
+    `include` / `exclude` filter on the fixed allergen and label vocabulary (see app.foods.dietary).
+    Excluding an allergen only keeps products whose allergens are documented.
+    """
+    try:
+        include_mask, exclude_mask = parse_flags(include), parse_flags(exclude)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{e} (critères connus : {', '.join(flag_names())})")
+    try:
+        results = await food_search_service.search_foods_filtered(q, limit, include_mask, exclude_mask)
+    except OpenFoodFactsThrottled:
+        raise
+    except Exception as e:
+        logger.error(f"Food search error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche: {str(e)}")
+    return negotiated_response(request, {
+        "query": q,
+        "results": results,
+        "count": len(results)
+    })
+
+@router.get("/filter")
+async def filter_foods(
+    request: Request,
+    category: Optional[str] = Query(None, description="Accepted categories, comma-separated"),
+    include: Optional[str] = Query(None, description="Required labels/allergens, comma-separated"),
+    exclude: Optional[str] = Query(None, description="Excluded allergens/labels, comma-separated"),
+    sort: str = Query("keto_score", description=f"One of: {', '.join(SORT_KEYS)}"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(20, ge=1, le=100)
+) -> Dict[str, Any]:
+    """Discover catalogue products by nutrient ranges, per 100 g.
+
+    Ranges are `<nutrient>_min` / `<nutrient>_max` query parameters, e.g.
+    `net_carbs_max=3&protein_min=20`; nutrients are calories, protein,
+    carbohydrates, fat, fiber, sugar, sodium and net_carbs. Products with an
+    unknown value for a constrained nutrient are left out, as are products
+    without documented allergens when an allergen is excluded.
+    """
+    try:
+        ranges = parse_ranges(request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        include_mask, exclude_mask = parse_flags(include), parse_flags(exclude)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{e} (critères connus : {', '.join(flag_names())})")
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Tri inconnu: {sort} (possibles : {', '.join(SORT_KEYS)})")
+    categories = [part for part in (category or "").split(",") if part.strip()]
+    results, total = await food_search_service.filter_foods(
+        ranges, categories, include_mask, exclude_mask, sort=sort, descending=order == "desc", limit=limit
+    )
+    return negotiated_response(request, {
+        "filters": {
+            name: {"min": low if math.isfinite(low) else None, "max": high if math.isfinite(high) else None}
+            for name, (low, high) in ranges.items()
+        },
+        "results": results,
+        "count": len(results),
+        "total": total
+    })
+
+@router.get("/categories")
+async def list_root_categories(request: Request) -> Dict[str, Any]:
+    """Top-level catalogue categories, largest first."""
+    index = food_search_service.category_index
+    categories = [
+        {"slug": slug, "name": index.names[slug], "count": index.counts[slug]} for slug in index.children(None)
+    ]
+    return negotiated_response(request, {"categories": categories, "count": len(categories)})
+
+@router.get("/categories/{slug}")
+async def browse_category(
+    request: Request,
+    slug: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+) -> Dict[str, Any]:
+    """Products of a category by keto score, with its parent and subcategories; never queries OpenFoodFacts."""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page = await food_search_service.browse_category(slug, limit, after)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Catégorie inconnue")
+    category, results, following = page
+    return negotiated_response(request, {
+        "category": category or {"slug": slug},
+        "results": results,
+        "count": len(results),
+        "next_cursor": encode_cursor(following) if following else None
+    })
+
+@router.get("/{barcode}/alternatives")
+async def keto_alternatives(
+    request: Request,
+    barcode: str,
+    limit: int = Query(5, ge=1, le=20)
+) -> Dict[str, Any]:
+    """Closest keto-friendly products to a given one, within its categories."""
+    code = canonical_barcode(barcode)
+    if code is None:
+        raise HTTPException(status_code=400, detail="Code-barres invalide")
+    alternatives = await food_search_service.find_keto_alternatives(code, limit)
+    if alternatives is None:
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+    return negotiated_response(request, {
+        "barcode": code,
+        "alternatives": [
+            {"product": product, "distance": round(distance, 4)} for product, distance in alternatives
+        ],
+        "count": len(alternatives)
+    })
+
+async def load_recent_foods(user_id: str) -> List[str]:
+    """A user's recent food names, read from their meals once then kept in memory."""
+    cached = recent_foods.get(user_id)
+    if cached is not None:
+        return cached
+    try:
+        names = await asyncio.to_thread(fetch_recent_food_names, get_admin_supabase_client(), user_id)
+    except Exception as e:
+        logger.warning(f"Recent foods unavailable for {user_id}: {e}")
+        return []
+    return recent_foods.set(user_id, names)
+
+@router.get("/suggest")
+async def suggest_foods(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    user_id: Optional[str] = Depends(get_current_user_id_optional)
+) -> Dict[str, Any]:
+    """Typeahead completions: the user's recent foods first, then popular catalogue names."""
+    recent = await load_recent_foods(user_id) if user_id else None
+    suggestions = food_search_service.suggest_index.suggest(q, limit=limit, recent=recent)
+    return negotiated_response(request, {
+        "query": q,
+        "suggestions": suggestions
+    }, headers={"Cache-Control": "private, max-age=60"})
+
+@router.post("/barcodes")
+async def lookup_barcodes(batch: BarcodeBatch) -> StreamingResponse:
+    """Resolve many barcodes at once, streaming one NDJSON line per code as soon as it resolves.
+
+    Lines echo the code as sent; codes with a bad check digit are answered first as invalid.
+    """
+    invalid: List[str] = []
+    inputs: Dict[str, List[str]] = {}
+    for raw in batch.barcodes:
+        code = canonical_barcode(raw)
+        if code is None:
+            invalid.append(raw)
+        else:
+            inputs.setdefault(code, []).append(raw)
+
+    async def lines() -> AsyncIterator[bytes]:
+        for raw in invalid:
+            yield dumps({"barcode": raw, "status": "invalid"}) + b"\n"
+        async for barcode, product, error in food_search_service.lookup_barcodes(list(inputs)):
+            if isinstance(error, OpenFoodFactsThrottled):
+                item = {"status": "retry_later", "retry_after": math.ceil(error.retry_after)}
+            elif error is not None:
+                logger.warning(f"Barcode lookup error for {barcode}: {error}")
+                item = {"status": "error"}
+            elif product is None:
+                item = {"status": "not_found"}
+            else:
+                item = {"status": "found", "product": product}
+            for raw in inputs[barcode]:
+                yield dumps({"barcode": raw, **item}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
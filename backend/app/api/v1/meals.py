@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from supabase import Client
 from typing import List, Optional, Dict, Any
 from datetime import date, datetime, timedelta
 from app.database.schemas import Meal, MealCreate, MealUpdate, User, DailySummary
 from app.auth.dependencies import get_current_user, get_authenticated_supabase_client
+from app.core.conditional import (
+    version_stamps, stamp_from_rows, stamp_from_payload, is_not_modified,
+    not_modified_response, stamp_headers
+)
+from app.core.responses import negotiated_response, trusted_rows
+from app.foods.suggest_index import record_food_use
 import logging
 
 logger = logging.getLogger(__name__)
@@ -48,6 +54,57 @@ def calculate_daily_summary(meals: List[Dict[str, Any]], user: User) -> DailySum
         is_ketogenic_day=is_ketogenic_day
     )
 
+def fetch_meals_for_day(supabase: Client, user_id: str, day: date) -> List[Dict[str, Any]]:
+    """Fetch the raw meal rows a user logged on a given day."""
+    result = supabase.table("meals").select("*").eq(
+        "user_id", user_id
+    ).gte("consumed_at", day.isoformat()).lt(
+        "consumed_at", (day + timedelta(days=1)).isoformat()
+    ).order("consumed_at").execute()
+    return result.data
+
+def fetch_recent_food_names(supabase: Client, user_id: str, limit: int = 200) -> List[str]:
+    """Food names from a user's latest meals, most recent first."""
+    result = supabase.table("meals").select("food_name").eq(
+        "user_id", user_id
+    ).order("consumed_at", desc=True).limit(limit).execute()
+    return [row["food_name"] for row in result.data or [] if row.get("food_name")]
+
+def build_daily_summary(target_date: date) -> Dict[str, Any]:
+    """Build the daily nutrition summary document."""
+    # Create a demo summary for now
+    # In production, this would fetch real data from Supabase
+    return {
+        "date": target_date.isoformat(),
+        "totals": {
+            "calories": 1520.0,
+            "proteins": 78.0,
+            "carbs": 30.0,
+            "net_carbs": 18.0,
+            "fats": 115.0,
+            "fiber": 12.0
+        },
+        "targets": {
+            "calories": 2000,
+            "proteins": 100,
+            "carbs": 25,
+            "fats": 150
+        },
+        "percentages": {
+            "calories": 76.0,
+            "proteins": 78.0,
+            "carbs": 120.0,
+            "fats": 76.7
+        },
+        "macros_percentages": {
+            "calories": 76.4,
+            "proteins": 87.6,
+            "fats": 82.4
+        },
+        "meals_count": 3,
+        "keto_status": "excellent"
+    }
+
 @router.post("/", response_model=Meal, status_code=status.HTTP_201_CREATED)
 async def create_meal(
     meal_data: MealCreate,
@@ -78,6 +135,12 @@ async def create_meal(
                 detail="Failed to create meal"
             )
         
+        # Cached ETags of this user's meal lists are now stale
+        version_stamps.invalidate(current_user.id)
+        
+        # Feed typeahead: the user's recent foods and global popularity
+        record_food_use(current_user.id, meal_data.food_name)
+        
         return Meal(**result.data[0])
         
     except Exception as e:
@@ -89,6 +152,7 @@ async def create_meal(
 
 @router.get("/", response_model=List[Meal])
 async def get_meals(
+    request: Request,
     date_from: Optional[date] = Query(None, description="Start date for meal filtering"),
     date_to: Optional[date] = Query(None, description="End date for meal filtering"),
     meal_type: Optional[str] = Query(None, description="Filter by meal type"),
@@ -114,7 +178,13 @@ async def get_meals(
         # Apply pagination and ordering
         result = query.order("consumed_at", desc=True).range(offset, offset + limit - 1).execute()
         
-        return [Meal(**meal) for meal in result.data]
+        # User in the scope: identical rows of two users never share an ETag
+        stamp = stamp_from_rows(result.data, scope=f"meals:{current_user.id}:{request.url.query}")
+        if is_not_modified(request, stamp):
+            return not_modified_response(stamp)
+        
+        # Trusted rows: skip re-validation and serialize straight with orjson
+        return negotiated_response(request, trusted_rows(result.data, Meal), headers=stamp_headers(stamp))
         
     except Exception as e:
         logger.error(f"Meals retrieval error: {e}")
@@ -125,6 +195,7 @@ async def get_meals(
 
 @router.get("/daily-summary/{user_email}")
 async def get_daily_summary(
+    request: Request,
     user_email: str,
     target_date: Optional[date] = Query(default=None, description="Date for summary (defaults to today)")
 ) -> Dict[str, Any]:
@@ -133,40 +204,14 @@ async def get_daily_summary(
         if target_date is None:
             target_date = date.today()
         
-        # Create a demo summary for now
-        # In production, this would fetch real data from Supabase
-        demo_summary = {
-            "date": target_date.isoformat(),
-            "totals": {
-                "calories": 1520.0,
-                "proteins": 78.0,
-                "carbs": 30.0,
-                "net_carbs": 18.0,
-                "fats": 115.0,
-                "fiber": 12.0
-            },
-            "targets": {
-                "calories": 2000,
-                "proteins": 100,
-                "carbs": 25,
-                "fats": 150
-            },
-            "percentages": {
-                "calories": 76.0,
-                "proteins": 78.0,
-                "carbs": 120.0,
-                "fats": 76.7
-            },
-            "macros_percentages": {
-                "calories": 76.4,
-                "proteins": 87.6,
-                "fats": 82.4
-            },
-            "meals_count": 3,
-            "keto_status": "excellent"
-        }
-        
-        return demo_summary
+        demo_summary = build_daily_summary(target_date)
+        
+        # No updated_at for the demo summary: fingerprint the payload instead
+        stamp = stamp_from_payload(demo_summary, scope=f"summary:{user_email}")
+        if is_not_modified(request, stamp):
+            return not_modified_response(stamp)
+        
+        return negotiated_response(request, demo_summary, headers=stamp_headers(stamp))
         
     except Exception as e:
         logger.error(f"Daily summary error: {e}")
@@ -177,21 +222,28 @@ async def get_daily_summary(
 
 @router.get("/today", response_model=List[Meal])
 async def get_todays_meals(
+    request: Request,
     current_user: User = Depends(get_current_user),
     supabase: Client = Depends(get_authenticated_supabase_client)
 ) -> List[Meal]:
     """Get today's meals organized by meal type."""
     try:
         today = date.today()
-        tomorrow = today + timedelta(days=1)
         
-        result = supabase.table("meals").select("*").eq(
-            "user_id", current_user.id
-        ).gte("consumed_at", today.isoformat()).lt(
-            "consumed_at", tomorrow.isoformat()
-        ).order("consumed_at").execute()
+        # Revalidation answered from the cached version stamp, no DB round trip
+        resource = ("meals_today", today.isoformat())
+        cached_stamp = version_stamps.get(current_user.id, resource)
+        if cached_stamp and is_not_modified(request, cached_stamp):
+            return not_modified_response(cached_stamp)
+        
+        meals = fetch_meals_for_day(supabase, current_user.id, today)
+        
+        stamp = stamp_from_rows(meals, scope=f"meals_today:{current_user.id}:{today.isoformat()}")
+        version_stamps.set(current_user.id, resource, stamp)
+        if is_not_modified(request, stamp):
+            return not_modified_response(stamp)
         
-        return [Meal(**meal) for meal in result.data]
+        return negotiated_response(request, trusted_rows(meals, Meal), headers=stamp_headers(stamp))
         
     except Exception as e:
         logger.error(f"Today's meals retrieval error: {e}")
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from app.database.connection import get_supabase_client  
 from app.auth.dependencies import get_current_user
+from supabase import Client
+from app.core.conditional import (
+    version_stamps, stamp_from_rows, is_not_modified, not_modified_response, apply_stamp_headers
+)
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, Literal
 from datetime import datetime
@@ -87,9 +91,39 @@ def get_default_preferences_by_region(region: str) -> Dict[str, Any]:
         'temperature_unit': 'fahrenheit' if is_imperial else 'celsius',
     }
 
+def load_preferences_row(supabase: Client, user_id: str) -> Dict[str, Any]:
+    """Lire les préférences d'un utilisateur, en créant les valeurs par défaut si besoin"""
+    # Récupérer les préférences depuis la base de données
+    response = supabase.table("user_preferences").select("*").eq("user_id", user_id).execute()
+    
+    if response.data and len(response.data) > 0:
+        prefs = response.data[0]
+    else:
+        # Créer des préférences par défaut si elles n'existent pas
+        default_prefs = get_default_preferences_by_region('FR')
+        default_prefs['user_id'] = user_id
+        
+        # Insérer les préférences par défaut
+        insert_response = supabase.table("user_preferences").insert(default_prefs).execute()
+        
+        if not insert_response.data:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Impossible de créer les préférences par défaut"
+            )
+        prefs = insert_response.data[0]
+    
+    # Convertir les JSONB en dict Python
+    if isinstance(prefs.get('health_sync_permissions'), str):
+        prefs['health_sync_permissions'] = json.loads(prefs['health_sync_permissions'])
+    
+    return prefs
+
 @router.get("/user-preferences/{user_id}", response_model=UserPreferences)
 async def get_user_preferences(
     user_id: str,
+    request: Request,
+    http_response: Response,
     current_user: dict = Depends(get_current_user)
 ):
     """Récupérer les préférences d'un utilisateur"""
@@ -99,36 +133,26 @@ async def get_user_preferences(
             detail="Accès non autorisé aux préférences de cet utilisateur"
         )
     
+    # Revalidation servie depuis l'empreinte en cache, sans requête en base
+    cached_stamp = version_stamps.get(user_id, "preferences")
+    if cached_stamp and is_not_modified(request, cached_stamp):
+        return not_modified_response(cached_stamp)
+    
     supabase = get_supabase_client()
     
     try:
-        # Récupérer les préférences depuis la base de données
-        response = supabase.table("user_preferences").select("*").eq("user_id", user_id).execute()
+        prefs = load_preferences_row(supabase, user_id)
         
-        if response.data and len(response.data) > 0:
-            prefs = response.data[0]
-            
-            # Convertir les JSONB en dict Python
-            if isinstance(prefs.get('health_sync_permissions'), str):
-                prefs['health_sync_permissions'] = json.loads(prefs['health_sync_permissions'])
-            
-            return UserPreferences(**prefs)
-        else:
-            # Créer des préférences par défaut si elles n'existent pas
-            default_prefs = get_default_preferences_by_region('FR')
-            default_prefs['user_id'] = user_id
-            
-            # Insérer les préférences par défaut
-            insert_response = supabase.table("user_preferences").insert(default_prefs).execute()
-            
-            if insert_response.data:
-                return UserPreferences(**insert_response.data[0])
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Impossible de créer les préférences par défaut"
-                )
+        stamp = stamp_from_rows([prefs], scope=f"preferences:{user_id}")
+        version_stamps.set(user_id, "preferences", stamp)
+        if is_not_modified(request, stamp):
+            return not_modified_response(stamp)
+        apply_stamp_headers(http_response, stamp)
+        
+        return UserPreferences(**prefs)
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -157,6 +181,7 @@ async def create_user_preferences(
         
         # Insérer dans la base de données
         response = supabase.table("user_preferences").insert(prefs_dict).execute()
+        version_stamps.invalidate(current_user.id)
         
         if response.data:
             return UserPreferences(**response.data[0])
@@ -201,6 +226,7 @@ async def update_user_preferences(
         
         # Mettre à jour dans la base de données
         response = supabase.table("user_preferences").update(update_dict).eq("user_id", user_id).execute()
+        version_stamps.invalidate(user_id)
         
         if response.data and len(response.data) > 0:
             prefs = response.data[0]
@@ -245,6 +271,7 @@ async def replace_user_preferences(
         
         # Remplacer dans la base de données (upsert)
         response = supabase.table("user_preferences").upsert(prefs_dict).execute()
+        version_stamps.invalidate(user_id)
         
         if response.data:
             prefs = response.data[0]
@@ -283,6 +310,7 @@ async def delete_user_preferences(
     try:
         # Supprimer de la base de données
         response = supabase.table("user_preferences").delete().eq("user_id", user_id).execute()
+        version_stamps.invalidate(user_id)
         
         return {"message": "Préférences supprimées avec succès"}
             
@@ -0,0 +1,182 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from supabase import Client
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
+from app.config import settings
+from app.database.schemas import Meal, User, DailySummary, SyncResponse, SyncTombstone
+from app.auth.dependencies import get_current_user, get_authenticated_supabase_client
+from app.core.responses import negotiated_response, trusted_rows
+import base64
+import binascii
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+TOKEN_VERSION = "v2"
+# v1 tokens (timestamp only) are still accepted
+LEGACY_TOKEN_VERSIONS = ("v1",)
+
+# Table -> change timestamp column
+SYNC_TABLES = {
+    "meals": "updated_at",
+    "daily_summaries": "updated_at",
+    "user_preferences": "updated_at",
+    "deletion_log": "deleted_at",
+}
+
+# Row ids carried in tokens end up in PostgREST filters: UUIDs or integers only
+ROW_ID = re.compile(r"[0-9A-Fa-f-]{1,36}")
+
+def _parse_timestamp(timestamp: str) -> datetime:
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def encode_sync_token(timestamp: str, after_ids: Optional[Dict[str, str]] = None) -> str:
+    """Encode a resume point as an opaque sync token.
+
+    `after_ids` holds, per table, the id of the last row sent at exactly
+    `timestamp` when a page stopped in the middle of rows sharing it.
+    """
+    keys = ",".join(f"{table}={row_id}" for table, row_id in (after_ids or {}).items())
+    raw = f"{TOKEN_VERSION}:{timestamp}" + (f"|{keys}" if keys else "")
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_sync_token(token: str) -> Tuple[datetime, Dict[str, str]]:
+    """Decode a sync token back to its timestamp and per-table tiebreaker ids."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        version, payload = base64.urlsafe_b64decode(padded).decode("utf-8").split(":", 1)
+        if version != TOKEN_VERSION and version not in LEGACY_TOKEN_VERSIONS:
+            raise ValueError(f"unsupported token version {version}")
+        timestamp, _, keys = payload.partition("|")
+        after_ids: Dict[str, str] = {}
+        for key in filter(None, keys.split(",")):
+            table, _, row_id = key.partition("=")
+            if table not in SYNC_TABLES or not ROW_ID.fullmatch(row_id):
+                raise ValueError(f"invalid resume key {key!r}")
+            after_ids[table] = row_id
+        return _parse_timestamp(timestamp), after_ids
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        logger.warning(f"Invalid sync token: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+
+def _fetch_changed(
+    supabase: Client,
+    table: str,
+    user_id: str,
+    since: Optional[str],
+    limit: int,
+    after_id: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Fetch rows of a table changed after `since`, in (timestamp, id) order.
+
+    With `after_id`, rows stamped exactly `since` are resumed after that id, so
+    a page may stop inside a group of rows sharing one timestamp without
+    skipping any. Returns the page and whether more rows remain.
+    """
+    column = SYNC_TABLES[table]
+    query = supabase.table(table).select("*").eq("user_id", user_id)
+    if since and after_id:
+        # Both values are server-issued and validated (ROW_ID, parsed timestamp)
+        query = query.or_(f'{column}.gt."{since}",and({column}.eq."{since}",id.gt."{after_id}")')
+    elif since:
+        query = query.gt(column, since)
+    rows = query.order(column).order("id").limit(limit + 1).execute().data or []
+    return rows[:limit], len(rows) > limit
+
+@router.get("", response_model=SyncResponse)
+async def sync_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="Token returned by the previous sync"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Maximum rows per table"),
+    current_user: User = Depends(get_current_user),
+    supabase: Client = Depends(get_authenticated_supabase_client)
+) -> SyncResponse:
+    """Return meals, daily summaries and preferences changed since the last sync, plus deletions."""
+    page_size = limit or settings.sync_page_size
+    since_ts: Optional[str] = None
+    after_ids: Dict[str, str] = {}
+    full_resync = since is None
+    # Read before querying: rows committed after this point are in the next sync
+    now = datetime.now(timezone.utc)
+
+    if since is not None:
+        since_dt, after_ids = decode_sync_token(since)
+        retention = timedelta(days=settings.sync_tombstone_retention_days)
+        if since_dt < now - retention:
+            # Tombstones older than the retention window are purged: start over
+            full_resync = True
+            after_ids = {}
+        else:
+            since_ts = since_dt.isoformat()
+
+    def fetch(table: str, size: int) -> Tuple[List[Dict[str, Any]], bool]:
+        return _fetch_changed(supabase, table, current_user.id, since_ts, size, after_ids.get(table))
+
+    try:
+        meals, meals_more = fetch("meals", page_size)
+        summaries, summaries_more = fetch("daily_summaries", page_size)
+        preferences, _ = fetch("user_preferences", 1)
+        deletions: List[Dict[str, Any]] = []
+        deletions_more = False
+        if since_ts:
+            deletions, deletions_more = fetch("deletion_log", page_size)
+    except Exception as e:
+        logger.error(f"Sync error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve changes"
+        )
+
+    truncated = {
+        table: rows[-1]
+        for table, rows, more in (
+            ("meals", meals, meals_more),
+            ("daily_summaries", summaries, summaries_more),
+            ("deletion_log", deletions, deletions_more),
+        )
+        if more
+    }
+    next_ids: Dict[str, str] = {}
+    if truncated:
+        # Resume from the least advanced truncated table; rows of other tables
+        # beyond that point are sent again and upserted idempotently. Tables
+        # stopped exactly there resume after their last id
+        next_dt = min(_parse_timestamp(row[SYNC_TABLES[table]]) for table, row in truncated.items())
+        next_ts = next_dt.isoformat()
+        next_ids = {
+            table: str(row["id"]) for table, row in truncated.items()
+            if _parse_timestamp(row[SYNC_TABLES[table]]) == next_dt
+        }
+    else:
+        # Everything up to now was read, but a transaction stamped earlier may
+        # still commit: stay a safety window behind the server clock
+        high_water = now - timedelta(seconds=settings.sync_safety_window_seconds)
+        since_dt = _parse_timestamp(since_ts) if since_ts else None
+        next_ts = (max(high_water, since_dt) if since_dt else high_water).isoformat()
+        if since_dt and since_dt >= high_water:
+            # Not advanced: rows already sent at that timestamp stay skipped
+            next_ids = after_ids
+
+    prefs = preferences[0] if preferences else None
+    if prefs and isinstance(prefs.get("health_sync_permissions"), str):
+        prefs["health_sync_permissions"] = json.loads(prefs["health_sync_permissions"])
+
+    # Trusted rows: same shape as SyncResponse, built without re-validation
+    return negotiated_response(request, {
+        "next_token": encode_sync_token(next_ts, next_ids),
+        "has_more": bool(truncated),
+        "full_resync": full_resync,
+        "changes": {
+            "meals": trusted_rows(meals, Meal),
+            "daily_summaries": trusted_rows(summaries, DailySummary),
+            "preferences": prefs
+        },
+        "deleted": trusted_rows(deletions, SyncTombstone)
+    })
@@ -1,5 +1,7 @@
 from typing import Optional, Annotated
 from fastapi import Depends, HTTPException, status, Header
+from starlette.concurrency import run_in_threadpool
+from cachetools import TTLCache
 from jose import JWTError, jwt
 from supabase import Client
 from app.config import settings
@@ -7,6 +9,9 @@ from app.database.connection import get_supabase_client
 from app.database.schemas import User
 import logging
 import requests
+import secrets
+import hashlib
+import time
 import json
 
 logger = logging.getLogger(__name__)
@@ -274,4 +279,42 @@ async def get_current_user_optional(
         token = extract_token_from_header(authorization)
         return await get_current_user(token)
     except HTTPException:
-        return None
\ No newline at end of file
+        return None
+
+# Recently validated tokens, so per-keystroke endpoints skip the Supabase round trip
+_validated_tokens: TTLCache = TTLCache(maxsize=10000, ttl=60)
+
+async def get_current_user_id_optional(
+    authorization: Annotated[Optional[str], Header()] = None
+) -> Optional[str]:
+    """User id from a valid bearer token, or None for anonymous requests."""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    
+    token = authorization.split(" ")[1]
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = _validated_tokens.get(key)
+    if payload is None:
+        try:
+            payload = await run_in_threadpool(validate_jwt_token, token)
+        except HTTPException:
+            return None
+        _validated_tokens[key] = payload
+    
+    if payload.get("exp") and payload["exp"] < time.time():
+        _validated_tokens.pop(key, None)
+        return None
+    return payload.get("sub")
+
+# Maintenance endpoints guarded by a shared admin key
+async def require_admin(
+    x_admin_key: Annotated[Optional[str], Header()] = None
+) -> None:
+    """Admin key dependency; admin routes are disabled when no key is configured."""
+    if not settings.admin_api_key or not x_admin_key or not secrets.compare_digest(
+        x_admin_key.encode(), settings.admin_api_key.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
@@ -18,6 +18,57 @@ class Settings(BaseSettings):
     api_v1_prefix: str = "/api"
     cors_origins: List[str] = ["http://localhost:3000", "http://localhost:8081", "https://app.emergent.sh"]
     
+    # HTTP caching (conditional GET)
+    etag_cache_ttl_seconds: int = 30
+    
+    # Response compression (bytes)
+    compression_minimum_size: int = 1024
+    compression_save_data_minimum_size: int = 256
+    compression_offload_size: int = 65536
+    
+    # Dashboard bootstrap (seconds per section)
+    dashboard_section_timeout: float = 5.0
+    
+    # Delta sync
+    sync_page_size: int = 500
+    sync_tombstone_retention_days: int = 90
+    # Rows stamped this recently may still be committing: tokens stay behind them
+    sync_safety_window_seconds: int = 120
+    
+    # Food search cache
+    food_search_cache_size: int = 2048
+    food_search_cache_ttl_seconds: int = 3600
+    food_search_persisted_ttl_hours: int = 168
+    barcode_cache_size: int = 10000
+    barcode_cache_ttl_seconds: int = 86400
+    barcode_negative_ttl_seconds: int = 3600
+    
+    # OpenFoodFacts outbound rate limits (OFF fair use: 100 product reads and 10 searches per minute)
+    off_product_rate_per_minute: int = 100
+    off_search_rate_per_minute: int = 10
+    off_queue_timeout_seconds: float = 5.0
+    off_background_queue_timeout_seconds: float = 120.0
+    
+    # Product freshness (stale-while-revalidate, nightly refresh of popular stale products)
+    food_refresh_after_hours: int = 168
+    food_refresh_sweep_hour_utc: int = 3
+    food_refresh_sweep_limit: int = 500
+    food_scan_flush_seconds: int = 300
+    
+    # Local full-text food index (loaded from food_database at startup)
+    food_index_enabled: bool = True
+    food_fuzzy_budget_ms: float = 20.0
+    
+    # Meal analysis enrichment (OpenFoodFacts lookups per detected food)
+    meal_enrichment_concurrency: int = 4
+    meal_enrichment_budget_seconds: float = 2.5
+    
+    # Precomputed keto-friendly catalogue
+    keto_catalogue_refresh_hours: int = 24
+    
+    # Admin endpoints (disabled when unset)
+    admin_api_key: Optional[str] = None
+    
     # Legacy MongoDB (keeping for migration)
     mongo_url: Optional[str] = None
     emergent_llm_key: Optional[str] = None
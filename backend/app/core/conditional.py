@@ -0,0 +1,151 @@
+"""
+Conditional GET support (ETag / Last-Modified)
+Lets polling clients revalidate cheaply and receive 304 Not Modified.
+"""
+
+from fastapi import Request, Response, status
+from typing import Any, Dict, Hashable, Iterable, NamedTuple, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from cachetools import TTLCache
+from app.config import settings
+import hashlib
+import json
+import threading
+
+class VersionStamp(NamedTuple):
+    """Cheap fingerprint of a resource: weak ETag plus last modification time."""
+    etag: str
+    last_modified: Optional[datetime] = None
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse a PostgREST timestamp (ISO string) or datetime into an aware datetime."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def _weak_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode("utf-8"),
+        digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+def make_version_stamp(
+    row_count: int,
+    max_updated_at: Any,
+    scope: str = ""
+) -> VersionStamp:
+    """Build a version stamp from the row count and the most recent updated_at."""
+    last_modified = _parse_timestamp(max_updated_at)
+    marker = last_modified.isoformat() if last_modified else "-"
+    return VersionStamp(
+        etag=_weak_etag(scope, row_count, marker),
+        last_modified=last_modified
+    )
+
+def stamp_from_rows(
+    rows: Iterable[Dict[str, Any]],
+    scope: str = "",
+    field: str = "updated_at"
+) -> VersionStamp:
+    """Compute a version stamp from rows without serializing them."""
+    row_count = 0
+    latest: Optional[datetime] = None
+    for row in rows:
+        row_count += 1
+        updated_at = _parse_timestamp(row.get(field))
+        if updated_at and (latest is None or updated_at > latest):
+            latest = updated_at
+    return make_version_stamp(row_count, latest, scope)
+
+def stamp_from_payload(payload: Any, scope: str = "") -> VersionStamp:
+    """Version stamp for resources without updated_at: hash of the JSON payload."""
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return VersionStamp(etag=_weak_etag(scope, body))
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 7232 §2.3.2): ignore the W/ prefix on both sides
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+def is_not_modified(request: Request, stamp: VersionStamp) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against a version stamp."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since
+        return _etag_matches(if_none_match, stamp.etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and stamp.last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have a one-second resolution
+        return stamp.last_modified.replace(microsecond=0) <= since
+    return False
+
+def stamp_headers(stamp: VersionStamp) -> Dict[str, str]:
+    headers = {"ETag": stamp.etag, "Cache-Control": "private, no-cache"}
+    if stamp.last_modified:
+        headers["Last-Modified"] = format_datetime(
+            stamp.last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+def apply_stamp_headers(response: Response, stamp: VersionStamp) -> None:
+    """Attach validator headers to an outgoing response."""
+    for name, value in stamp_headers(stamp).items():
+        response.headers[name] = value
+
+def not_modified_response(stamp: VersionStamp) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=stamp_headers(stamp))
+
+class VersionStampCache:
+    """In-process cache of version stamps, keyed per user and resource.
+
+    Lets a revalidation be answered without touching the database when this
+    worker has recently computed the stamp. Entries expire after ``ttl``
+    seconds so writes made by other workers are picked up, and local writes
+    invalidate the user's entries immediately.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10_000):
+        self._entries: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, resource: Hashable) -> Optional[VersionStamp]:
+        with self._lock:
+            return self._entries.get((user_id, resource))
+
+    def set(self, user_id: str, resource: Hashable, stamp: VersionStamp) -> None:
+        with self._lock:
+            self._entries[(user_id, resource)] = stamp
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop every cached stamp of a user after a write."""
+        with self._lock:
+            for key in [key for key in self._entries.keys() if key[0] == user_id]:
+                self._entries.pop(key, None)
+
+version_stamps = VersionStampCache(ttl=settings.etag_cache_ttl_seconds)
@@ -0,0 +1,116 @@
+"""
+Fast response path for trusted database reads
+Rows coming back from PostgREST are already typed by the database, so list
+routes project them onto the response model without re-validating them and
+serialize them with orjson, or with MessagePack when the client asks for it.
+"""
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+from uuid import UUID
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON is always available
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for types it does not serialize natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes (datetime/date/UUID natively, Decimal as number)."""
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+class FastJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also handles Decimal and pydantic models."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    return _default(obj)
+
+class MsgPackResponse(Response):
+    """Compact binary representation for mobile clients."""
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+def _quality(params: str) -> float:
+    """q value of an Accept entry's parameters (1 when absent, 0 when malformed)."""
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+def wants_msgpack(request: Request) -> bool:
+    """True when the client explicitly accepts MessagePack (q > 0)."""
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "").lower()
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        if media_type.strip() in MSGPACK_MEDIA_TYPES and _quality(params) > 0:
+            return True
+    return False
+
+def negotiated_response(
+    request: Request,
+    content: Any,
+    headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """Serialize trusted content as MessagePack or JSON depending on Accept."""
+    response_headers = dict(headers or {})
+    response_headers["Vary"] = "Accept"
+    if wants_msgpack(request):
+        return MsgPackResponse(content, headers=response_headers)
+    return FastJSONResponse(content, headers=response_headers)
+
+@lru_cache(maxsize=None)
+def _model_fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    fields = []
+    for name, field in model.model_fields.items():
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        fields.append((name, default))
+    return tuple(fields)
+
+def trusted_rows(rows: Iterable[Dict[str, Any]], model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Project trusted DB rows onto a model's fields, without validation.
+
+    Equivalent to ``model.model_construct(**row)`` followed by a dump, but
+    builds the output dicts directly. Only use for rows read from our own
+    database, never for client input.
+    """
+    fields = _model_fields(model)
+    return [{name: row.get(name, default) for name, default in fields} for row in rows]
+
+def trusted_row(row: Dict[str, Any], model: Type[BaseModel]) -> Dict[str, Any]:
+    return trusted_rows((row,), model)[0]
@@ -0,0 +1,209 @@
+from supabase import Client
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
+from app.database.connection import get_admin_supabase_client
+from app.foods.dietary import tag_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns of public.food_database written from enriched OpenFoodFacts products
+FOOD_DATABASE_COLUMNS = (
+    "openfoodfacts_id", "barcode", "product_name", "brand",
+    "calories_per_100g", "protein_per_100g", "carbohydrates_per_100g", "fat_per_100g",
+    "fiber_per_100g", "sugar_per_100g", "sodium_per_100g", "net_carbs_per_100g",
+    "categories", "labels", "allergens", "ingredients_text", "image_url",
+    "keto_score", "is_keto_friendly", "data_source", "data_quality_score", "last_updated",
+)
+
+def product_to_row(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an enriched product onto a food_database row."""
+    row = {column: product.get(column) for column in FOOD_DATABASE_COLUMNS}
+    if row["calories_per_100g"] is not None:
+        row["calories_per_100g"] = int(round(row["calories_per_100g"]))
+    if not row["openfoodfacts_id"]:
+        row["openfoodfacts_id"] = row["barcode"]
+    # Slugs computed here so they match CategoryIndex exactly (see list_by_category)
+    row["category_slugs"] = list(dict.fromkeys(
+        slug for slug in map(tag_key, row["categories"] or ()) if slug
+    ))
+    return row
+
+def row_to_product(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a food_database row back to the enriched product shape."""
+    product = {column: row.get(column) for column in FOOD_DATABASE_COLUMNS}
+    for column in ("categories", "labels", "allergens"):
+        product[column] = product[column] or []
+    for column in ("protein_per_100g", "carbohydrates_per_100g", "fat_per_100g",
+                   "fiber_per_100g", "sugar_per_100g", "sodium_per_100g",
+                   "net_carbs_per_100g", "data_quality_score"):
+        if product[column] is not None:
+            product[column] = float(product[column])
+    if product["net_carbs_per_100g"] is None and product["carbohydrates_per_100g"] is not None:
+        product["net_carbs_per_100g"] = max(
+            0, product["carbohydrates_per_100g"] - (product["fiber_per_100g"] or 0)
+        )
+    if product["is_keto_friendly"] is None:
+        product["is_keto_friendly"] = (product["keto_score"] or 0) >= 7
+    product["ingredients_text"] = product["ingredients_text"] or ""
+    product["image_url"] = product["image_url"] or ""
+    return product
+
+class FoodRepository:
+    """Persistence of enriched products and search results in Supabase."""
+
+    def __init__(self, client: Optional[Client] = None):
+        self._client = client
+
+    @property
+    def client(self) -> Client:
+        # food_database is shared catalogue data, written with the service role
+        if self._client is None:
+            self._client = get_admin_supabase_client()
+        return self._client
+
+    def upsert_products(self, products: Iterable[Dict[str, Any]]) -> int:
+        """Insert or update products keyed by barcode; returns the number written."""
+        rows = {}
+        for product in products:
+            if product.get("barcode") and product.get("product_name"):
+                rows[product["barcode"]] = product_to_row(product)
+        if not rows:
+            return 0
+        self.client.table("food_database").upsert(
+            list(rows.values()), on_conflict="barcode"
+        ).execute()
+        return len(rows)
+
+    def get_by_barcodes(self, barcodes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch products for a list of barcodes in one indexed IN query."""
+        if not barcodes:
+            return {}
+        result = self.client.table("food_database").select("*").in_(
+            "barcode", list(barcodes)
+        ).execute()
+        return {row["barcode"]: row_to_product(row) for row in result.data or []}
+
+    def scan_products(self, columns: Sequence[str], page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Stream selected columns of every product, paging on the barcode index."""
+        selection = ",".join(dict.fromkeys(("barcode", *columns)))
+        last_barcode = ""
+        while True:
+            result = self.client.table("food_database").select(selection).gt(
+                "barcode", last_barcode
+            ).order("barcode").limit(page_size).execute()
+            rows = result.data or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last_barcode = rows[-1]["barcode"]
+
+    def backfill_category_slugs(self, page_size: int = 1000) -> int:
+        """Recompute category_slugs of every row from its categories; returns the number updated.
+
+        Rows sharing the same slugs are updated together with one IN filter.
+        """
+        updated = 0
+        page: List[Dict[str, Any]] = []
+        for row in self.scan_products(("categories", "category_slugs"), page_size):
+            page.append(row)
+            if len(page) < page_size:
+                continue
+            updated += self._write_category_slugs(page)
+            page = []
+        return updated + self._write_category_slugs(page)
+
+    def _write_category_slugs(self, rows: List[Dict[str, Any]]) -> int:
+        groups: Dict[Tuple[str, ...], List[str]] = {}
+        for row in rows:
+            slugs = tuple(product_to_row(row)["category_slugs"])
+            if list(slugs) != (row.get("category_slugs") or []):
+                groups.setdefault(slugs, []).append(row["barcode"])
+        for slugs, barcodes in groups.items():
+            self.client.table("food_database").update(
+                {"category_slugs": list(slugs)}
+            ).in_("barcode", barcodes).execute()
+        return sum(len(barcodes) for barcodes in groups.values())
+
+    def list_by_category(self,
+                         slug: str,
+                         limit: int,
+                         after: Optional[Tuple[Optional[int], str]] = None) -> List[Dict[str, Any]]:
+        """Products of a category (slug), by keto score then barcode, after a (keto_score, barcode) cursor.
+
+        Uses the GIN index on category_slugs (supabase_food_categories_schema.sql),
+        written by product_to_row with the same tag_key as CategoryIndex.
+        """
+        query = self.client.table("food_database").select("*").contains("category_slugs", [slug])
+        if after is not None:
+            keto_score, barcode = after
+            # Both values end up in a PostgREST filter string: digits only
+            if not barcode.isascii() or not barcode.isdigit():
+                raise ValueError(f"Invalid cursor barcode: {barcode!r}")
+            if keto_score is not None:
+                keto_score = int(keto_score)
+            if keto_score is None:
+                query = query.is_("keto_score", "null").gt("barcode", barcode)
+            else:
+                query = query.or_(
+                    f"keto_score.lt.{keto_score},keto_score.is.null,"
+                    f"and(keto_score.eq.{keto_score},barcode.gt.{barcode})"
+                )
+        result = query.order("keto_score", desc=True, nullsfirst=False).order("barcode").limit(limit).execute()
+        return [row_to_product(row) for row in result.data or []]
+
+    def record_scans(self, counts: Dict[str, int]) -> None:
+        """Add scan counts (popularity) to products in one RPC call."""
+        if not counts:
+            return
+        barcodes = list(counts)
+        self.client.rpc("increment_food_scans", {
+            "barcodes": barcodes,
+            "increments": [counts[barcode] for barcode in barcodes]
+        }).execute()
+
+    def list_stale_products(self, updated_before: datetime, limit: int) -> List[Dict[str, Any]]:
+        """Barcode, last_updated and scan_count of products not refreshed since a date, most scanned first."""
+        result = self.client.table("food_database").select("barcode,last_updated,scan_count").lt(
+            "last_updated", updated_before.isoformat()
+        ).order("scan_count", desc=True).limit(limit).execute()
+        return result.data or []
+
+    def save_search(self, query_key: str, barcodes: List[str], fetched_limit: int) -> None:
+        """Remember which products a normalized query returned."""
+        self.client.table("food_search_cache").upsert({
+            "query_key": query_key,
+            "barcodes": barcodes,
+            "fetched_limit": fetched_limit,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }, on_conflict="query_key").execute()
+
+    def get_search(self, query_key: str, max_age: timedelta) -> Optional[Tuple[List[str], int]]:
+        """Return (barcodes, fetched_limit) of a persisted search younger than max_age."""
+        oldest = (datetime.now(timezone.utc) - max_age).isoformat()
+        result = self.client.table("food_search_cache").select("*").eq(
+            "query_key", query_key
+        ).gte("created_at", oldest).execute()
+        if not result.data:
+            return None
+        row = result.data[0]
+        return row.get("barcodes") or [], row.get("fetched_limit") or 0
+
+    def save_catalogue_snapshot(self, name: str, products: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store a new version of a precomputed catalogue and return its metadata."""
+        result = self.client.table("food_catalogue_snapshots").insert({
+            "catalogue": name,
+            "products": products,
+            "product_count": len(products)
+        }).execute()
+        row = result.data[0]
+        return {"version": row["version"], "built_at": row["built_at"]}
+
+    def load_latest_catalogue_snapshot(self, name: str) -> Optional[Dict[str, Any]]:
+        """Latest stored version of a catalogue, or None."""
+        result = self.client.table("food_catalogue_snapshots").select("*").eq(
+            "catalogue", name
+        ).order("version", desc=True).limit(1).execute()
+        return result.data[0] if result.data else None
+
+food_repository = FoodRepository()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, validator, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime, date, time
 from decimal import Decimal
 from enum import Enum
@@ -166,4 +166,22 @@ class NutritionSummary(BaseModel):
     fiber: Decimal
     protein_percentage: Decimal
     carbs_percentage: Decimal
-    fat_percentage: Decimal
\ No newline at end of file
+    fat_percentage: Decimal
+
+# Delta sync models
+class SyncTombstone(BaseModel):
+    table_name: str
+    record_id: str
+    deleted_at: datetime
+
+class SyncChanges(BaseModel):
+    meals: List[Meal] = []
+    daily_summaries: List[DailySummary] = []
+    preferences: Optional[Dict[str, Any]] = None
+
+class SyncResponse(BaseModel):
+    next_token: str
+    has_more: bool = False
+    full_resync: bool = False
+    changes: SyncChanges
+    deleted: List[SyncTombstone] = []
@@ -0,0 +1,80 @@
+"""
+Alternatives keto à un produit (plus proches voisins)
+Chaque produit est un vecteur de valeurs nutritionnelles pour 100g ramenées
+à [0, 1] (calories, protéines, lipides, glucides nets, fibres, sucres). Les
+voisins sont cherchés par force brute vectorisée sur les colonnes de
+l'index nutritionnel, parmi les produits keto (score >= 7) partageant au
+moins une catégorie ; plus ils en partagent, plus ils sont proches.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.foods.dietary import tag_key
+from app.foods.nutrient_index import NUTRIENTS, NutrientIndex
+
+# Valeurs comparées et leur échelle (maximum pour 100g)
+FEATURES = (
+    ("calories_per_100g", 900.0),
+    ("protein_per_100g", 100.0),
+    ("fat_per_100g", 100.0),
+    ("net_carbs_per_100g", 100.0),
+    ("fiber_per_100g", 100.0),
+    ("sugar_per_100g", 100.0),
+)
+FEATURE_ROWS = [list(NUTRIENTS.values()).index(column) for column, _ in FEATURES]
+FEATURE_SCALES = np.array([scale for _, scale in FEATURES], dtype=np.float32)
+
+# Distance ajoutée quand aucune catégorie n'est partagée (au prorata des catégories manquantes)
+CATEGORY_WEIGHT = 0.5
+
+# Score keto minimal d'une alternative (seuil de is_keto_friendly)
+MIN_KETO_SCORE = 7
+
+def nutrient_vector(product: Dict[str, Any]) -> np.ndarray:
+    """Vecteur normalisé d'un produit enrichi (valeur inconnue : 0)"""
+    values = [product.get(column) or 0 for column, _ in FEATURES]
+    return np.array(values, dtype=np.float32) / FEATURE_SCALES
+
+def keto_alternatives(index: NutrientIndex,
+                      product: Dict[str, Any],
+                      limit: int = 5,
+                      min_keto_score: float = MIN_KETO_SCORE) -> List[Tuple[str, float]]:
+    """
+    Produits keto les plus proches d'un produit
+
+    Sans catégorie connue, tout le catalogue est candidat.
+
+    Returns:
+        (code-barres, distance) du plus proche au plus lointain
+    """
+    count = len(index.barcodes)
+    categories = {tag_key(category) for category in product.get("categories") or ()} - {""}
+    eligible = index.alive[:count] & (index.keto_scores[:count] >= min_keto_score)
+
+    shared = np.zeros(count, dtype=np.float32)
+    for category in categories:
+        docs = index.categories.get(category)
+        if docs:
+            shared[np.asarray(docs, dtype=np.intp)] += 1
+    if categories:
+        eligible &= shared > 0
+    own = index.doc_ids.get(product.get("barcode"))
+    if own is not None:
+        eligible[own] = False
+
+    docs = np.flatnonzero(eligible)
+    if not len(docs):
+        return []
+    vectors = np.nan_to_num(index.values[np.ix_(FEATURE_ROWS, docs)].T / FEATURE_SCALES)
+    distances = np.sqrt(((vectors - nutrient_vector(product)) ** 2).sum(axis=1))
+    if categories:
+        distances += CATEGORY_WEIGHT * (1 - shared[docs] / len(categories))
+
+    if len(docs) > limit:
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+    else:
+        nearest = np.arange(len(docs))
+    nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+    return [(index.barcodes[docs[i]], float(distances[i])) for i in nearest]
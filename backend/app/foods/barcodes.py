@@ -0,0 +1,57 @@
+"""
+Codes-barres GTIN (EAN-8, UPC-A, EAN-13, GTIN-14)
+Validation de la clé de contrôle et forme canonique unique, utilisée comme
+clé de tous les caches et de food_database : un même produit scanné en
+UPC-A, en EAN-13 avec un zéro de tête ou avec des espaces donne la même clé.
+"""
+
+import re
+from typing import Optional
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+# Séparateurs tolérés dans un code saisi ou lu (espaces, tirets)
+SEPARATORS = re.compile(r"[\s\-]+")
+
+class InvalidBarcode(ValueError):
+    """Code-barres mal formé ou clé de contrôle fausse"""
+    pass
+
+def check_digit(body: str) -> int:
+    """Clé de contrôle GS1 (modulo 10, poids 3 et 1 en partant de la droite)"""
+    # Sommes sur les octets ASCII : chaque chiffre vaut son code moins 48
+    digits = body.encode()
+    odd, even = digits[-1::-2], digits[-2::-2]
+    total = 3 * (sum(odd) - 48 * len(odd)) + sum(even) - 48 * len(even)
+    return -total % 10
+
+def normalize_barcode(raw: str) -> str:
+    """
+    Forme canonique d'un GTIN
+
+    Le code est aligné à droite sur 14 chiffres (règle GS1) puis raccourci :
+    EAN-8 sur 8 chiffres, UPC-A et EAN-13 sur 13, GTIN-14 avec indicateur
+    d'emballage sur 14.
+
+    Raises:
+        InvalidBarcode: longueur non GTIN, caractères non numériques ou clé fausse
+    """
+    code = SEPARATORS.sub("", raw or "")
+    if len(code) not in GTIN_LENGTHS or not code.isascii() or not code.isdigit():
+        raise InvalidBarcode(f"Code-barres invalide: {raw!r}")
+    if check_digit(code[:-1]) != ord(code[-1]) - 48:
+        raise InvalidBarcode(f"Clé de contrôle invalide: {raw!r}")
+
+    gtin14 = code.zfill(14)
+    if gtin14.startswith("000000"):
+        return gtin14[6:]
+    if gtin14.startswith("0"):
+        return gtin14[1:]
+    return gtin14
+
+def canonical_barcode(raw: str) -> Optional[str]:
+    """Comme normalize_barcode, mais None pour un code invalide"""
+    try:
+        return normalize_barcode(raw)
+    except InvalidBarcode:
+        return None
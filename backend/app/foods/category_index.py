@@ -0,0 +1,195 @@
+"""
+Arbre des catégories d'aliments et listes de produits par catégorie
+Les catégories OpenFoodFacts d'un produit vont de la plus générale à la plus
+précise (« Aliments d'origine végétale, Pains, Baguettes ») : le parent d'une
+catégorie est celle qui la précède le plus souvent. Chaque catégorie garde
+ses produits triés par score keto (puis code-barres), recalculés à la
+demande après modification ; la pagination se fait par curseur sur cette
+clé de tri, la même que dans food_database (voir list_by_category).
+"""
+
+import re
+import base64
+import binascii
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.foods.barcodes import canonical_barcode
+from app.foods.dietary import tag_key
+
+# Colonnes de food_database nécessaires à l'index
+CATEGORY_INDEX_COLUMNS = ("barcode", "categories", "keto_score")
+
+# Score keto d'un curseur : entier (food_database.keto_score), ou vide si inconnu
+CURSOR_SCORE = re.compile(r"-?[0-9]{1,4}")
+
+# Clé de tri d'un produit : score keto décroissant (inconnu en dernier), puis code-barres
+SortKey = Tuple[float, str]
+
+def sort_key(keto_score: Optional[float], barcode: str) -> SortKey:
+    return (-keto_score if keto_score is not None else float("inf"), barcode)
+
+def encode_cursor(key: SortKey) -> str:
+    """Curseur opaque : « score:code-barres » en base64 URL"""
+    score = "" if key[0] == float("inf") else f"{-key[0]:g}"
+    return base64.urlsafe_b64encode(f"{score}:{key[1]}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> SortKey:
+    """
+    Clé de tri d'un curseur
+
+    Seuls un score entier (ou vide) et un code-barres déjà canonique sont
+    acceptés : la clé peut finir dans un filtre PostgREST (list_by_category).
+
+    Raises:
+        ValueError: curseur illisible
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Curseur invalide")
+    score, _, barcode = raw.partition(":")
+    if (score and not CURSOR_SCORE.fullmatch(score)) or canonical_barcode(barcode) != barcode:
+        raise ValueError("Curseur invalide")
+    return sort_key(int(score) if score else None, barcode)
+
+class CategoryIndex:
+    """Catégorie (slug) -> produits, et liens parent / enfants entre catégories"""
+
+    def __init__(self):
+        self.doc_ids: Dict[str, int] = {}
+        # Par document : code-barres (None si supprimé), clé de tri, catégories
+        self.barcodes: List[Optional[str]] = []
+        self.doc_keys: List[SortKey] = []
+        self.doc_categories: List[Tuple[str, ...]] = []
+        # Par catégorie : nom affiché, documents (morts compris), prédécesseurs observés
+        self.names: Dict[str, str] = {}
+        self.members: Dict[str, List[int]] = {}
+        self.counts: Counter = Counter()
+        self.parent_votes: Dict[str, Counter] = {}
+        # Nom -> slug : les mêmes catégories reviennent d'un produit à l'autre
+        self._slugs: Dict[str, str] = {}
+        # Listes triées et enfants, recalculés à la demande après modification
+        self._ordered: Dict[str, List[int]] = {}
+        self._dirty: Set[str] = set()
+        self._children: Optional[Dict[Optional[str], List[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __contains__(self, slug: str) -> bool:
+        return self.counts[slug] > 0
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Indexer un produit, ou réindexer s'il est déjà présent"""
+        barcode = product.get("barcode")
+        if not barcode:
+            return
+        self.remove(barcode)
+
+        categories: Dict[str, str] = {}
+        for name in product.get("categories") or ():
+            slug = self._slugs.get(name)
+            if slug is None:
+                slug = self._slugs[name] = tag_key(name)
+            if slug and slug not in categories:
+                categories[slug] = name
+        if not categories:
+            return
+
+        doc = len(self.barcodes)
+        self.doc_ids[barcode] = doc
+        self.barcodes.append(barcode)
+        self.doc_keys.append(sort_key(product.get("keto_score"), barcode))
+        self.doc_categories.append(tuple(categories))
+        parent = None
+        for slug, name in categories.items():
+            self.names.setdefault(slug, name)
+            self.members.setdefault(slug, []).append(doc)
+            self.counts[slug] += 1
+            self.parent_votes.setdefault(slug, Counter())[parent] += 1
+            parent = slug
+        self._dirty.update(categories)
+        self._children = None
+
+    def add_many(self, products: Iterable[Dict[str, Any]]) -> None:
+        for product in products:
+            self.add(product)
+
+    def remove(self, barcode: str) -> None:
+        doc = self.doc_ids.pop(barcode, None)
+        if doc is None:
+            return
+        parent = None
+        for slug in self.doc_categories[doc]:
+            self.counts[slug] -= 1
+            self.parent_votes[slug][parent] -= 1
+            parent = slug
+        self._dirty.update(self.doc_categories[doc])
+        self._children = None
+        self.barcodes[doc] = None
+        self.doc_categories[doc] = ()
+
+    def _ordered_members(self, slug: str) -> List[int]:
+        if slug in self._dirty or slug not in self._ordered:
+            barcodes = self.barcodes
+            live = [doc for doc in self.members.get(slug, ()) if barcodes[doc] is not None]
+            # Les documents morts sont oubliés une fois la liste retriée
+            self.members[slug] = list(live)
+            self._ordered[slug] = sorted(live, key=self.doc_keys.__getitem__)
+            self._dirty.discard(slug)
+        return self._ordered[slug]
+
+    def prepare(self) -> None:
+        """Trier toutes les listes (après un chargement complet)"""
+        for slug in list(self._dirty):
+            self._ordered_members(slug)
+
+    def parent(self, slug: str) -> Optional[str]:
+        """Catégorie précédant le plus souvent celle-ci (None : catégorie racine)"""
+        votes = self.parent_votes.get(slug)
+        if not votes:
+            return None
+        parent, count = max(votes.items(), key=lambda vote: (vote[1], vote[0] is None, vote[0] or ""))
+        return parent if count > 0 else None
+
+    def children(self, slug: Optional[str]) -> List[str]:
+        """Sous-catégories (racines pour None), les plus fournies d'abord"""
+        if self._children is None:
+            children: Dict[Optional[str], List[str]] = {}
+            for category, count in self.counts.items():
+                if count > 0:
+                    children.setdefault(self.parent(category), []).append(category)
+            for members in children.values():
+                members.sort(key=lambda category: (-self.counts[category], category))
+            self._children = children
+        return self._children.get(slug, [])
+
+    def node(self, slug: str) -> Dict[str, Any]:
+        """Description d'une catégorie : nom, nombre de produits, parent et enfants"""
+        return {
+            "slug": slug,
+            "name": self.names.get(slug, slug),
+            "count": self.counts[slug],
+            "parent": self.parent(slug),
+            "children": [
+                {"slug": child, "name": self.names[child], "count": self.counts[child]}
+                for child in self.children(slug)
+            ],
+        }
+
+    def page(self, slug: str, limit: int, after: Optional[SortKey] = None) -> Tuple[List[str], Optional[SortKey]]:
+        """Codes-barres d'une catégorie après le curseur, et la clé de la page suivante"""
+        ordered = self._ordered_members(slug)
+        start = bisect_right(ordered, after, key=self.doc_keys.__getitem__) if after else 0
+        docs = ordered[start:start + limit]
+        following = self.doc_keys[docs[-1]] if docs and start + limit < len(ordered) else None
+        return [self.barcodes[doc] for doc in docs], following
+
+    @classmethod
+    def build(cls, products: Iterable[Dict[str, Any]]) -> "CategoryIndex":
+        index = cls()
+        index.add_many(products)
+        index.prepare()
+        return index
@@ -0,0 +1,162 @@
+"""
+Représentation compacte des produits gardés en mémoire
+Un produit enrichi est un dict d'une vingtaine de clés dont les listes
+(catégories, labels, allergènes) répètent les mêmes chaînes d'un produit à
+l'autre. En cache, il devient un objet à __slots__ : catégories, labels et
+allergènes en identifiants entiers d'un vocabulaire partagé, valeurs
+nutritionnelles et identifiants tassés dans des bytes, chaînes répétitives
+(marque, source) internées. Le dict d'origine n'est reconstruit qu'au moment
+de répondre.
+"""
+
+import sys
+import math
+import struct
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+# Valeurs pour 100g tassées en 7 doubles (NaN pour une valeur inconnue) ;
+# les calories gardent leur type (entier en base, flottant depuis OFF)
+PACKED_NUTRIENTS = (
+    "protein_per_100g", "carbohydrates_per_100g", "fat_per_100g", "fiber_per_100g",
+    "sugar_per_100g", "sodium_per_100g", "net_carbs_per_100g",
+)
+NUTRIENTS_FORMAT = struct.Struct(f"<{len(PACKED_NUTRIENTS)}d")
+
+# Préfixe commun des images OFF, remplacé par un marqueur d'un caractère
+IMAGE_PREFIX = "https://images.openfoodfacts.org/images/products/"
+IMAGE_MARKER = "\x01"
+
+class Vocabulary:
+    """Chaînes distinctes numérotées dans l'ordre d'apparition"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def id_of(self, value: str) -> int:
+        found = self.ids.get(value)
+        if found is not None:
+            return found
+        # Ajout sous verrou : les index sont aussi construits dans des threads
+        with self._lock:
+            found = self.ids.get(value)
+            if found is None:
+                found = self.ids[value] = len(self.values)
+                self.values.append(value)
+            return found
+
+    def pack(self, groups: Tuple[Iterable[str], ...]) -> bytes:
+        """Plusieurs listes de chaînes en un seul bloc : tailles puis identifiants (uint32)"""
+        ids = [[self.id_of(value) for value in group] for group in groups]
+        return array("I", [len(group) for group in ids] + [i for group in ids for i in group]).tobytes()
+
+    def unpack(self, packed: bytes, groups: int) -> List[List[str]]:
+        ids = array("I")
+        ids.frombytes(packed)
+        values, position, lists = self.values, groups, []
+        for size in ids[:groups]:
+            lists.append([values[i] for i in ids[position:position + size]])
+            position += size
+        return lists
+
+# Vocabulaire partagé par tous les produits compacts du processus
+tag_vocabulary = Vocabulary()
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+class CompactProduct:
+    """Produit enrichi en mémoire (voir to_dict pour la forme d'origine)"""
+
+    __slots__ = (
+        "barcode", "openfoodfacts_id", "product_name", "brand", "calories", "nutrients",
+        "tags", "ingredients_text", "image_url", "keto_score", "is_keto_friendly",
+        "data_source", "data_quality_score", "last_updated",
+    )
+
+    def __init__(self, product: Dict[str, Any]):
+        self.barcode = product.get("barcode")
+        # Presque toujours identique au code-barres : pas de seconde copie
+        openfoodfacts_id = product.get("openfoodfacts_id")
+        self.openfoodfacts_id = None if openfoodfacts_id == self.barcode else openfoodfacts_id
+        self.product_name = product.get("product_name")
+        self.brand = _intern(product.get("brand"))
+        self.calories = product.get("calories_per_100g")
+        self.nutrients = NUTRIENTS_FORMAT.pack(*(
+            math.nan if product.get(column) is None else product[column] for column in PACKED_NUTRIENTS
+        ))
+        self.tags = tag_vocabulary.pack((
+            product.get("categories") or (), product.get("labels") or (), product.get("allergens") or ()
+        ))
+        self.ingredients_text = product.get("ingredients_text")
+        image_url = product.get("image_url")
+        if image_url and image_url.startswith(IMAGE_PREFIX):
+            image_url = IMAGE_MARKER + image_url[len(IMAGE_PREFIX):]
+        self.image_url = image_url
+        self.keto_score = product.get("keto_score")
+        self.is_keto_friendly = product.get("is_keto_friendly")
+        self.data_source = _intern(product.get("data_source"))
+        self.data_quality_score = product.get("data_quality_score")
+        self.last_updated = product.get("last_updated")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Produit enrichi sous sa forme habituelle (réponses de l'API)"""
+        nutrients = [None if value != value else value for value in NUTRIENTS_FORMAT.unpack(self.nutrients)]
+        categories, labels, allergens = tag_vocabulary.unpack(self.tags, 3)
+        image_url = self.image_url
+        if image_url and image_url[0] == IMAGE_MARKER:
+            image_url = IMAGE_PREFIX + image_url[1:]
+        return {
+            "openfoodfacts_id": self.barcode if self.openfoodfacts_id is None else self.openfoodfacts_id,
+            "barcode": self.barcode,
+            "product_name": self.product_name,
+            "brand": self.brand,
+            "calories_per_100g": self.calories,
+            **dict(zip(PACKED_NUTRIENTS, nutrients)),
+            "categories": categories,
+            "labels": labels,
+            "allergens": allergens,
+            "ingredients_text": self.ingredients_text,
+            "image_url": image_url,
+            "keto_score": self.keto_score,
+            "is_keto_friendly": self.is_keto_friendly,
+            "data_source": self.data_source,
+            "data_quality_score": self.data_quality_score,
+            "last_updated": self.last_updated,
+        }
+
+def compact_products(products: Iterable[Dict[str, Any]]) -> Tuple[CompactProduct, ...]:
+    return tuple(CompactProduct(product) for product in products)
+
+def expand_products(products: Iterable[CompactProduct]) -> List[Dict[str, Any]]:
+    return [product.to_dict() for product in products]
+
+class CompactProductCache:
+    """TTLCache de produits rangés sous forme compacte, rendus en dict"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._cache
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        return self._cache[key].to_dict()
+
+    def __setitem__(self, key: str, product: Dict[str, Any]) -> None:
+        self._cache[key] = CompactProduct(product)
+
+    def get(self, key: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        compact = self._cache.get(key)
+        return default if compact is None else compact.to_dict()
@@ -0,0 +1,111 @@
+"""
+Critères alimentaires (allergènes et labels) en masques de bits
+Vocabulaire fixe : chaque allergène ou label reconnu a une position de bit
+stable. Les allergènes et labels libres d'OpenFoodFacts (« en:gluten »,
+« Sans gluten », « AB Agriculture Biologique »...) sont ramenés à ce
+vocabulaire, et chaque produit indexé porte le masque de ses critères.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.foods.text import TOKEN_PATTERN, fold_text
+
+# Allergènes à déclaration obligatoire (UE), bits 0 à 13 : critère -> étiquettes OFF reconnues
+ALLERGENS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("gluten", ("gluten", "ble", "orge", "seigle", "avoine", "epeautre")),
+    ("lait", ("milk", "lait", "lactose")),
+    ("oeufs", ("eggs", "oeufs", "oeuf")),
+    ("fruits-a-coque", ("nuts", "fruits-a-coque", "noix", "noisettes", "amandes")),
+    ("arachides", ("peanuts", "arachides", "cacahuetes")),
+    ("soja", ("soybeans", "soja")),
+    ("poisson", ("fish", "poisson")),
+    ("crustaces", ("crustaceans", "crustaces")),
+    ("mollusques", ("molluscs", "mollusques")),
+    ("celeri", ("celery", "celeri")),
+    ("moutarde", ("mustard", "moutarde")),
+    ("sesame", ("sesame-seeds", "sesame", "graines-de-sesame")),
+    ("sulfites", ("sulphur-dioxide-and-sulphites", "sulfites", "anhydride-sulfureux-et-sulfites")),
+    ("lupin", ("lupin",)),
+)
+
+# Labels, bits 32 et suivants
+LABELS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("bio", ("organic", "bio", "eu-organic", "ab-agriculture-biologique", "agriculture-biologique",
+             "fr-bio-01", "biologique")),
+    ("sans-gluten", ("no-gluten", "gluten-free", "sans-gluten")),
+    ("sans-lactose", ("no-lactose", "lactose-free", "sans-lactose")),
+    ("vegan", ("vegan", "vegetalien", "100-vegetal")),
+    ("vegetarien", ("vegetarian", "vegetarien")),
+    ("sans-sucres-ajoutes", ("no-added-sugar", "sans-sucres-ajoutes", "sans-sucre-ajoute")),
+    ("sans-huile-de-palme", ("palm-oil-free", "no-palm-oil", "sans-huile-de-palme")),
+    ("commerce-equitable", ("fair-trade", "commerce-equitable", "max-havelaar")),
+)
+
+LABEL_OFFSET = 32
+
+# Bit 31 : allergènes renseignés. Une liste vide ne prouve pas l'absence
+# d'allergène : exclure un allergène exige ce bit (voir required_flags)
+ALLERGENS_KNOWN = 1 << 31
+ALLERGEN_MASK = (1 << len(ALLERGENS)) - 1
+
+# Critère -> bit, et étiquette OFF normalisée -> bit (allergènes et labels séparément)
+FLAG_BITS: Dict[str, int] = {}
+ALLERGEN_TAGS: Dict[str, int] = {}
+LABEL_TAGS: Dict[str, int] = {}
+for position, (flag, tags) in enumerate(ALLERGENS):
+    FLAG_BITS[flag] = 1 << position
+    ALLERGEN_TAGS.update((tag, 1 << position) for tag in tags)
+for position, (flag, tags) in enumerate(LABELS, start=LABEL_OFFSET):
+    FLAG_BITS[flag] = 1 << position
+    LABEL_TAGS.update((tag, 1 << position) for tag in tags)
+
+LANGUAGE_PREFIX = re.compile(r"^[a-z]{2}:")
+
+def tag_key(tag: str) -> str:
+    """« en:Sulphur dioxide and sulphites » -> « sulphur-dioxide-and-sulphites »"""
+    folded = LANGUAGE_PREFIX.sub("", fold_text(tag))
+    return "-".join(TOKEN_PATTERN.findall(folded))
+
+def _mask(tags: Iterable[str], known: Dict[str, int]) -> int:
+    mask = 0
+    for tag in tags or ():
+        mask |= known.get(tag_key(tag), 0)
+    return mask
+
+def product_flags(product: Dict[str, Any]) -> int:
+    """Masque des allergènes et labels reconnus d'un produit enrichi"""
+    allergens = product.get("allergens")
+    known = ALLERGENS_KNOWN if allergens else 0
+    return known | _mask(allergens, ALLERGEN_TAGS) | _mask(product.get("labels"), LABEL_TAGS)
+
+def flags_mask(names: Iterable[str]) -> int:
+    """
+    Masque d'une liste de critères (« gluten », « bio », « sans-lactose »...)
+
+    Raises:
+        ValueError: pour un critère inconnu
+    """
+    mask = 0
+    for name in names:
+        key = tag_key(name)
+        if key not in FLAG_BITS:
+            raise ValueError(f"Critère inconnu: {name}")
+        mask |= FLAG_BITS[key]
+    return mask
+
+def parse_flags(value: str) -> int:
+    """Masque d'une liste de critères séparés par des virgules (paramètre de requête)"""
+    return flags_mask(part for part in (value or "").split(",") if part.strip())
+
+def flag_names() -> List[str]:
+    return list(FLAG_BITS)
+
+def required_flags(include: int, exclude: int) -> int:
+    """Bits exigés : les critères demandés, et des allergènes renseignés si l'on en exclut"""
+    return include | ALLERGENS_KNOWN if exclude & ALLERGEN_MASK else include
+
+def matches(flags: int, include: int = 0, exclude: int = 0) -> bool:
+    """Un masque satisfait-il les critères exigés et exclus ?"""
+    include = required_flags(include, exclude)
+    return (flags & include) == include and not (flags & exclude)
@@ -0,0 +1,49 @@
+"""
+Fraîcheur des fiches produits
+Âge d'une fiche (last_updated), priorité de rafraîchissement combinant
+popularité et ancienneté, et heure du prochain balayage nocturne.
+"""
+
+import heapq
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Horodatage ISO (avec ou sans fuseau, UTC par défaut), None s'il est illisible"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def product_age(product: Dict[str, Any], now: Optional[datetime] = None) -> Optional[timedelta]:
+    """Ancienneté de la fiche, None si elle n'a jamais été datée"""
+    updated = parse_timestamp(product.get('last_updated'))
+    if updated is None:
+        return None
+    return (now or datetime.now(timezone.utc)) - updated
+
+def is_stale(product: Dict[str, Any], max_age: timedelta, now: Optional[datetime] = None) -> bool:
+    age = product_age(product, now)
+    return age is None or age > max_age
+
+def refresh_priority(scan_count: int, age: timedelta, max_age: timedelta) -> float:
+    """Plus un produit est scanné et ancien, plus il passe tôt (popularité x ancienneté)"""
+    return (scan_count + 1) * (age / max_age)
+
+def refresh_order(rows: Iterable[Dict[str, Any]], max_age: timedelta, limit: int) -> List[str]:
+    """Codes-barres à rafraîchir, du plus prioritaire au moins prioritaire"""
+    now = datetime.now(timezone.utc)
+    queue = []
+    for row in rows:
+        age = product_age(row, now) or max_age
+        heapq.heappush(queue, (-refresh_priority(row.get('scan_count') or 0, age, max_age), row['barcode']))
+    return [heapq.heappop(queue)[1] for _ in range(min(limit, len(queue)))]
+
+def next_run(hour: int, now: Optional[datetime] = None) -> datetime:
+    """Prochaine occurrence de `hour`:00 UTC"""
+    now = now or datetime.now(timezone.utc)
+    run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
@@ -0,0 +1,97 @@
+"""
+Correspondance approximative des mots (fautes de frappe)
+Index de trigrammes de caractères sur un vocabulaire, puis distance d'édition
+bornée sur les seuls candidats partageant assez de trigrammes. Chaque
+recherche s'arrête à l'échéance fixée, quitte à rendre un résultat partiel.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def trigrams(word: str) -> List[str]:
+    padded = f"  {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+def max_typos(word: str) -> int:
+    """Fautes tolérées selon la longueur : aucune sous 4 lettres, 2 à partir de 7"""
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 7 else 2
+
+def edit_distance(a: str, b: str, bound: int) -> int:
+    """Distance de Damerau-Levenshtein (transpositions adjacentes), arrêtée au-delà de bound"""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > bound:
+            return bound + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class FuzzyVocabulary:
+    """Vocabulaire interrogeable par ressemblance (trigrammes + distance d'édition)"""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words: List[str] = []
+        self.word_ids: Dict[str, int] = {}
+        self.grams: Dict[str, List[int]] = {}
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.word_ids
+
+    def add(self, word: str) -> None:
+        if not word or word in self.word_ids:
+            return
+        word_id = len(self.words)
+        self.word_ids[word] = word_id
+        self.words.append(word)
+        for gram in set(trigrams(word)):
+            self.grams.setdefault(gram, []).append(word_id)
+
+    def closest(self, word: str, budget: float, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Mots à distance d'édition minimale (au plus max_distance), dans le budget en secondes"""
+        deadline = time.perf_counter() + budget
+        bound = max_typos(word) if max_distance is None else max_distance
+        if bound == 0:
+            return []
+
+        query_grams = set(trigrams(word))
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for word_id in self.grams.get(gram, ()):
+                shared[word_id] = shared.get(word_id, 0) + 1
+            if time.perf_counter() > deadline:
+                break
+
+        # Une faute détruit au plus 3 trigrammes : en deçà, le mot est trop loin
+        needed = max(1, len(query_grams) - 3 * bound)
+        candidates = sorted(
+            (word_id for word_id, count in shared.items() if count >= needed),
+            key=lambda word_id: -shared[word_id]
+        )
+
+        best: List[Tuple[str, int]] = []
+        for position, word_id in enumerate(candidates):
+            if position % 32 == 0 and time.perf_counter() > deadline:
+                break
+            distance = edit_distance(word, self.words[word_id], bound)
+            if distance > bound:
+                continue
+            if distance < bound:
+                # Meilleure distance trouvée : on ne garde que les égales
+                bound, best = distance, []
+            best.append((self.words[word_id], distance))
+        return best
@@ -0,0 +1,134 @@
+"""
+Catalogue keto-friendly précalculé
+Construit par une tâche d'arrière-plan à partir de recherches OpenFoodFacts,
+versionné dans food_catalogue_snapshots et servi depuis la mémoire.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+from app.database.food_repository import FoodRepository, food_repository
+from app.foods.text import fold_text
+from integrations.rate_limiter import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_NAME = "keto_friendly"
+
+# Recherches d'aliments keto-friendly servant à construire le catalogue
+KETO_SEARCHES = [
+    "avocat", "saumon", "huile olive", "fromage", "œuf", "beurre",
+    "noix", "amandes", "brocoli", "épinards", "chou-fleur", "courgette"
+]
+
+MIN_KETO_SCORE = 7
+RESULTS_PER_SEARCH = 20
+
+class KetoCatalogueSnapshot:
+    """Version immuable du catalogue, prête à être servie"""
+
+    def __init__(self, version: Optional[int], built_at: Optional[str], products: List[Dict[str, Any]]):
+        self.version = version
+        self.built_at = built_at
+        self.products = sorted(
+            products,
+            key=lambda p: (p.get('keto_score') or 0, p.get('data_quality_score') or 0),
+            reverse=True
+        )
+        # Catégorie normalisée -> positions dans self.products (ordre keto conservé)
+        self.by_category: Dict[str, List[int]] = {}
+        for position, product in enumerate(self.products):
+            for category in {fold_text(c) for c in product.get('categories') or []}:
+                self.by_category.setdefault(category, []).append(position)
+
+    def page(self, offset: int, limit: int, category: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Une page du catalogue, éventuellement filtrée par catégorie"""
+        if category:
+            positions = self.by_category.get(fold_text(category), [])
+            return [self.products[i] for i in positions[offset:offset + limit]], len(positions)
+        return self.products[offset:offset + limit], len(self.products)
+
+    def categories(self) -> List[Tuple[str, int]]:
+        return sorted(((name, len(ids)) for name, ids in self.by_category.items()), key=lambda c: -c[1])
+
+class KetoCatalogue:
+    """Catalogue keto en mémoire, reconstruit périodiquement en arrière-plan"""
+
+    def __init__(self, repository: Optional[FoodRepository] = None):
+        self.repository = repository or food_repository
+        self.snapshot = KetoCatalogueSnapshot(None, None, [])
+        self._rebuild_lock = asyncio.Lock()
+
+    async def load_latest(self) -> bool:
+        """Charger le dernier instantané persisté ; False s'il n'y en a pas"""
+        try:
+            row = await asyncio.to_thread(self.repository.load_latest_catalogue_snapshot, CATALOGUE_NAME)
+        except Exception as e:
+            logger.warning(f"Impossible de charger le catalogue keto: {e}")
+            return False
+        if not row:
+            return False
+        self.snapshot = KetoCatalogueSnapshot(row['version'], row['built_at'], row.get('products') or [])
+        logger.info(f"Catalogue keto v{row['version']} chargé ({len(self.snapshot.products)} produits)")
+        return True
+
+    def is_stale(self, max_age: timedelta) -> bool:
+        if not self.snapshot.built_at:
+            return True
+        built_at = datetime.fromisoformat(str(self.snapshot.built_at).replace('Z', '+00:00'))
+        if built_at.tzinfo is None:
+            built_at = built_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - built_at > max_age
+
+    async def rebuild(self, openfoodfacts) -> KetoCatalogueSnapshot:
+        """Reconstruire le catalogue depuis OpenFoodFacts et publier une nouvelle version"""
+        async with self._rebuild_lock:
+            results = await asyncio.gather(
+                *(openfoodfacts.search_products(term, limit=RESULTS_PER_SEARCH, priority=PRIORITY_BACKGROUND) for term in KETO_SEARCHES),
+                return_exceptions=True
+            )
+            products: Dict[str, Dict[str, Any]] = {}
+            for term, found in zip(KETO_SEARCHES, results):
+                if isinstance(found, Exception):
+                    logger.warning(f"Recherche '{term}' échouée pendant la reconstruction: {found}")
+                    continue
+                for product in found:
+                    key = product.get('barcode') or product.get('product_name')
+                    if key and (product.get('keto_score') or 0) >= MIN_KETO_SCORE:
+                        products[key] = product
+
+            if not products:
+                # OFF indisponible : on garde la version actuelle plutôt qu'un catalogue vide
+                logger.warning("Reconstruction du catalogue keto sans résultat, version conservée")
+                return self.snapshot
+
+            ordered = KetoCatalogueSnapshot(None, None, list(products.values())).products
+            version, built_at = None, datetime.now(timezone.utc).isoformat()
+            try:
+                meta = await asyncio.to_thread(self.repository.save_catalogue_snapshot, CATALOGUE_NAME, ordered)
+                version, built_at = meta['version'], meta['built_at']
+            except Exception as e:
+                logger.warning(f"Impossible de persister le catalogue keto: {e}")
+
+            self.snapshot = KetoCatalogueSnapshot(version, built_at, ordered)
+            logger.info(f"Catalogue keto v{version} publié ({len(ordered)} produits)")
+            return self.snapshot
+
+    async def run_periodic_refresh(self, openfoodfacts, interval: timedelta) -> None:
+        """Boucle d'arrière-plan : charger au démarrage puis reconstruire à intervalle fixe"""
+        if not await self.load_latest() or self.is_stale(interval):
+            await self._safe_rebuild(openfoodfacts)
+        while True:
+            await asyncio.sleep(interval.total_seconds())
+            await self._safe_rebuild(openfoodfacts)
+
+    async def _safe_rebuild(self, openfoodfacts) -> None:
+        try:
+            await self.rebuild(openfoodfacts)
+        except Exception as e:
+            logger.error(f"Échec de la reconstruction du catalogue keto: {e}")
+
+# Instance globale du catalogue
+keto_catalogue = KetoCatalogue()
@@ -0,0 +1,58 @@
+"""
+Score keto et qualité des données, calculés par lots avec NumPy
+Mêmes règles que OpenFoodFactsAPI._calculate_keto_score et
+_calculate_data_quality, appliquées à des colonnes entières au lieu d'un
+produit à la fois (import de l'export OFF, grandes pages de recherche).
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Règles 10 à 5 : % des calories en glucides nets au plus, % en lipides au moins
+CARB_LIMITS = np.array([2, 5, 8, 12, 15, 20], dtype=float)
+FAT_MINIMUMS = np.array([30, 40, 50, 60, 70, 80], dtype=float)
+# Sinon, selon les glucides seuls : <= 30 % -> 4, <= 40 % -> 3, <= 50 % -> 2, au-delà -> 1
+CARB_ONLY_LIMITS = np.array([30, 40, 50], dtype=float)
+CARB_ONLY_SCORES = np.array([4, 3, 2, 1])
+
+# Points de qualité : nom, marque, calories, protéines, glucides, lipides, fibres, image
+QUALITY_POINTS = np.array([2.0, 1.0, 2.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+QUALITY_MAX = 10.0
+
+def column(values: Sequence[Optional[float]]) -> np.ndarray:
+    """Colonne de nombres, None devenant NaN"""
+    return np.array(values, dtype=float)
+
+def keto_scores(calories: np.ndarray,
+                carbs: np.ndarray,
+                fat: np.ndarray,
+                fiber: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores keto (1-10) d'une colonne de produits
+
+    Args:
+        calories, carbs, fat, fiber: Valeurs pour 100g, NaN si inconnues
+
+    Returns:
+        (scores, valides) : le score n'a de sens que là où `valides` est vrai,
+        comme le calcul unitaire qui renvoie None sans calories ni glucides
+    """
+    valid = (calories > 0) & ~np.isnan(carbs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        net_carbs = carbs - np.nan_to_num(fiber, nan=0.0)
+        carbs_percentage = np.where(net_carbs >= 0, net_carbs * 4 / calories * 100, 0.0)
+        fat_percentage = np.where(np.nan_to_num(fat, nan=0.0) != 0, fat * 9 / calories * 100, 0.0)
+
+    # Première règle satisfaite de la chaîne = la plus exigeante que permettent
+    # à la fois les glucides et les lipides
+    carb_rule = np.searchsorted(CARB_LIMITS, carbs_percentage, side="left")
+    fat_rule = len(FAT_MINIMUMS) - np.searchsorted(FAT_MINIMUMS, fat_percentage, side="right")
+    rule = np.maximum(carb_rule, fat_rule)
+    carb_only = CARB_ONLY_SCORES[np.searchsorted(CARB_ONLY_LIMITS, carbs_percentage, side="left")]
+    scores = np.where(rule < len(CARB_LIMITS), 10 - rule, carb_only)
+    return scores, valid
+
+def quality_scores(present: np.ndarray) -> np.ndarray:
+    """Scores de qualité (0-1) à partir d'une matrice produits x champs renseignés"""
+    return np.minimum(1.0, present @ QUALITY_POINTS / QUALITY_MAX)
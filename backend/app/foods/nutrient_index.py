@@ -0,0 +1,293 @@
+"""
+Index des valeurs nutritionnelles des aliments en mémoire
+Une colonne NumPy par valeur pour 100g (telles que produites par
+_enrich_product_data), plus le score keto, la qualité des données et le
+masque allergènes / labels. Chaque colonne est aussi gardée triée : une
+contrainte « entre a et b » devient deux recherches dichotomiques, la plus
+sélective fournit les candidats et les autres sont vérifiées en bloc.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.foods.dietary import product_flags, required_flags, tag_key
+
+# Nom court (paramètres de l'API) -> colonne de food_database
+NUTRIENTS: Dict[str, str] = {
+    "calories": "calories_per_100g",
+    "protein": "protein_per_100g",
+    "carbohydrates": "carbohydrates_per_100g",
+    "fat": "fat_per_100g",
+    "fiber": "fiber_per_100g",
+    "sugar": "sugar_per_100g",
+    "sodium": "sodium_per_100g",
+    "net_carbs": "net_carbs_per_100g",
+}
+
+# Colonnes de food_database nécessaires à l'index
+NUTRIENT_INDEX_COLUMNS = (
+    "barcode", *NUTRIENTS.values(), "categories", "labels", "allergens",
+    "keto_score", "data_quality_score",
+)
+
+# Critères de tri : valeurs nutritionnelles et score keto
+SORT_KEYS = ("keto_score", *NUTRIENTS)
+
+# Documents ajoutés depuis le dernier tri, parcourus directement en deçà de ce seuil
+MAX_UNSORTED = 4096
+
+# Documents morts (produits supprimés ou réindexés) tolérés avant compactage :
+# au-delà de ce nombre et d'un quart des documents vivants
+MAX_DEAD = 4096
+
+def parse_ranges(params: Mapping[str, str]) -> Dict[str, Tuple[float, float]]:
+    """
+    Bornes demandées sous la forme `<nutriment>_min` / `<nutriment>_max`
+
+    Les autres paramètres sont ignorés.
+
+    Raises:
+        ValueError: nutriment inconnu, borne non numérique ou intervalle vide
+    """
+    ranges: Dict[str, List[float]] = {}
+    for key, value in params.items():
+        name, _, bound = key.rpartition("_")
+        if bound not in ("min", "max"):
+            continue
+        if name not in NUTRIENTS:
+            raise ValueError(f"Nutriment inconnu: {name} (connus : {', '.join(NUTRIENTS)})")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"Borne invalide pour {key}: {value}")
+        if number != number:
+            raise ValueError(f"Borne invalide pour {key}: {value}")
+        low_high = ranges.setdefault(name, [-np.inf, np.inf])
+        low_high[0 if bound == "min" else 1] = number
+    for name, (low, high) in ranges.items():
+        if low > high:
+            raise ValueError(f"Intervalle vide pour {name}: {low} > {high}")
+    return {name: (low, high) for name, (low, high) in ranges.items()}
+
+class NutrientIndex:
+    """Colonnes nutritionnelles par document, et leur ordre trié
+
+    Les documents supprimés restent en place, marqués morts (valeurs NaN) ;
+    un produit réindexé reçoit un nouveau document. Quand les morts deviennent
+    trop nombreux, les colonnes sont compactées. Les colonnes triées ne
+    couvrent que les `_sorted_size` premiers documents : les suivants (ajouts
+    récents) sont examinés directement, jusqu'au prochain tri.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.doc_ids: Dict[str, int] = {}
+        self.barcodes: List[Optional[str]] = []
+        self.size = 0
+        # Colonnes (nutriment x document), NaN pour une valeur inconnue
+        self.values = np.full((len(NUTRIENTS), capacity), np.nan, dtype=np.float32)
+        self.keto_scores = np.full(capacity, np.nan, dtype=np.float32)
+        self.quality = np.zeros(capacity, dtype=np.float32)
+        self.flags = np.zeros(capacity, dtype=np.uint64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        # Catégorie normalisée -> documents (les morts sont filtrés à la lecture)
+        self.categories: Dict[str, List[int]] = {}
+        # Par nutriment : documents triés par valeur et valeurs correspondantes
+        self._orders: List[np.ndarray] = []
+        self._sorted_values: List[np.ndarray] = []
+        self._sorted_size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self) -> None:
+        capacity = self.alive.shape[0] * 2
+        values = np.full((len(NUTRIENTS), capacity), np.nan, dtype=np.float32)
+        values[:, :self.values.shape[1]] = self.values
+        self.values = values
+        for name, fill in (("keto_scores", np.nan), ("quality", 0), ("flags", 0), ("alive", False)):
+            column = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=column.dtype)
+            grown[:column.shape[0]] = column
+            setattr(self, name, grown)
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Indexer un produit, ou réindexer s'il est déjà présent"""
+        barcode = product.get("barcode")
+        if not barcode:
+            return
+        self.remove(barcode)
+
+        doc = len(self.barcodes)
+        if doc >= self.alive.shape[0]:
+            self._grow()
+        for row, column in enumerate(NUTRIENTS.values()):
+            value = product.get(column)
+            if value is not None:
+                self.values[row, doc] = value
+        if product.get("keto_score") is not None:
+            self.keto_scores[doc] = product["keto_score"]
+        self.quality[doc] = product.get("data_quality_score") or 0
+        self.flags[doc] = product_flags(product)
+        self.alive[doc] = True
+        for category in dict.fromkeys(tag_key(category) for category in product.get("categories") or ()):
+            if category:
+                self.categories.setdefault(category, []).append(doc)
+
+        self.doc_ids[barcode] = doc
+        self.barcodes.append(barcode)
+        self.size += 1
+
+    def add_many(self, products: Iterable[Dict[str, Any]]) -> None:
+        for product in products:
+            self.add(product)
+
+    def remove(self, barcode: str) -> None:
+        doc = self.doc_ids.pop(barcode, None)
+        if doc is None:
+            return
+        self.barcodes[doc] = None
+        self.values[:, doc] = np.nan
+        self.keto_scores[doc] = np.nan
+        self.alive[doc] = False
+        self.size -= 1
+        if len(self.barcodes) - self.size > max(MAX_DEAD, self.size // 4):
+            self.compact()
+
+    def compact(self) -> None:
+        """Retirer les documents morts (renumérotés dans l'ordre) ; le tri est refait à la demande"""
+        live = np.flatnonzero(self.alive[:len(self.barcodes)])
+        renumber = np.full(len(self.barcodes), -1, dtype=np.intp)
+        renumber[live] = np.arange(len(live))
+        capacity = max(1024, 2 * len(live))
+
+        values = np.full((len(NUTRIENTS), capacity), np.nan, dtype=np.float32)
+        values[:, :len(live)] = self.values[:, live]
+        self.values = values
+        for name, fill in (("keto_scores", np.nan), ("quality", 0), ("flags", 0), ("alive", False)):
+            column = getattr(self, name)
+            compacted = np.full(capacity, fill, dtype=column.dtype)
+            compacted[:len(live)] = column[live]
+            setattr(self, name, compacted)
+
+        self.barcodes = [self.barcodes[doc] for doc in live.tolist()]
+        self.doc_ids = {barcode: doc for doc, barcode in enumerate(self.barcodes)}
+        for category, docs in list(self.categories.items()):
+            kept = renumber[np.asarray(docs, dtype=np.intp)]
+            kept = kept[kept >= 0]
+            if len(kept):
+                self.categories[category] = kept.tolist()
+            else:
+                del self.categories[category]
+        self._orders, self._sorted_values, self._sorted_size = [], [], 0
+
+    def prepare(self) -> None:
+        """Trier toutes les colonnes (après un chargement complet, ou trop d'ajouts)"""
+        count = len(self.barcodes)
+        self._orders = [np.argsort(self.values[row, :count], kind="stable") for row in range(len(NUTRIENTS))]
+        self._sorted_values = [self.values[row, order] for row, order in enumerate(self._orders)]
+        self._sorted_size = count
+
+    def _range_candidates(self, row: int, low: float, high: float) -> np.ndarray:
+        """Documents dont la valeur était dans [low, high] au dernier tri, plus les ajouts récents
+
+        Tranche (vue) de la colonne triée : ne coûte rien tant qu'elle n'est pas lue.
+        """
+        sorted_values = self._sorted_values[row]
+        start = np.searchsorted(sorted_values, np.float32(low), side="left")
+        end = np.searchsorted(sorted_values, np.float32(high), side="right")
+        docs = self._orders[row][start:end]
+        if self._sorted_size < len(self.barcodes):
+            docs = np.concatenate([docs, np.arange(self._sorted_size, len(self.barcodes), dtype=docs.dtype)])
+        return docs
+
+    def _category_mask(self, categories: Sequence[str]) -> Optional[np.ndarray]:
+        keys: Set[str] = {tag_key(category) for category in categories} - {""}
+        if not keys:
+            return None
+        mask = np.zeros(len(self.barcodes), dtype=bool)
+        for key in keys:
+            docs = self.categories.get(key)
+            if docs:
+                mask[np.asarray(docs, dtype=np.intp)] = True
+        return mask
+
+    def _sort_key(self, sort: str, docs: np.ndarray, descending: bool) -> np.ndarray:
+        """Clé croissante de classement (valeurs inconnues en dernier)"""
+        column = self.keto_scores if sort == "keto_score" else self.values[list(NUTRIENTS).index(sort)]
+        key = column[docs].astype(np.float64)
+        if descending:
+            key = -key
+        return np.where(np.isnan(key), np.inf, key)
+
+    def query(self,
+              ranges: Optional[Mapping[str, Tuple[float, float]]] = None,
+              categories: Sequence[str] = (),
+              include: int = 0,
+              exclude: int = 0,
+              sort: str = "keto_score",
+              descending: bool = True,
+              limit: int = 20) -> Tuple[List[str], int]:
+        """Codes-barres des meilleurs produits satisfaisant toutes les contraintes
+
+        Args:
+            ranges: Nom court du nutriment -> (min, max) inclus, pour 100g
+            categories: Catégories acceptées (au moins une)
+            include, exclude: Masques de critères (voir app.foods.dietary)
+            sort: Critère de classement (SORT_KEYS), départagé par score keto puis qualité
+            descending: Du plus grand au plus petit
+            limit: Nombre maximum de résultats
+
+        Returns:
+            Les codes-barres classés, et le nombre total de produits correspondants
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Tri inconnu: {sort} (possibles : {', '.join(SORT_KEYS)})")
+        ranges = {NUTRIENTS[name]: bounds for name, bounds in (ranges or {}).items()}
+        columns = list(NUTRIENTS.values())
+        if not self._orders or len(self.barcodes) - self._sorted_size > MAX_UNSORTED:
+            self.prepare()
+
+        # Intervalle le plus sélectif (d'après les colonnes triées) pour les candidats
+        if ranges:
+            candidates = [
+                self._range_candidates(columns.index(column), low, high)
+                for column, (low, high) in ranges.items()
+            ]
+            docs = min(candidates, key=len)
+        else:
+            docs = np.flatnonzero(self.alive[:len(self.barcodes)])
+
+        # Vérification de toutes les contraintes sur les valeurs courantes
+        keep = self.alive[docs]
+        for column, (low, high) in ranges.items():
+            values = self.values[columns.index(column), docs]
+            keep &= (values >= np.float32(low)) & (values <= np.float32(high))
+        category_mask = self._category_mask(categories)
+        if category_mask is not None:
+            keep &= category_mask[docs]
+        if include or exclude:
+            include = required_flags(include, exclude)
+            flags = self.flags[docs]
+            keep &= ((flags & np.uint64(include)) == np.uint64(include)) & ((flags & np.uint64(exclude)) == 0)
+        docs = docs[keep]
+        total = len(docs)
+        if not total:
+            return [], 0
+
+        # k meilleurs : sélection partielle sur le critère, ex aequo à la limite compris
+        key = self._sort_key(sort, docs, descending)
+        if total > limit:
+            threshold = np.partition(key, limit - 1)[limit - 1]
+            selected = key <= threshold
+            docs, key = docs[selected], key[selected]
+        keto = np.nan_to_num(self.keto_scores[docs], nan=-np.inf)
+        ranked = docs[np.lexsort((-self.quality[docs], -keto, key))][:limit]
+        return [self.barcodes[doc] for doc in ranked], total
+
+    @classmethod
+    def build(cls, products: Iterable[Dict[str, Any]]) -> "NutrientIndex":
+        index = cls()
+        index.add_many(products)
+        index.prepare()
+        return index
@@ -0,0 +1,300 @@
+"""
+Index plein texte des aliments en mémoire
+Index inversé sur le nom, la marque et les catégories des produits de
+food_database, classé par BM25 avec le score keto et la qualité des données
+pour départager. Chargé au démarrage puis mis à jour à chaque produit écrit.
+Chaque produit porte aussi le masque de ses allergènes et labels (tableau
+NumPy) : les filtres « avec » / « sans » sont des opérations bit à bit.
+"""
+
+import math
+import time
+import heapq
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.foods.dietary import product_flags, required_flags
+from app.foods.fuzzy import FuzzyVocabulary
+from app.foods.text import analyze
+
+logger = logging.getLogger(__name__)
+
+# Colonnes de food_database nécessaires à l'index
+INDEX_COLUMNS = (
+    "barcode", "product_name", "brand", "categories", "labels", "allergens",
+    "keto_score", "data_quality_score",
+)
+
+# Poids des champs (BM25F simplifié) : le nom compte plus que la marque ou les catégories
+FIELD_WEIGHTS = (("product_name", 3), ("brand", 1), ("categories", 1))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Précision des scores BM25 en deçà de laquelle le score keto départage
+SCORE_PRECISION = 3
+
+# Documents examinés par tranche quand un filtre s'applique à une liste triée
+FILTER_CHUNK = 1024
+
+class FoodSearchIndex:
+    """Index inversé BM25 : terme -> {document: fréquence pondérée}
+
+    Chaque liste de documents est aussi gardée triée par pertinence (puis score
+    keto et qualité) : une requête d'un seul mot, même très fréquent, lit
+    directement ses k premiers documents. Les requêtes de plusieurs mots
+    partent du mot le plus rare, qui borne le nombre de candidats.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_ids: Dict[str, int] = {}
+        # Par document : code-barres, termes, longueur pondérée, (score keto, qualité)
+        self.barcodes: List[Optional[str]] = []
+        self.doc_terms: List[Tuple[str, ...]] = []
+        self.doc_lengths: List[int] = []
+        self.doc_ranks: List[Tuple[int, float]] = []
+        self.total_length = 0
+        self.size = 0
+        # Listes triées par pertinence, recalculées à la demande après modification
+        self._ordered: Dict[str, List[int]] = {}
+        self._dirty: Set[str] = set()
+        # Termes connus, pour corriger les fautes de frappe
+        self.vocabulary = FuzzyVocabulary()
+        # Masque allergènes / labels par document (capacité doublée au besoin)
+        self.flags = np.zeros(1024, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def _weighted_terms(product: Dict[str, Any]) -> Dict[str, int]:
+        terms: Dict[str, int] = {}
+        for field, weight in FIELD_WEIGHTS:
+            value = product.get(field)
+            if isinstance(value, list):
+                value = " ".join(value)
+            for term in analyze(value or ""):
+                terms[term] = terms.get(term, 0) + weight
+        return terms
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Indexer un produit, ou réindexer s'il est déjà présent"""
+        barcode = product.get("barcode")
+        if not barcode or not product.get("product_name"):
+            return
+        self.remove(barcode)
+
+        terms = self._weighted_terms(product)
+        doc = len(self.barcodes)
+        for term, frequency in terms.items():
+            if term not in self.postings:
+                self.vocabulary.add(term)
+                self.postings[term] = {}
+            self.postings[term][doc] = frequency
+        self._dirty.update(terms)
+        length = sum(terms.values())
+
+        self.doc_ids[barcode] = doc
+        self.barcodes.append(barcode)
+        self.doc_terms.append(tuple(terms))
+        self.doc_lengths.append(length)
+        self.doc_ranks.append((product.get("keto_score") or 0, float(product.get("data_quality_score") or 0)))
+        if doc >= len(self.flags):
+            self.flags = np.concatenate([self.flags, np.zeros(len(self.flags), dtype=np.uint64)])
+        self.flags[doc] = product_flags(product)
+        self.total_length += length
+        self.size += 1
+
+    def add_many(self, products: Iterable[Dict[str, Any]]) -> None:
+        for product in products:
+            self.add(product)
+
+    def remove(self, barcode: str) -> None:
+        doc = self.doc_ids.pop(barcode, None)
+        if doc is None:
+            return
+        for term in self.doc_terms[doc]:
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                del self.postings[term]
+                self._ordered.pop(term, None)
+        self._dirty.update(self.doc_terms[doc])
+        self.total_length -= self.doc_lengths[doc]
+        self.barcodes[doc] = None
+        self.doc_terms[doc] = ()
+        self.doc_lengths[doc] = 0
+        self.flags[doc] = 0
+        self.size -= 1
+
+    def _term_weight(self, frequency: int, doc: int, average_length: float) -> float:
+        """Partie BM25 dépendant du document (sans l'idf du terme)"""
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc] / average_length)
+        return frequency * (BM25_K1 + 1) / (frequency + norm)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings[term])
+        return math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+
+    def _ordered_postings(self, term: str, average_length: float) -> List[int]:
+        if term in self._dirty or term not in self._ordered:
+            postings, ranks = self.postings[term], self.doc_ranks
+            self._ordered[term] = sorted(
+                postings,
+                key=lambda doc: (round(self._term_weight(postings[doc], doc, average_length), SCORE_PRECISION),
+                                 *ranks[doc]),
+                reverse=True
+            )
+            self._dirty.discard(term)
+        return self._ordered[term]
+
+    def prepare(self) -> None:
+        """Trier toutes les listes (après un chargement complet)"""
+        if self.size:
+            average_length = self.total_length / self.size
+            for term in list(self._dirty):
+                if term in self.postings:
+                    self._ordered_postings(term, average_length)
+        self._dirty.clear()
+
+    def allowed(self, include: int = 0, exclude: int = 0) -> Optional[np.ndarray]:
+        """Documents ayant tous les critères `include` et aucun de `exclude` (None : pas de filtre)"""
+        if not include and not exclude:
+            return None
+        include = required_flags(include, exclude)
+        flags = self.flags[:len(self.barcodes)]
+        mask = (flags & np.uint64(exclude)) == 0
+        if include:
+            mask &= (flags & np.uint64(include)) == np.uint64(include)
+        return mask
+
+    @staticmethod
+    def _first_allowed(ordered: Sequence[int], allowed: np.ndarray, limit: int) -> List[int]:
+        """Les `limit` premiers documents autorisés d'une liste triée, examinée par tranches"""
+        found: List[int] = []
+        for start in range(0, len(ordered), FILTER_CHUNK):
+            chunk = np.asarray(ordered[start:start + FILTER_CHUNK], dtype=np.intp)
+            found.extend(chunk[allowed[chunk]].tolist())
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    def search(self,
+               query: str,
+               limit: int = 20,
+               match_all: bool = True,
+               include: int = 0,
+               exclude: int = 0) -> List[Tuple[str, float]]:
+        """Codes-barres les plus pertinents avec leur score BM25
+
+        Args:
+            query: Texte recherché
+            limit: Nombre maximum de résultats
+            match_all: Ne garder que les produits contenant tous les mots
+            include: Masque des critères exigés (voir app.foods.dietary)
+            exclude: Masque des critères exclus
+        """
+        return self.search_terms(analyze(query), limit, match_all, include, exclude)
+
+    def search_terms(self,
+                     terms: List[str],
+                     limit: int = 20,
+                     match_all: bool = True,
+                     include: int = 0,
+                     exclude: int = 0) -> List[Tuple[str, float]]:
+        """Comme search, pour des termes déjà analysés"""
+        terms = list(dict.fromkeys(terms))
+        if not terms or not self.size:
+            return []
+        known = [term for term in terms if term in self.postings]
+        if not known or (match_all and len(known) < len(terms)):
+            return []
+
+        average_length = self.total_length / self.size
+        allowed = self.allowed(include, exclude)
+
+        if len(known) == 1:
+            term = known[0]
+            idf, postings = self._idf(term), self.postings[term]
+            ordered = self._ordered_postings(term, average_length)
+            docs = ordered[:limit] if allowed is None else self._first_allowed(ordered, allowed, limit)
+            return [
+                (self.barcodes[doc], idf * self._term_weight(postings[doc], doc, average_length))
+                for doc in docs
+            ]
+
+        # Mot le plus rare d'abord : en mode « tous les mots » il borne les candidats
+        known.sort(key=lambda term: len(self.postings[term]))
+        if match_all:
+            others = [self.postings[term] for term in known[1:]]
+            candidates = [doc for doc in self.postings[known[0]] if all(doc in p for p in others)]
+        else:
+            candidates = list(set().union(*(self.postings[term] for term in known)))
+        if allowed is not None and candidates:
+            candidates = np.asarray(candidates, dtype=np.intp)
+            candidates = candidates[allowed[candidates]].tolist()
+
+        # BM25 déroulé terme par terme (boucle chaude : pas d'appel de fonction par document)
+        totals = [0.0] * len(candidates)
+        lengths = self.doc_lengths
+        base = BM25_K1 * (1 - BM25_B)
+        slope = BM25_K1 * BM25_B / average_length
+        for term in known:
+            postings, idf = self.postings[term], self._idf(term) * (BM25_K1 + 1)
+            for position, doc in enumerate(candidates):
+                frequency = postings.get(doc)
+                if frequency:
+                    totals[position] += idf * frequency / (frequency + base + slope * lengths[doc])
+
+        ranks = self.doc_ranks
+        best = heapq.nlargest(
+            limit,
+            zip(candidates, totals),
+            key=lambda item: (round(item[1], SCORE_PRECISION), *ranks[item[0]])
+        )
+        return [(self.barcodes[doc], score) for doc, score in best]
+
+    def correct_terms(self, query: str, budget: float) -> Optional[List[str]]:
+        """Termes de la requête, les inconnus remplacés par le terme indexé le plus proche
+
+        Returns:
+            Les termes corrigés, ou None si rien n'a pu être corrigé dans le budget
+        """
+        deadline = time.perf_counter() + budget
+        corrected, changed = [], False
+        for term in analyze(query):
+            if term in self.postings:
+                corrected.append(term)
+                continue
+            remaining = deadline - time.perf_counter()
+            matches = [
+                (match, distance) for match, distance in self.vocabulary.closest(term, max(remaining, 0))
+                if match in self.postings
+            ] if remaining > 0 else []
+            if not matches:
+                return None
+            # À distance égale, le terme le plus fréquent est le plus probable
+            best = max(matches, key=lambda match: (-match[1], len(self.postings[match[0]])))
+            corrected.append(best[0])
+            changed = True
+        return corrected if changed else None
+
+    def fuzzy_search(self,
+                     query: str,
+                     limit: int,
+                     budget: float,
+                     include: int = 0,
+                     exclude: int = 0) -> List[Tuple[str, float]]:
+        """Recherche tolérante aux fautes de frappe, bornée dans le temps"""
+        terms = self.correct_terms(query, budget)
+        return self.search_terms(terms, limit, True, include, exclude) if terms else []
+
+    @classmethod
+    def build(cls, products: Iterable[Dict[str, Any]]) -> "FoodSearchIndex":
+        index = cls()
+        index.add_many(products)
+        index.prepare()
+        return index
@@ -0,0 +1,254 @@
+"""
+Autocomplétion des noms d'aliments
+Vocabulaire trié (recherche de préfixe par bisect) pointant vers les noms de
+produits distincts, classés par popularité puis score keto. Les aliments
+récents de l'utilisateur passent devant le catalogue.
+"""
+
+import heapq
+import time
+import logging
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.foods.text import fold_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Mots de préfixe examinés au plus (les plus fréquents quand le préfixe est très court)
+MAX_PREFIX_WORDS = 64
+# Noms candidats examinés avant le classement final par popularité
+MAX_CANDIDATES = 200
+# Noms les plus utilisés toujours considérés, recalculés au plus toutes les 30 s
+POPULAR_ENTRIES = 500
+POPULAR_REFRESH_SECONDS = 30
+# Aliments récents gardés par utilisateur
+RECENT_FOODS_PER_USER = 50
+
+class SuggestIndex:
+    """Index de préfixes sur les mots des noms de produits
+
+    `words` est trié ; pour chaque mot, `word_entries` liste les noms qui le
+    contiennent, du meilleur score keto au moins bon, sous forme de paires
+    (-score keto, nom) pour rester triable par bisect.
+    """
+
+    def __init__(self):
+        self.words: List[str] = []
+        self.word_entries: List[List[Tuple[int, int]]] = []
+        # Par nom distinct : libellé affiché, nom replié, meilleur score keto, nombre de produits
+        self.entry_ids: Dict[str, int] = {}
+        self.labels: List[str] = []
+        self.folded: List[str] = []
+        self.keto_scores: List[int] = []
+        self.product_counts: List[int] = []
+        # Popularité : utilisations observées (repas enregistrés, scans)
+        self.uses: Dict[int, int] = {}
+        self._popular: List[int] = []
+        self._popular_refreshed = 0.0
+        # Préfixes courts couvrant beaucoup de mots : listes retenues, vidé à chaque nouveau mot
+        self._wide_prefixes: Dict[str, List[List[Tuple[int, int]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _entry(self, name: str, keto_score: int) -> Tuple[int, bool]:
+        folded = fold_text(name)
+        entry = self.entry_ids.get(folded)
+        if entry is not None:
+            self.product_counts[entry] += 1
+            if keto_score > self.keto_scores[entry]:
+                self._rescore(entry, keto_score)
+            return entry, False
+        entry = len(self.labels)
+        self.entry_ids[folded] = entry
+        self.labels.append(" ".join(name.split()))
+        self.folded.append(folded)
+        self.keto_scores.append(keto_score)
+        self.product_counts.append(1)
+        return entry, True
+
+    def _rescore(self, entry: int, keto_score: int) -> None:
+        """Changer le score d'un nom en gardant triées les listes de ses mots"""
+        old, new = (-self.keto_scores[entry], entry), (-keto_score, entry)
+        self.keto_scores[entry] = keto_score
+        for word in set(tokenize(self.labels[entry])):
+            position = bisect_left(self.words, word)
+            if position == len(self.words) or self.words[position] != word:
+                continue
+            entries = self.word_entries[position]
+            index = bisect_left(entries, old)
+            if index < len(entries) and entries[index] == old:
+                del entries[index]
+                insort(entries, new)
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Ajouter le nom d'un produit (incrémental)"""
+        name = product.get("product_name")
+        if not name:
+            return
+        entry, created = self._entry(name, product.get("keto_score") or 0)
+        if not created:
+            return
+        for word in set(tokenize(name)):
+            position = bisect_left(self.words, word)
+            if position == len(self.words) or self.words[position] != word:
+                self.words.insert(position, word)
+                self.word_entries.insert(position, [])
+                self._wide_prefixes.clear()
+            insort(self.word_entries[position], (-self.keto_scores[entry], entry))
+
+    @classmethod
+    def build(cls, products: Iterable[Dict[str, Any]]) -> "SuggestIndex":
+        """Construction en bloc : un seul tri au lieu d'insertions successives"""
+        index = cls()
+        postings: Dict[str, List[int]] = {}
+        for product in products:
+            name = product.get("product_name")
+            if not name:
+                continue
+            entry, created = index._entry(name, product.get("keto_score") or 0)
+            if created:
+                for word in set(tokenize(name)):
+                    postings.setdefault(word, []).append(entry)
+        index.words = sorted(postings)
+        index.word_entries = [
+            sorted((-index.keto_scores[entry], entry) for entry in postings[word])
+            for word in index.words
+        ]
+        return index
+
+    def record_use(self, name: str) -> None:
+        """Compter une utilisation d'un aliment (popularité)"""
+        entry = self.entry_ids.get(fold_text(name or ""))
+        if entry is not None:
+            self.uses[entry] = self.uses.get(entry, 0) + 1
+
+    def _popular_entries(self) -> List[int]:
+        now = time.monotonic()
+        if now - self._popular_refreshed > POPULAR_REFRESH_SECONDS:
+            self._popular = heapq.nlargest(POPULAR_ENTRIES, self.uses, key=self.uses.__getitem__)
+            self._popular_refreshed = now
+        return self._popular
+
+    @staticmethod
+    def _matches(folded: str, complete: List[str], prefix: str) -> bool:
+        """Tous les mots complets présents et un mot commençant par le préfixe"""
+        words = tokenize(folded)
+        for word in complete:
+            if word not in words:
+                return False
+            words.remove(word)
+        return any(word.startswith(prefix) for word in words)
+
+    def suggest(self, query: str, limit: int = 8, recent: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Complétions pour la saisie en cours (dernier mot = préfixe)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        complete, prefix = tokens[:-1], tokens[-1]
+
+        suggestions: List[Dict[str, Any]] = []
+        seen = set()
+        for name in recent or []:
+            folded = fold_text(name)
+            if folded not in seen and self._matches(folded, complete, prefix):
+                seen.add(folded)
+                entry = self.entry_ids.get(folded)
+                suggestions.append({
+                    "text": name,
+                    "keto_score": self.keto_scores[entry] if entry is not None else None,
+                    "source": "recent"
+                })
+                if len(suggestions) >= limit:
+                    return suggestions
+
+        lo = bisect_left(self.words, prefix)
+        hi = bisect_left(self.words, prefix + "\uffff", lo)
+        if lo == hi:
+            return suggestions
+
+        if complete:
+            # Le mot complet le plus rare fournit les candidats, filtrés sur le préfixe
+            lists = []
+            for word in complete:
+                position = bisect_left(self.words, word)
+                if position == len(self.words) or self.words[position] != word:
+                    return suggestions
+                lists.append(self.word_entries[position])
+            stream = min(lists, key=len)
+        else:
+            # Fusion des listes (déjà triées par score keto) des mots commençant par le préfixe
+            if hi - lo <= MAX_PREFIX_WORDS:
+                lists = self.word_entries[lo:hi]
+            else:
+                lists = self._wide_prefixes.get(prefix)
+                if lists is None:
+                    lists = heapq.nlargest(MAX_PREFIX_WORDS, self.word_entries[lo:hi], key=len)
+                    self._wide_prefixes[prefix] = lists
+            stream = heapq.merge(*lists)
+
+        # Les noms populaires sont classés même s'ils ont un score keto modeste
+        candidates = {
+            entry for entry in self._popular_entries()
+            if self.folded[entry] not in seen and self._matches(self.folded[entry], complete, prefix)
+        }
+        for _, entry in stream:
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+            if entry in candidates or self.folded[entry] in seen:
+                continue
+            if not complete or self._matches(self.folded[entry], complete, prefix):
+                candidates.add(entry)
+
+        ranked = heapq.nlargest(
+            limit - len(suggestions),
+            candidates,
+            key=lambda entry: (self.uses.get(entry, 0), self.keto_scores[entry], self.product_counts[entry])
+        )
+        suggestions.extend(
+            {"text": self.labels[entry], "keto_score": self.keto_scores[entry], "source": "catalogue"}
+            for entry in ranked
+        )
+        return suggestions
+
+class RecentFoods:
+    """Derniers aliments saisis par utilisateur, gardés en mémoire"""
+
+    def __init__(self, maxsize: int = 10000, ttl: int = 6 * 3600):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id: str) -> Optional[List[str]]:
+        return self._cache.get(user_id)
+
+    def set(self, user_id: str, names: Iterable[str]) -> List[str]:
+        """Mémoriser une liste (du plus récent au plus ancien), sans doublons"""
+        unique: Dict[str, str] = {}
+        for name in names:
+            if name:
+                unique.setdefault(fold_text(name), name)
+        self._cache[user_id] = list(unique.values())[:RECENT_FOODS_PER_USER]
+        return self._cache[user_id]
+
+    def remember(self, user_id: str, name: str) -> None:
+        """Placer un aliment en tête, si la liste de l'utilisateur est déjà chargée"""
+        current = self._cache.get(user_id)
+        if current is not None:
+            self.set(user_id, [name, *current])
+
+# Aliments récents partagés par l'API (repas et suggestions)
+recent_foods = RecentFoods()
+
+# Abonnés aux aliments consommés (popularité des suggestions du catalogue)
+_food_use_listeners: List[Callable[[str], None]] = []
+
+def add_food_use_listener(listener: Callable[[str], None]) -> None:
+    _food_use_listeners.append(listener)
+
+def record_food_use(user_id: str, name: str) -> None:
+    """Un utilisateur a consommé un aliment (repas enregistré)"""
+    recent_foods.remember(user_id, name)
+    for listener in _food_use_listeners:
+        listener(name)
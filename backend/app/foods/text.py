@@ -0,0 +1,50 @@
+"""
+Normalisation de texte pour la recherche d'aliments
+Repliement de la casse et des accents (œ → oe, é → e), découpage en mots
+et racinisation légère du français.
+"""
+
+import re
+import unicodedata
+from typing import List
+
+# Ligatures que la décomposition Unicode ne sépare pas
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ß": "ss"})
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def fold_text(text: str) -> str:
+    """Minuscules, sans accents ni ligatures, espaces normalisés"""
+    folded = unicodedata.normalize("NFKD", text.casefold().translate(LIGATURES))
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return " ".join(folded.split())
+
+# Mots vides fréquents dans les noms de produits
+STOPWORDS = frozenset({
+    "a", "au", "aux", "avec", "d", "de", "des", "du", "en", "et",
+    "l", "la", "le", "les", "ou", "par", "pour", "sans", "sur", "un", "une",
+})
+
+def tokenize(text: str) -> List[str]:
+    """Découper un texte replié en mots alphanumériques"""
+    return TOKEN_PATTERN.findall(fold_text(text or ""))
+
+def stem(token: str) -> str:
+    """Racinisation légère du français (pluriels et finales -e/-r, lettres doublées)
+
+    Volontairement prudente : elle rapproche « amandes » et « amande » ou
+    « courgettes » et « courgette » sans confondre des aliments différents.
+    """
+    if len(token) > 5 and token.endswith("aux"):
+        return token[:-3] + "al"
+    if len(token) > 3 and token[-1] in "sx":
+        token = token[:-1]
+    if len(token) > 4 and token[-1] in "er":
+        token = token[:-1]
+    if len(token) > 4 and token[-1] == token[-2]:
+        token = token[:-1]
+    return token
+
+def analyze(text: str) -> List[str]:
+    """Termes d'indexation : mots repliés, sans mots vides, racinisés"""
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire des produits gardés en cache
+Compare des produits enrichis sous forme de dict (tels que décodés depuis
+food_database) à leur forme compacte (CompactProduct), pour un catalogue
+synthétique aux distributions proches d'OpenFoodFacts France.
+
+Usage: python benchmark_product_memory.py [nombre_de_produits]
+"""
+
+import os
+import sys
+import gc
+import time
+import random
+import tracemalloc
+from typing import List
+
+import orjson
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+
+from app.foods.barcodes import check_digit
+from app.foods.compact_product import CompactProduct, tag_vocabulary
+
+WORDS = ("sucre huile tournesol farine blé lait écrémé poudre sel arôme naturel émulsifiant lécithine "
+         "soja cacao noisettes beurre oeufs amidon maïs sirop glucose levure eau vinaigre épices").split()
+
+def make_lines(count: int, seed: int = 42) -> List[bytes]:
+    """Produits sérialisés en JSON, comme renvoyés par PostgREST"""
+    rng = random.Random(seed)
+    categories = [f"Catégorie {i}" for i in range(8000)]
+    labels = [f"Label {i}" for i in range(600)]
+    allergens = ["en:gluten", "en:milk", "en:eggs", "en:nuts", "en:soybeans", "en:peanuts", "en:celery",
+                 "en:mustard", "en:sesame-seeds", "en:fish", "en:crustaceans", "en:molluscs", "en:lupin",
+                 "en:sulphur-dioxide-and-sulphites"]
+    brands = [f"Marque {i}" for i in range(30000)]
+
+    def zipf(values: List[str]) -> str:
+        return values[min(int(rng.paretovariate(1.1)) - 1, len(values) - 1)]
+
+    lines = []
+    for i in range(count):
+        body = f"3{i:011d}"
+        barcode = body + str(check_digit(body))
+        path = f"{barcode[:3]}/{barcode[3:6]}/{barcode[6:9]}/{barcode[9:]}"
+        carbs = round(rng.uniform(0, 60), 1)
+        fiber = round(rng.uniform(0, 5), 1)
+        lines.append(orjson.dumps({
+            "openfoodfacts_id": barcode,
+            "barcode": barcode,
+            "product_name": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}",
+            "brand": zipf(brands),
+            "calories_per_100g": rng.randint(20, 700),
+            "protein_per_100g": round(rng.uniform(0, 30), 1),
+            "carbohydrates_per_100g": carbs,
+            "fat_per_100g": round(rng.uniform(0, 50), 1),
+            "fiber_per_100g": fiber,
+            "sugar_per_100g": round(rng.uniform(0, carbs), 1),
+            "sodium_per_100g": round(rng.uniform(0, 2), 2),
+            "net_carbs_per_100g": max(0.0, round(carbs - fiber, 1)),
+            "categories": list(dict.fromkeys(zipf(categories) for _ in range(rng.randint(2, 10)))),
+            "labels": list(dict.fromkeys(zipf(labels) for _ in range(rng.randint(0, 3)))),
+            "allergens": rng.sample(allergens, rng.randint(0, 3)),
+            "ingredients_text": ", ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))),
+            "image_url": f"https://images.openfoodfacts.org/images/products/{path}/front_fr.{rng.randint(3, 90)}.400.jpg",
+            "keto_score": rng.randint(1, 10),
+            "is_keto_friendly": rng.random() < 0.3,
+            "data_source": "openfoodfacts",
+            "data_quality_score": rng.choice([0.6, 0.8, 0.9, 1.0]),
+            "last_updated": f"2025-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T08:{rng.randint(10, 59)}:00.123456+00:00",
+        }))
+    return lines
+
+def measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, size, elapsed
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    lines = make_lines(count)
+
+    dicts, dict_size, dict_time = measure(lambda: [orjson.loads(line) for line in lines])
+    del dicts
+    compact, compact_size, compact_time = measure(lambda: [CompactProduct(orjson.loads(line)) for line in lines])
+
+    sample = orjson.loads(lines[0])
+    assert CompactProduct(sample).to_dict() == sample
+
+    started = time.perf_counter()
+    for product in compact[:10000]:
+        product.to_dict()
+    expand_us = (time.perf_counter() - started) / min(count, 10000) * 1e6
+
+    print(f"{count} produits")
+    print(f"  dict          : {dict_size / 2**20:8.1f} Mo ({dict_size / count:.0f} o/produit), {dict_time:.1f}s")
+    print(f"  CompactProduct: {compact_size / 2**20:8.1f} Mo ({compact_size / count:.0f} o/produit), {compact_time:.1f}s"
+          f" (vocabulaire : {len(tag_vocabulary)} libellés)")
+    print(f"  gain          : {(1 - compact_size / dict_size) * 100:.0f}% ; to_dict {expand_us:.1f} us/produit")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark de sérialisation des listes de repas
+Compare le chemin historique (Meal(**row) + validation response_model + json)
+au chemin rapide (projection des lignes de confiance + orjson).
+
+Usage: python benchmark_serialization.py [nombre_de_repas] [répétitions]
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+
+from pydantic import TypeAdapter
+from app.database.schemas import Meal
+from app.core.responses import dumps, trusted_rows
+
+def make_rows(count: int) -> List[dict]:
+    """Lignes au format renvoyé par PostgREST."""
+    start = datetime(2025, 1, 1, 8, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        ts = (start + timedelta(hours=i)).isoformat()
+        rows.append({
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "user_id": "11111111-1111-1111-1111-111111111111",
+            "meal_type": ["breakfast", "lunch", "dinner", "snack"][i % 4],
+            "food_name": f"Omelette au fromage {i}",
+            "brand": None,
+            "serving_size": "1 portion",
+            "quantity": 1.5,
+            "unit": "portion",
+            "calories": 420,
+            "protein": 18.25,
+            "carbohydrates": 6.1,
+            "total_fat": 38.0,
+            "saturated_fat": 12.4,
+            "fiber": 1.2,
+            "sugar": 0.8,
+            "sodium": 0.45,
+            "potassium": 0.3,
+            "net_carbs": 4.9,
+            "consumed_at": ts,
+            "notes": None,
+            "preparation_method": "poêlé",
+            "keto_score": 9,
+            "created_at": ts,
+            "updated_at": ts,
+        })
+    return rows
+
+def legacy_path(rows: List[dict], adapter: TypeAdapter) -> bytes:
+    meals = [Meal(**row) for row in rows]
+    # FastAPI re-validates the return value against response_model, then dumps it
+    validated = adapter.validate_python(meals, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def fast_path(rows: List[dict], adapter: TypeAdapter) -> bytes:
+    return dumps(trusted_rows(rows, Meal))
+
+def measure(func, rows, adapter, repeat: int) -> float:
+    func(rows, adapter)  # échauffement
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows, adapter)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = make_rows(count)
+    adapter = TypeAdapter(List[Meal])
+
+    legacy = measure(legacy_path, rows, adapter, repeat)
+    fast = measure(fast_path, rows, adapter, repeat)
+
+    print(f"{count} repas, meilleur de {repeat} essais")
+    print(f"  chemin historique : {legacy * 1000:8.2f} ms ({len(legacy_path(rows, adapter))} octets)")
+    print(f"  chemin rapide     : {fast * 1000:8.2f} ms ({len(fast_path(rows, adapter))} octets)")
+    print(f"  accélération      : x{legacy / fast:.1f}")
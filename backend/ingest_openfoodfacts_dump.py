@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Import de l'export OpenFoodFacts dans food_database
+Lit en flux l'export officiel (CSV ou JSONL compressé gzip), garde les produits
+vendus en France, Belgique, Suisse et Canada, les enrichit avec la même logique
+que l'API (score keto, qualité des données) et les écrit par lots.
+
+Un fichier de reprise enregistre la position après chaque lot écrit : relancer
+la même commande reprend l'import là où il s'était arrêté.
+
+Usage:
+    python ingest_openfoodfacts_dump.py en.openfoodfacts.org.products.csv.gz
+    python ingest_openfoodfacts_dump.py openfoodfacts-products.jsonl.gz --batch-size 2000
+    python ingest_openfoodfacts_dump.py --category-slugs
+"""
+
+import os
+import sys
+import csv
+import gzip
+import json
+import time
+import argparse
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database.food_repository import FoodRepository
+from integrations.openfoodfacts import OpenFoodFactsAPI
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTRIES = ("en:france", "en:belgium", "en:switzerland", "en:canada")
+
+# Colonnes nutritionnelles de l'export CSV reprises dans `nutriments`
+CSV_NUTRIMENTS = (
+    "energy-kcal_100g", "proteins_100g", "carbohydrates_100g", "fat_100g",
+    "fiber_100g", "sugars_100g", "sodium_100g",
+)
+
+UPSERT_ATTEMPTS = 3
+
+def open_dump(path: str):
+    """Ouvrir l'export en texte, décompressé à la volée si besoin"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".json")):
+        return "jsonl"
+    if name.endswith((".csv", ".tsv")):
+        return "csv"
+    raise ValueError(f"Format d'export non reconnu: {path} (attendu .csv[.gz] ou .jsonl[.gz])")
+
+def read_jsonl(stream, skip: int) -> Iterator[Optional[Dict[str, Any]]]:
+    """Produits de l'export JSONL (None pour une ligne illisible)"""
+    for index, line in enumerate(stream):
+        if index < skip:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def read_csv(stream, skip: int) -> Iterator[Optional[Dict[str, Any]]]:
+    """Produits de l'export CSV (tabulé), remis au format de l'API"""
+    # Certains champs (ingrédients, etc.) dépassent la limite par défaut du module csv
+    csv.field_size_limit(sys.maxsize)
+    reader = csv.DictReader(stream, delimiter="\t", quoting=csv.QUOTE_NONE)
+    for index, row in enumerate(reader):
+        if index < skip:
+            continue
+        row["countries_tags"] = (row.get("countries_tags") or "").split(",")
+        # Comme dans l'API, un nutriment non renseigné est absent (et non vide)
+        row["nutriments"] = {key: row[key] for key in CSV_NUTRIMENTS if row.get(key)}
+        yield row
+
+def sold_in(product: Dict[str, Any], countries: Tuple[str, ...]) -> bool:
+    tags = product.get("countries_tags") or []
+    return any(tag in countries for tag in tags)
+
+def load_checkpoint(path: str, source: str) -> Dict[str, Any]:
+    """Position de reprise pour cet export (recommence à zéro si l'export a changé)"""
+    if not os.path.exists(path):
+        return {"records": 0, "written": 0}
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != os.path.abspath(source):
+        logger.warning("Le fichier de reprise concerne un autre export, import depuis le début")
+        return {"records": 0, "written": 0}
+    return checkpoint
+
+def save_checkpoint(path: str, source: str, records: int, written: int) -> None:
+    """Écriture atomique : un arrêt brutal ne laisse jamais un fichier partiel"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({
+            "source": os.path.abspath(source),
+            "records": records,
+            "written": written,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, f)
+    os.replace(temporary, path)
+
+def upsert_batch(repository: FoodRepository, batch: List[Dict[str, Any]]) -> int:
+    """Écrire un lot, avec quelques tentatives en cas d'erreur réseau"""
+    for attempt in range(1, UPSERT_ATTEMPTS + 1):
+        try:
+            return repository.upsert_products(batch)
+        except Exception as e:
+            if attempt == UPSERT_ATTEMPTS:
+                raise
+            logger.warning(f"Écriture du lot échouée ({e}), nouvelle tentative {attempt + 1}/{UPSERT_ATTEMPTS}")
+            time.sleep(2 ** attempt)
+    return 0
+
+def ingest(args: argparse.Namespace) -> None:
+    countries = tuple(f"en:{c.strip()}" if ":" not in c else c.strip() for c in args.countries.split(","))
+    checkpoint_path = args.checkpoint or f"{args.dump}.checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path, args.dump) if not args.restart else {"records": 0, "written": 0}
+    records, written = checkpoint["records"], checkpoint["written"]
+    if records:
+        logger.info(f"Reprise après {records} enregistrements ({written} produits déjà écrits)")
+
+    enricher = OpenFoodFactsAPI()
+    repository = FoodRepository()
+    reader = read_jsonl if detect_format(args.dump) == "jsonl" else read_csv
+
+    # Fiches brutes en attente, enrichies d'un bloc au moment d'écrire le lot
+    pending: List[Dict[str, Any]] = []
+    kept = 0
+    started = time.perf_counter()
+
+    def flush() -> None:
+        nonlocal written, kept
+        # Sans calories ni glucides le score keto est incalculable : produit inutile ici
+        batch = [
+            enriched for enriched in enricher.enrich_products(pending)
+            if enriched and enriched["product_name"] and enriched["keto_score"] is not None
+        ]
+        if args.limit:
+            batch = batch[:max(args.limit - kept, 0)]
+        kept += len(batch)
+        if batch and not args.dry_run:
+            written += upsert_batch(repository, batch)
+        pending.clear()
+
+    with open_dump(args.dump) as stream:
+        for product in reader(stream, records):
+            records += 1
+            if product and sold_in(product, countries) and product.get("code"):
+                # Beaucoup de fiches n'ont que le nom localisé
+                product["product_name"] = product.get("product_name") or product.get("product_name_fr") or ""
+                pending.append(product)
+
+            if len(pending) >= args.batch_size:
+                flush()
+                if not args.dry_run:
+                    save_checkpoint(checkpoint_path, args.dump, records, written)
+                rate = records / max(time.perf_counter() - started, 1e-6)
+                logger.info(f"{records} enregistrements lus, {written} produits écrits ({rate:.0f} enr./s)")
+
+            if args.limit and kept >= args.limit:
+                break
+
+    flush()
+    if not args.dry_run:
+        save_checkpoint(checkpoint_path, args.dump, records, written)
+
+    logger.info(f"✅ Import terminé : {records} enregistrements lus, {kept} retenus, {written} produits écrits")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Importer l'export OpenFoodFacts dans food_database")
+    parser.add_argument("dump", nargs="?", help="Export OFF (.csv.gz tabulé ou .jsonl.gz)")
+    parser.add_argument("--countries", default=",".join(c.split(":")[1] for c in DEFAULT_COUNTRIES),
+                        help="Pays à garder, séparés par des virgules (tags OFF, ex. france,belgium)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Produits par écriture (défaut: 1000)")
+    parser.add_argument("--checkpoint", help="Fichier de reprise (défaut: <export>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignorer le fichier de reprise existant")
+    parser.add_argument("--limit", type=int, default=0, help="Arrêter après N produits retenus (tests)")
+    parser.add_argument("--dry-run", action="store_true", help="Lire et enrichir sans rien écrire")
+    parser.add_argument("--category-slugs", action="store_true",
+                        help="Recalculer category_slugs des produits déjà en base, sans import")
+    args = parser.parse_args()
+
+    if args.category_slugs:
+        updated = FoodRepository().backfill_category_slugs(args.batch_size)
+        logger.info(f"✅ category_slugs recalculés pour {updated} produits")
+        return
+    if not args.dump:
+        parser.error("export OFF manquant")
+
+    try:
+        ingest(args)
+    except KeyboardInterrupt:
+        logger.warning("Import interrompu : relancer la même commande pour reprendre")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,32 +3,177 @@ OpenFoodFacts API Integration
 Intégration pour rechercher et enrichir les données alimentaires
 """
 
-import requests
+import math
+import asyncio
+import httpx
+import numpy as np
+import orjson
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from cachetools import TTLCache
+
+from app.config import settings
+from app.database.food_repository import FoodRepository, food_repository
+from app.foods.alternatives import keto_alternatives
+from app.foods.barcodes import canonical_barcode
+from app.foods.dietary import matches, product_flags, tag_key
+from app.foods.category_index import CATEGORY_INDEX_COLUMNS, CategoryIndex, SortKey, sort_key
+from app.foods.compact_product import CompactProductCache, compact_products, expand_products
+from app.foods.freshness import is_stale, next_run, refresh_order
+from app.foods.keto_scoring import QUALITY_POINTS, column, keto_scores, quality_scores
+from app.foods.nutrient_index import NUTRIENT_INDEX_COLUMNS, NutrientIndex
+from app.foods.search_index import FoodSearchIndex, INDEX_COLUMNS
+from app.foods.suggest_index import SuggestIndex, add_food_use_listener
+from app.foods.text import fold_text
+from integrations.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_SCAN, RateLimited, RequestScheduler
+)
 
 logger = logging.getLogger(__name__)
 
+class OpenFoodFactsError(Exception):
+    """Échec de communication avec OpenFoodFacts (réseau, HTTP, réponse invalide)"""
+    pass
+
+class OpenFoodFactsThrottled(OpenFoodFactsError):
+    """Débit OpenFoodFacts épuisé (chez nous ou HTTP 429) : réessayer plus tard"""
+    
+    def __init__(self, retry_after: float):
+        super().__init__(f"OpenFoodFacts saturé, réessayer dans {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+# Débits partagés par tout le processus, un par famille d'endpoints OFF
+OFF_SCHEDULERS = {
+    "product": RequestScheduler("OFF produits", settings.off_product_rate_per_minute, burst=10),
+    "search": RequestScheduler("OFF recherche", settings.off_search_rate_per_minute, burst=3),
+}
+
 class OpenFoodFactsAPI:
     """Client pour l'API OpenFoodFacts"""
     
     BASE_URL = "https://world.openfoodfacts.org"
     SEARCH_URL = f"{BASE_URL}/cgi/search.pl"
-    PRODUCT_URL = f"{BASE_URL}/api/v0/product"
+    PRODUCT_URL = f"{BASE_URL}/api/v2/product"
+    USER_AGENT = 'KetoSansStress/1.0 (https://ketosansstress.fr; support@ketosansstress.fr)'
+    
+    # Délais séparés : une connexion lente échoue vite, une réponse lente a plus de marge
+    CONNECT_TIMEOUT = 3.0
+    READ_TIMEOUT = 10.0
+    POOL_TIMEOUT = 5.0
+    
+    # Pool de connexions partagé et nombre max de requêtes simultanées par hôte
+    MAX_CONNECTIONS = 20
+    MAX_KEEPALIVE_CONNECTIONS = 10
+    MAX_CONCURRENCY_PER_HOST = 8
+    
+    # Attente imposée après un 429 sans en-tête Retry-After exploitable
+    DEFAULT_RETRY_AFTER = 60.0
+    
+    # Seuls champs lus par l'enrichissement : la fiche complète (traductions,
+    # images, emballages...) pèse souvent des centaines de Ko
+    PRODUCT_FIELDS = (
+        'code', 'product_name', 'brands', 'categories', 'labels', 'allergens',
+        'nutriments', 'ingredients_text', 'image_url',
+    )
+    
+    # Taille maximale des réponses lues (au-delà, la réponse est abandonnée)
+    MAX_PRODUCT_BYTES = 256 * 1024
+    MAX_SEARCH_BYTES = 4 * 1024 * 1024
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'KetoSansStress/1.0 (https://ketosansstress.fr; support@ketosansstress.fr)'
-        })
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
     
-    def search_products(self, 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client HTTP asynchrone partagé (créé à la première utilisation)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={'User-Agent': self.USER_AGENT},
+                timeout=httpx.Timeout(
+                    self.READ_TIMEOUT,
+                    connect=self.CONNECT_TIMEOUT,
+                    pool=self.POOL_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.MAX_CONNECTIONS,
+                    max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS
+                ),
+                follow_redirects=True
+            )
+        return self._client
+    
+    async def _get_json(self,
+                        url: str,
+                        params: Optional[Dict[str, Any]] = None,
+                        family: str = "product",
+                        priority: int = PRIORITY_INTERACTIVE,
+                        max_bytes: int = MAX_PRODUCT_BYTES) -> Any:
+        """
+        GET JSON soumis au débit de sa famille d'endpoints, limité en concurrence par hôte
+        
+        Le corps est lu en flux et abandonné dès qu'il dépasse max_bytes, puis
+        décodé avec orjson.
+        
+        Raises:
+            OpenFoodFactsThrottled: si le débit ne permet pas d'envoyer la requête
+                à temps, ou si OpenFoodFacts répond 429
+            OpenFoodFactsError: si la réponse dépasse max_bytes
+            httpx.HTTPError, ValueError: erreur HTTP ou JSON invalide
+        """
+        scheduler = OFF_SCHEDULERS[family]
+        if priority >= PRIORITY_BACKGROUND:
+            timeout = settings.off_background_queue_timeout_seconds
+        else:
+            timeout = settings.off_queue_timeout_seconds
+        try:
+            await scheduler.acquire(priority, timeout)
+        except RateLimited as e:
+            raise OpenFoodFactsThrottled(e.retry_after) from e
+        
+        host = httpx.URL(url).host
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.MAX_CONCURRENCY_PER_HOST)
+        
+        async with semaphore:
+            async with self.client.stream("GET", url, params=params) as response:
+                if response.status_code == 429:
+                    retry_after = self._retry_after(response)
+                    scheduler.pause(retry_after)
+                    raise OpenFoodFactsThrottled(retry_after)
+                response.raise_for_status()
+                
+                if int(response.headers.get('content-length') or 0) > max_bytes:
+                    raise OpenFoodFactsError(f"Réponse trop volumineuse ({response.headers['content-length']} octets)")
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > max_bytes:
+                        raise OpenFoodFactsError(f"Réponse trop volumineuse (plus de {max_bytes} octets)")
+        return orjson.loads(body)
+    
+    def _retry_after(self, response: httpx.Response) -> float:
+        """Délai demandé par l'en-tête Retry-After (en secondes uniquement)"""
+        try:
+            return max(1.0, float(response.headers.get('retry-after', '')))
+        except ValueError:
+            return self.DEFAULT_RETRY_AFTER
+    
+    async def aclose(self) -> None:
+        """Fermer le pool de connexions"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def search_products(self, 
                        query: str, 
                        country: str = "france",
                        language: str = "fr",
-                       limit: int = 20) -> List[Dict[str, Any]]:
+                       limit: int = 20,
+                       priority: int = PRIORITY_INTERACTIVE) -> List[Dict[str, Any]]:
         """
         Rechercher des produits par nom
         
@@ -37,9 +182,13 @@ class OpenFoodFactsAPI:
             country: Pays de recherche (france par défaut)
             language: Langue des résultats (fr par défaut)
             limit: Nombre maximum de résultats
+            priority: Priorité dans la file du débit de recherche
         
         Returns:
             Liste des produits trouvés
+        
+        Raises:
+            OpenFoodFactsThrottled: si le débit de recherche est épuisé
         """
         try:
             params = {
@@ -49,30 +198,28 @@ class OpenFoodFactsAPI:
                 'json': 1,
                 'page_size': limit,
                 'countries': country,
-                'fields': 'code,product_name,brands,categories,nutriments,ingredients_text,image_url,keto_score'
+                'fields': ','.join(self.PRODUCT_FIELDS)
             }
             
-            response = self.session.get(self.SEARCH_URL, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = await self._get_json(
+                self.SEARCH_URL, params=params, family="search", priority=priority,
+                max_bytes=self.MAX_SEARCH_BYTES
+            )
             products = data.get('products', [])
             
-            # Filtrer et enrichir les produits
-            enriched_products = []
-            for product in products:
-                enriched = self._enrich_product_data(product)
-                if enriched:
-                    enriched_products.append(enriched)
+            # Filtrer et enrichir les produits (en un seul lot)
+            enriched_products = [enriched for enriched in self.enrich_products(products) if enriched]
             
             logger.info(f"Trouvé {len(enriched_products)} produits pour '{query}'")
             return enriched_products
             
+        except OpenFoodFactsThrottled:
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la recherche OpenFoodFacts: {e}")
             return []
     
-    def get_product_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
+    async def get_product_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
         """
         Récupérer un produit par son code-barres
         
@@ -83,24 +230,51 @@ class OpenFoodFactsAPI:
             Données du produit ou None si non trouvé
         """
         try:
-            url = f"{self.PRODUCT_URL}/{barcode}.json"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if data.get('status') == 1 and 'product' in data:
-                enriched = self._enrich_product_data(data['product'])
-                logger.info(f"Produit trouvé pour le code-barres {barcode}")
-                return enriched
-            else:
-                logger.warning(f"Aucun produit trouvé pour le code-barres {barcode}")
-                return None
-                
+            return await self.fetch_product(barcode)
+        except OpenFoodFactsThrottled:
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du produit {barcode}: {e}")
             return None
     
+    async def fetch_product(self, barcode: str, priority: int = PRIORITY_SCAN) -> Optional[Dict[str, Any]]:
+        """
+        Comme get_product_by_barcode, mais distingue "produit inconnu" d'une erreur
+        
+        Returns:
+            Données du produit, ou None si OpenFoodFacts ne connaît pas ce code
+        
+        Raises:
+            OpenFoodFactsThrottled: si le débit produits est épuisé
+            OpenFoodFactsError: si OpenFoodFacts n'a pas pu répondre
+        """
+        code = canonical_barcode(barcode)
+        if code is None:
+            # Inutile d'interroger OFF pour un code à la clé de contrôle fausse
+            logger.warning(f"Code-barres invalide ignoré: {barcode!r}")
+            return None
+        barcode = code
+        url = f"{self.PRODUCT_URL}/{barcode}.json"
+        try:
+            data = await self._get_json(
+                url, params={'fields': ','.join(self.PRODUCT_FIELDS)}, family="product", priority=priority
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Aucun produit trouvé pour le code-barres {barcode}")
+                return None
+            raise OpenFoodFactsError(str(e)) from e
+        except (httpx.HTTPError, ValueError) as e:
+            raise OpenFoodFactsError(str(e)) from e
+        
+        if data.get('status') == 1 and 'product' in data:
+            enriched = self._enrich_product_data(data['product'])
+            logger.info(f"Produit trouvé pour le code-barres {barcode}")
+            return enriched
+        
+        logger.warning(f"Aucun produit trouvé pour le code-barres {barcode}")
+        return None
+    
     def _enrich_product_data(self, product: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Enrichir les données d'un produit avec calculs spécifiques au keto
@@ -116,13 +290,8 @@ class OpenFoodFactsAPI:
             nutriments = product.get('nutriments', {})
             
             # Extraire les informations nutritionnelles pour 100g
-            calories_100g = self._safe_float(nutriments.get('energy-kcal_100g'))
-            protein_100g = self._safe_float(nutriments.get('proteins_100g'))
-            carbs_100g = self._safe_float(nutriments.get('carbohydrates_100g'))
-            fat_100g = self._safe_float(nutriments.get('fat_100g'))
-            fiber_100g = self._safe_float(nutriments.get('fiber_100g', 0))
-            sugar_100g = self._safe_float(nutriments.get('sugars_100g', 0))
-            sodium_100g = self._safe_float(nutriments.get('sodium_100g', 0))
+            (calories_100g, protein_100g, carbs_100g, fat_100g,
+             fiber_100g, sugar_100g, sodium_100g) = self._extract_nutrition(nutriments)
             
             # Calculer les glucides nets
             net_carbs_100g = max(0, carbs_100g - fiber_100g) if carbs_100g is not None else None
@@ -130,59 +299,147 @@ class OpenFoodFactsAPI:
             # Calculer le score keto
             keto_score = self._calculate_keto_score(calories_100g, carbs_100g, fat_100g, fiber_100g)
             
-            # Déterminer la compatibilité keto
-            is_keto_friendly = keto_score >= 7 if keto_score else False
-            
             # Score de qualité des données
             data_quality = self._calculate_data_quality(product, nutriments)
             
-            enriched_product = {
-                'openfoodfacts_id': product.get('code', ''),
-                'barcode': product.get('code', ''),
-                'product_name': product.get('product_name', '').strip(),
-                'brand': product.get('brands', '').split(',')[0].strip() if product.get('brands') else None,
-                
-                # Nutritionnel pour 100g
-                'calories_per_100g': calories_100g,
-                'protein_per_100g': protein_100g,
-                'carbohydrates_per_100g': carbs_100g,
-                'fat_per_100g': fat_100g,
-                'fiber_per_100g': fiber_100g,
-                'sugar_per_100g': sugar_100g,
-                'sodium_per_100g': sodium_100g,
-                'net_carbs_per_100g': net_carbs_100g,
-                
-                # Métadonnées du produit
-                'categories': self._parse_categories(product.get('categories', '')),
-                'labels': self._parse_labels(product.get('labels', '')),
-                'allergens': self._parse_allergens(product.get('allergens', '')),
-                'ingredients_text': product.get('ingredients_text', ''),
-                'image_url': product.get('image_url', ''),
-                
-                # Compatibilité keto
-                'keto_score': keto_score,
-                'is_keto_friendly': is_keto_friendly,
-                
-                # Qualité des données
-                'data_source': 'openfoodfacts',
-                'data_quality_score': data_quality,
-                'last_updated': datetime.utcnow().isoformat(),
-            }
-            
-            return enriched_product
+            return self._build_record(
+                product,
+                (calories_100g, protein_100g, carbs_100g, fat_100g,
+                 fiber_100g, sugar_100g, sodium_100g, net_carbs_100g),
+                keto_score,
+                data_quality
+            )
             
         except Exception as e:
             logger.error(f"Erreur lors de l'enrichissement du produit: {e}")
             return None
     
+    def enrich_products(self, products: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Enrichir un lot de produits en une passe vectorisée
+        
+        Même résultat que _enrich_product_data appelé produit par produit, mais
+        scores keto et qualité sont calculés sur des colonnes NumPy.
+        
+        Args:
+            products: Données brutes des produits OpenFoodFacts
+        
+        Returns:
+            Produits enrichis, None à la position des produits inexploitables
+        """
+        if not products:
+            return []
+        
+        nutrition: List[Optional[tuple]] = []
+        present: List[bool] = []
+        for product in products:
+            nutriments = product.get('nutriments', {})
+            try:
+                values = self._extract_nutrition(nutriments)
+            except AttributeError:
+                nutrition.append(None)
+                present.extend((False,) * len(QUALITY_POINTS))
+                continue
+            nutrition.append(values)
+            present.extend((
+                bool(product.get('product_name')), bool(product.get('brands')),
+                bool(nutriments.get('energy-kcal_100g')), bool(nutriments.get('proteins_100g')),
+                bool(nutriments.get('carbohydrates_100g')), bool(nutriments.get('fat_100g')),
+                bool(nutriments.get('fiber_100g')), bool(product.get('image_url')),
+            ))
+        
+        # Une passe NumPy pour les scores de tout le lot
+        known = [values or (None,) * 7 for values in nutrition]
+        calories, _, carbs, fat, fiber, _, _ = (column(values) for values in zip(*known))
+        scores, valid = keto_scores(calories, carbs, fat, fiber)
+        flags = np.array(present, dtype=bool).reshape(len(products), len(QUALITY_POINTS))
+        qualities = quality_scores(flags).tolist()
+        scores, valid = scores.tolist(), valid.tolist()
+        last_updated = datetime.utcnow().isoformat()
+        
+        enriched: List[Optional[Dict[str, Any]]] = []
+        for index, product in enumerate(products):
+            values = nutrition[index]
+            try:
+                carbs_100g, fiber_100g = values[2], values[4]
+                net_carbs_100g = max(0, carbs_100g - fiber_100g) if carbs_100g is not None else None
+                keto_score = scores[index] if valid[index] else None
+                enriched.append(self._build_record(
+                    product, (*values, net_carbs_100g), keto_score, qualities[index], last_updated
+                ))
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enrichissement du produit: {e}")
+                enriched.append(None)
+        return enriched
+    
+    def _extract_nutrition(self, nutriments: Dict[str, Any]) -> tuple:
+        """Calories, protéines, glucides, lipides, fibres, sucres et sodium pour 100g"""
+        return (
+            self._safe_float(nutriments.get('energy-kcal_100g')),
+            self._safe_float(nutriments.get('proteins_100g')),
+            self._safe_float(nutriments.get('carbohydrates_100g')),
+            self._safe_float(nutriments.get('fat_100g')),
+            self._safe_float(nutriments.get('fiber_100g', 0)),
+            self._safe_float(nutriments.get('sugars_100g', 0)),
+            self._safe_float(nutriments.get('sodium_100g', 0)),
+        )
+    
+    def _build_record(self,
+                      product: Dict[str, Any],
+                      nutrition: tuple,
+                      keto_score: Optional[int],
+                      data_quality: float,
+                      last_updated: Optional[str] = None) -> Dict[str, Any]:
+        """Produit enrichi à partir des valeurs nutritionnelles et scores déjà calculés"""
+        (calories_100g, protein_100g, carbs_100g, fat_100g,
+         fiber_100g, sugar_100g, sodium_100g, net_carbs_100g) = nutrition
+        
+        # Déterminer la compatibilité keto
+        is_keto_friendly = keto_score >= 7 if keto_score else False
+        
+        return {
+            'openfoodfacts_id': product.get('code', ''),
+            # Clé canonique (UPC-A et EAN-13 confondus), le code OFF brut si invalide
+            'barcode': canonical_barcode(product.get('code', '')) or product.get('code', ''),
+            'product_name': product.get('product_name', '').strip(),
+            'brand': product.get('brands', '').split(',')[0].strip() if product.get('brands') else None,
+            
+            # Nutritionnel pour 100g
+            'calories_per_100g': calories_100g,
+            'protein_per_100g': protein_100g,
+            'carbohydrates_per_100g': carbs_100g,
+            'fat_per_100g': fat_100g,
+            'fiber_per_100g': fiber_100g,
+            'sugar_per_100g': sugar_100g,
+            'sodium_per_100g': sodium_100g,
+            'net_carbs_per_100g': net_carbs_100g,
+            
+            # Métadonnées du produit
+            'categories': self._parse_categories(product.get('categories', '')),
+            'labels': self._parse_labels(product.get('labels', '')),
+            'allergens': self._parse_allergens(product.get('allergens', '')),
+            'ingredients_text': product.get('ingredients_text', ''),
+            'image_url': product.get('image_url', ''),
+            
+            # Compatibilité keto
+            'keto_score': keto_score,
+            'is_keto_friendly': is_keto_friendly,
+            
+            # Qualité des données
+            'data_source': 'openfoodfacts',
+            'data_quality_score': data_quality,
+            'last_updated': last_updated or datetime.utcnow().isoformat(),
+        }
+    
     def _safe_float(self, value: Any) -> Optional[float]:
-        """Conversion sécurisée en float"""
+        """Conversion sécurisée en float (« nan » ou infini : valeur inconnue)"""
         if value is None or value == '':
             return None
         try:
-            return float(value)
+            number = float(value)
         except (ValueError, TypeError):
             return None
+        return number if math.isfinite(number) else None
     
     def _calculate_keto_score(self, 
                             calories: Optional[float],
@@ -310,53 +567,689 @@ class OpenFoodFactsAPI:
 
 
 # Service de recherche avancée
+def normalize_query(query: str) -> str:
+    """Clé de cache d'une recherche : minuscules, sans accents ni espaces superflus"""
+    return fold_text(query)
+
+
 class FoodSearchService:
     """Service de recherche d'aliments avec cache et intelligence"""
     
-    def __init__(self):
+    def __init__(self, repository: Optional[FoodRepository] = None):
         self.openfoodfacts = OpenFoodFactsAPI()
+        self.repository = repository or food_repository
+        
+        # Niveau 1 : LRU borné en mémoire avec TTL, clé = requête normalisée ;
+        # produits rangés sous forme compacte (voir app.foods.compact_product)
+        self._search_cache: TTLCache = TTLCache(
+            maxsize=settings.food_search_cache_size,
+            ttl=settings.food_search_cache_ttl_seconds
+        )
+        
+        # Codes-barres : produits résolus et codes inconnus récents (cache négatif)
+        self._barcode_cache = CompactProductCache(
+            maxsize=settings.barcode_cache_size,
+            ttl=settings.barcode_cache_ttl_seconds
+        )
+        self._unknown_barcodes: TTLCache = TTLCache(
+            maxsize=settings.barcode_cache_size,
+            ttl=settings.barcode_negative_ttl_seconds
+        )
+        self._barcode_lookups: Dict[str, asyncio.Task] = {}
+        self._background_tasks: Set[asyncio.Task] = set()
+        
+        # Fraîcheur : scans comptés en mémoire puis écrits par lots, rafraîchissements
+        # récents (en cours ou tentés) pour ne pas relancer OFF à chaque scan
+        self._scan_counts: Counter = Counter()
+        self._refresh_attempts: TTLCache = TTLCache(
+            maxsize=settings.barcode_cache_size,
+            ttl=settings.barcode_negative_ttl_seconds
+        )
+        
+        # Index locaux de food_database (plein texte, autocomplétion, valeurs nutritionnelles),
+        # tenus à jour à chaque écriture
+        self.local_index = FoodSearchIndex()
+        self.suggest_index = SuggestIndex()
+        self.nutrient_index = NutrientIndex()
+        self.category_index = CategoryIndex()
+        self._index_backlog: Optional[List[Dict[str, Any]]] = None
+        self._product_listeners: List[Callable[[List[Dict[str, Any]]], None]] = [self._index_products]
+        # Repas enregistrés : popularité des noms dans l'autocomplétion
+        add_food_use_listener(lambda name: self.suggest_index.record_use(name))
+    
+    def _spawn(self, coro) -> None:
+        """Lancer une tâche d'arrière-plan en gardant une référence"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    def add_product_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Être prévenu des produits écrits dans food_database (index locaux)"""
+        self._product_listeners.append(listener)
+    
+    def _index_products(self, products: List[Dict[str, Any]]) -> None:
+        if self._index_backlog is not None:
+            # Chargement en cours : rejoués une fois le nouvel index en place
+            self._index_backlog.extend(products)
+        self.local_index.add_many(products)
+        self.nutrient_index.add_many(products)
+        self.category_index.add_many(products)
+        for product in products:
+            self.suggest_index.add(product)
+    
+    async def load_local_index(self) -> None:
+        """Construire les index locaux depuis food_database (démarrage)"""
+        self._index_backlog = []
+        try:
+            def build():
+                rows = list(self.repository.scan_products(
+                    (*INDEX_COLUMNS, *NUTRIENT_INDEX_COLUMNS, *CATEGORY_INDEX_COLUMNS)
+                ))
+                return (FoodSearchIndex.build(rows), SuggestIndex.build(rows),
+                        NutrientIndex.build(rows), CategoryIndex.build(rows))
+            
+            index, suggest_index, nutrient_index, category_index = await asyncio.to_thread(build)
+            index.add_many(self._index_backlog)
+            nutrient_index.add_many(self._index_backlog)
+            category_index.add_many(self._index_backlog)
+            for product in self._index_backlog:
+                suggest_index.add(product)
+            self.local_index, self.suggest_index = index, suggest_index
+            self.nutrient_index, self.category_index = nutrient_index, category_index
+            logger.info(f"Index local des aliments chargé ({len(index)} produits, {len(suggest_index)} noms)")
+        except Exception as e:
+            logger.warning(f"Index local des aliments indisponible: {e}")
+        finally:
+            self._index_backlog = None
+    
+    async def _search_local(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Recherche dans l'index local (éventuellement moins que la page demandée)"""
+        hits = self.local_index.search(query, limit)
+        return await self._products_for([barcode for barcode, _ in hits]) if hits else []
+    
+    async def _search_fuzzy(self,
+                            query: str,
+                            limit: int,
+                            include: int = 0,
+                            exclude: int = 0) -> List[Dict[str, Any]]:
+        """Repli tolérant aux fautes de frappe sur l'index local (« brocolli » → brocoli)"""
+        hits = self.local_index.fuzzy_search(
+            query, limit, settings.food_fuzzy_budget_ms / 1000, include=include, exclude=exclude
+        )
+        if not hits:
+            return []
+        logger.info(f"Recherche approximative pour '{query}': {len(hits)} résultat(s)")
+        return await self._products_for([barcode for barcode, _ in hits])
+    
+    async def _products_for(self, barcodes: List[str]) -> List[Dict[str, Any]]:
+        """Produits complets des codes-barres, dans l'ordre, depuis le cache puis food_database"""
+        # Une seule lecture par code : une entrée peut expirer entre deux accès au TTLCache
+        products = {}
+        for code in barcodes:
+            product = self._barcode_cache.get(code)
+            if product is not None:
+                products[code] = product
+        missing = [code for code in barcodes if code not in products]
+        if missing:
+            products.update(await asyncio.to_thread(self.repository.get_by_barcodes, missing))
+        return [products[code] for code in barcodes if code in products]
+    
+    async def filter_foods(self,
+                           ranges: Dict[str, Tuple[float, float]],
+                           categories: Sequence[str] = (),
+                           include: int = 0,
+                           exclude: int = 0,
+                           sort: str = "keto_score",
+                           descending: bool = True,
+                           limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Produits du catalogue local selon leurs valeurs nutritionnelles
+        
+        Voir NutrientIndex.query pour les paramètres.
+        
+        Returns:
+            Les produits classés, et le nombre total de produits correspondants
+        """
+        barcodes, total = self.nutrient_index.query(
+            ranges, categories, include, exclude, sort=sort, descending=descending, limit=limit
+        )
+        return await self._products_for(barcodes), total
+    
+    async def browse_category(self,
+                              slug: str,
+                              limit: int = 20,
+                              after: Optional[SortKey] = None
+                              ) -> Optional[Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], Optional[SortKey]]]:
+        """
+        Produits d'une catégorie par score keto, page par page
+        
+        Servie par l'index des catégories ; s'il n'est pas chargé, par
+        food_database (index GIN sur les slugs). Jamais par OpenFoodFacts.
+        
+        Args:
+            slug: Catégorie (voir app.foods.dietary.tag_key)
+            after: Clé de tri du dernier produit de la page précédente
+        
+        Returns:
+            (description de la catégorie ou None hors index, produits, clé de la page suivante),
+            ou None pour une catégorie inconnue
+        """
+        slug = tag_key(slug)
+        if slug in self.category_index:
+            barcodes, following = self.category_index.page(slug, limit, after)
+            return self.category_index.node(slug), await self._products_for(barcodes), following
+        if len(self.category_index):
+            return None
+        
+        # Index pas (encore) chargé : page lue directement dans food_database
+        cursor = None
+        if after is not None:
+            cursor = (None if after[0] == float("inf") else -after[0], after[1])
+        products = await asyncio.to_thread(self.repository.list_by_category, slug, limit + 1, cursor)
+        if not products:
+            return None
+        following = None
+        if len(products) > limit:
+            products = products[:limit]
+            following = sort_key(products[-1].get('keto_score'), products[-1]['barcode'])
+        return None, products, following
+    
+    async def find_keto_alternatives(self,
+                                     barcode: str,
+                                     limit: int = 5) -> Optional[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Alternatives keto les plus proches d'un produit, dans sa catégorie
+        
+        Le produit est résolu comme un scan (cache, food_database, OFF) ; ses
+        voisins viennent du catalogue local (voir app.foods.alternatives).
         
-    def search_foods(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        Returns:
+            (produit, distance) du plus proche au plus lointain, ou None si le produit est inconnu
+        """
+        code = canonical_barcode(barcode)
+        if code is None:
+            return None
+        product = self._barcode_cache.get(code) or await self.get_food_by_barcode(code)
+        if product is None:
+            return None
+        hits = keto_alternatives(self.nutrient_index, product, limit)
+        products = {p['barcode']: p for p in await self._products_for([code for code, _ in hits])}
+        return [(products[code], distance) for code, distance in hits if code in products]
+    
+    async def search_foods_filtered(self,
+                                    query: str,
+                                    limit: int,
+                                    include: int = 0,
+                                    exclude: int = 0) -> List[Dict[str, Any]]:
+        """
+        Recherche limitée aux produits ayant les critères `include` et aucun de `exclude`
+        
+        Le filtre s'applique d'abord sur les masques de l'index local ; si la
+        page n'est pas pleine, les résultats de la recherche exacte habituelle
+        (dont OpenFoodFacts) sont filtrés à leur tour. Les fautes de frappe ne
+        sont corrigées que si rien n'est trouvé, sans mise en cache.
+        
+        Args:
+            include, exclude: Masques de critères (voir app.foods.dietary)
+        """
+        if not include and not exclude:
+            return await self.search_foods(query, limit)
+        query_key = normalize_query(query)
+        if not query_key:
+            return []
+        cache_key = f"{query_key}#{include:x}-{exclude:x}"
+        cached = self._search_cache.get(cache_key)
+        if cached is not None and cached[0] >= limit:
+            return expand_products(cached[1][:limit])
+        
+        hits = self.local_index.search(query, limit, include=include, exclude=exclude)
+        results = await self._products_for([barcode for barcode, _ in hits]) if hits else []
+        throttled = None
+        
+        if len(results) < limit:
+            try:
+                exact = await self._search_exact(query, query_key, limit)
+            except OpenFoodFactsThrottled as e:
+                throttled, exact = e, []
+            except Exception as e:
+                logger.error(f"Erreur lors de la recherche d'aliments: {e}")
+                exact = []
+            seen = {product.get('barcode') for product in results}
+            for product in exact:
+                if product.get('barcode') not in seen and matches(product_flags(product), include, exclude):
+                    results.append(product)
+            results = results[:limit]
+        
+        if not results:
+            corrected = await self._search_fuzzy(query, limit, include, exclude)
+            if throttled is not None and not corrected:
+                raise throttled
+            return corrected
+        # Page complétée faute de débit OFF : à refaire plus tard
+        if throttled is None:
+            self._search_cache[cache_key] = (limit, compact_products(results))
+        return results
+    
+    async def search_foods(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
         """
         Rechercher des aliments avec plusieurs sources
         
+        Ordre de consultation : cache mémoire, index local de food_database,
+        recherches persistées, puis OpenFoodFacts en direct pour compléter une
+        page que l'index local ne remplit pas. Les fautes de frappe ne sont
+        corrigées (index local) que si aucune de ces sources ne trouve rien,
+        ou si OFF est saturé.
+        
         Args:
             query: Terme de recherche
             limit: Nombre maximum de résultats
         
         Returns:
             Liste des aliments trouvés, triés par pertinence et score keto
+        
+        Raises:
+            OpenFoodFactsThrottled: si OFF est saturé et que rien ne peut être servi localement
         """
+        query_key = normalize_query(query)
+        if not query_key:
+            return []
+        
         try:
-            # Recherche OpenFoodFacts
-            off_results = self.openfoodfacts.search_products(query, limit=limit)
-            
-            # TODO: Ajouter d'autres sources (base locale, etc.)
-            
-            # Trier par score keto et qualité des données
-            sorted_results = sorted(
-                off_results,
-                key=lambda x: (
-                    x.get('keto_score') or 0,
-                    x.get('data_quality_score') or 0,
-                    1 if x.get('product_name', '').lower().find(query.lower()) != -1 else 0
-                ),
-                reverse=True
-            )
+            try:
+                results = await self._search_exact(query, query_key, limit)
+            except OpenFoodFactsThrottled:
+                # OFF saturé et rien en local : une correction vaut mieux qu'un refus
+                corrected = await self._search_fuzzy(query, limit)
+                if corrected:
+                    return corrected
+                raise
             
-            return sorted_results[:limit]
+            # Rien trouvé tel quel : peut-être une faute de frappe. La correction
+            # n'est pas mise en cache sous la forme tapée
+            return results or await self._search_fuzzy(query, limit)
             
+        except OpenFoodFactsThrottled:
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la recherche d'aliments: {e}")
             return []
     
-    def get_food_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
-        """Récupérer un aliment par code-barres"""
+    async def _search_exact(self, query: str, query_key: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Recherche sans correction : cache mémoire, index local, recherches
+        persistées puis OpenFoodFacts
+        
+        Raises:
+            OpenFoodFactsThrottled: si OFF est saturé et que l'index local ne trouve rien
+        """
+        # Niveau 1 : cache mémoire
+        cached = self._search_cache.get(query_key)
+        if cached is not None and cached[0] >= limit:
+            return expand_products(cached[1][:limit])
+        
+        # Index local : aucune requête réseau quand le catalogue est importé
+        local = await self._search_local(query, limit)
+        if len(local) >= limit:
+            self._search_cache[query_key] = (limit, compact_products(local))
+            return local
+        
+        # Niveau 2 : résultats persistés (survivent aux redémarrages)
+        persisted = await self._load_persisted_search(query_key, limit)
+        if persisted is not None:
+            seen = {product.get('barcode') for product in local}
+            return (local + [product for product in persisted if product.get('barcode') not in seen])[:limit]
+        
+        # Recherche OpenFoodFacts
+        try:
+            off_results = await self.openfoodfacts.search_products(query, limit=limit)
+        except OpenFoodFactsThrottled:
+            # OFF saturé : des résultats locaux incomplets valent mieux qu'un refus
+            if local:
+                return local
+            raise
+        
+        # Trier par score keto et qualité des données, après les résultats locaux
+        seen = {product.get('barcode') for product in local}
+        sorted_results = (local + sorted(
+            (product for product in off_results if product.get('barcode') not in seen),
+            key=lambda x: (
+                x.get('keto_score') or 0,
+                x.get('data_quality_score') or 0,
+                1 if x.get('product_name', '').lower().find(query.lower()) != -1 else 0
+            ),
+            reverse=True
+        ))[:limit]
+        
+        # Une liste vide peut venir d'une erreur OFF : pas de mise en cache
+        if sorted_results:
+            self._search_cache[query_key] = (limit, compact_products(sorted_results))
+            self._spawn(self._persist_search(query_key, sorted_results, limit))
+        return sorted_results
+    
+    async def search_foods_many(self,
+                                queries: List[str],
+                                limit: int,
+                                concurrency: int,
+                                budget: float) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lancer plusieurs recherches en parallèle dans un budget de latence
+        
+        Les requêtes déjà en cache mémoire sont servies immédiatement ; les
+        autres partent en parallèle (au plus `concurrency` à la fois). Les
+        recherches qui dépassent le budget sont annulées et absentes du
+        résultat.
+        
+        Returns:
+            Résultats par requête d'origine, pour les recherches terminées à temps
+            (une recherche refusée faute de débit OFF est absente, comme une tardive)
+        """
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        pending: Dict[str, List[str]] = {}
+        for query in queries:
+            query_key = normalize_query(query)
+            cached = self._search_cache.get(query_key)
+            if not query_key:
+                results[query] = []
+            elif cached is not None and cached[0] >= limit:
+                results[query] = expand_products(cached[1][:limit])
+            else:
+                pending.setdefault(query_key, []).append(query)
+        
+        if not pending:
+            return results
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def bounded_search(query: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self.search_foods(query, limit=limit)
+        
+        tasks = {
+            asyncio.create_task(bounded_search(originals[0])): originals
+            for originals in pending.values()
+        }
+        done, late = await asyncio.wait(tasks, timeout=budget)
+        for task in done:
+            if task.exception() is not None:
+                logger.warning(f"Recherche '{tasks[task][0]}' abandonnée: {task.exception()}")
+                continue
+            for query in tasks[task]:
+                results[query] = task.result()
+        
+        if late:
+            logger.warning(f"{len(late)} recherche(s) hors budget ({budget}s) annulée(s), résultats partiels")
+            for task in late:
+                task.cancel()
+            # Attendre les annulations : aucune exception orpheline ni connexion retenue
+            await asyncio.gather(*late, return_exceptions=True)
+        
+        return results
+    
+    async def _load_persisted_search(self, query_key: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Relire une recherche persistée et ses produits depuis food_database"""
+        try:
+            max_age = timedelta(hours=settings.food_search_persisted_ttl_hours)
+            saved = await asyncio.to_thread(self.repository.get_search, query_key, max_age)
+            if saved is None:
+                return None
+            
+            barcodes, fetched_limit = saved
+            if fetched_limit < limit or not barcodes:
+                return None
+            
+            products = await asyncio.to_thread(self.repository.get_by_barcodes, barcodes)
+            results = [products[code] for code in barcodes if code in products]
+            if not results:
+                return None
+            
+            self._search_cache[query_key] = (fetched_limit, compact_products(results))
+            return results
+            
+        except Exception as e:
+            logger.warning(f"Cache persistant indisponible pour '{query_key}': {e}")
+            return None
+    
+    async def _persist_search(self, query_key: str, products: List[Dict[str, Any]], limit: int) -> None:
+        """Enregistrer les produits enrichis et le résultat de la recherche"""
+        await self._persist_products(products)
         try:
-            return self.openfoodfacts.get_product_by_barcode(barcode)
+            barcodes = [product['barcode'] for product in products if product.get('barcode')]
+            await asyncio.to_thread(self.repository.save_search, query_key, barcodes, limit)
+        except Exception as e:
+            logger.warning(f"Impossible de persister la recherche '{query_key}': {e}")
+    
+    async def get_food_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupérer un aliment par code-barres
+        
+        Cache-aside : cache mémoire, puis food_database, puis OpenFoodFacts.
+        Les scans simultanés d'un même code partagent une seule recherche.
+        Une fiche connue mais ancienne est servie telle quelle et rafraîchie
+        en arrière-plan (stale-while-revalidate).
+        
+        Le code est d'abord ramené à sa forme canonique : un code invalide
+        est inconnu, sans aucune recherche.
+        
+        Raises:
+            OpenFoodFactsThrottled: si le code est inconnu localement et OFF saturé
+        """
+        barcode = canonical_barcode(barcode)
+        if barcode is None:
+            return None
+        try:
+            product = self._barcode_cache.get(barcode)
+            if product is None:
+                if barcode in self._unknown_barcodes:
+                    return None
+                
+                # shield : l'abandon d'un client n'annule pas la recherche partagée
+                product = await asyncio.shield(self._shared_lookup(barcode, self._resolve_barcode))
+            
+            if product is not None:
+                self._product_scanned(barcode, product)
+            return product
+            
+        except OpenFoodFactsThrottled:
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la récupération par code-barres: {e}")
             return None
+    
+    async def lookup_barcodes(self,
+                              barcodes: List[str]
+                              ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]], Optional[Exception]]]:
+        """
+        Résoudre une liste de codes-barres, chacun rendu dès qu'il est connu
+        
+        Cache mémoire d'abord, puis une seule requête IN sur food_database,
+        puis OpenFoodFacts en parallèle pour les codes restants (sous le
+        débit OFF : ceux qui ne peuvent partir à temps sortent en erreur).
+        
+        Yields:
+            (code-barres canonique, produit ou None si inconnu, erreur éventuelle) ;
+            les codes invalides sont ignorés
+        """
+        queued: List[str] = []
+        for barcode in dict.fromkeys(filter(None, map(canonical_barcode, barcodes))):
+            product = self._barcode_cache.get(barcode)
+            if product is not None:
+                self._product_scanned(barcode, product)
+                yield barcode, product, None
+            elif barcode in self._unknown_barcodes:
+                yield barcode, None, None
+            else:
+                queued.append(barcode)
+        if not queued:
+            return
+        
+        # Les codes déjà en cours de résolution (autre scan) ne sont pas relus
+        to_read = [barcode for barcode in queued if barcode not in self._barcode_lookups]
+        stored: Dict[str, Dict[str, Any]] = {}
+        if to_read:
+            try:
+                stored = await asyncio.to_thread(self.repository.get_by_barcodes, to_read)
+            except Exception as e:
+                logger.warning(f"food_database indisponible pour {len(to_read)} code(s): {e}")
+        
+        lookups: Dict[asyncio.Task, str] = {}
+        for barcode in queued:
+            product = stored.get(barcode)
+            if product is not None:
+                self._barcode_cache[barcode] = product
+                self._product_scanned(barcode, product)
+                yield barcode, product, None
+            else:
+                lookups[self._shared_lookup(barcode, self._fetch_remote)] = barcode
+        
+        waiting = set(lookups)
+        while waiting:
+            done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                barcode = lookups[task]
+                if task.exception() is not None:
+                    yield barcode, None, task.exception()
+                    continue
+                product = task.result()
+                if product is not None:
+                    self._product_scanned(barcode, product)
+                yield barcode, product, None
+    
+    def _shared_lookup(self, barcode: str, resolve: Callable[[str], Any]) -> asyncio.Task:
+        """Recherche d'un code partagée par tous les appels simultanés"""
+        lookup = self._barcode_lookups.get(barcode)
+        if lookup is None:
+            lookup = asyncio.create_task(resolve(barcode))
+            self._barcode_lookups[barcode] = lookup
+            lookup.add_done_callback(lambda _: self._barcode_lookups.pop(barcode, None))
+        return lookup
+    
+    def _product_scanned(self, barcode: str, product: Dict[str, Any]) -> None:
+        """Popularité du produit, et rafraîchissement en arrière-plan si la fiche est ancienne"""
+        self.suggest_index.record_use(product.get('product_name'))
+        self._scan_counts[barcode] += 1
+        if barcode in self._refresh_attempts:
+            return
+        if is_stale(product, timedelta(hours=settings.food_refresh_after_hours)):
+            self._refresh_attempts[barcode] = True
+            self._spawn(self._revalidate(barcode))
+    
+    async def _revalidate(self, barcode: str) -> None:
+        try:
+            await self._refresh_product(barcode)
+        except Exception as e:
+            logger.info(f"Rafraîchissement de {barcode} reporté: {e}")
+    
+    async def _refresh_product(self, barcode: str) -> bool:
+        """
+        Recharger une fiche depuis OpenFoodFacts, en priorité de fond
+        
+        Returns:
+            True si la fiche a été mise à jour (False si OFF ne la connaît plus)
+        
+        Raises:
+            OpenFoodFactsError: si OpenFoodFacts n'a pas pu répondre (dont saturation)
+        """
+        product = await self.openfoodfacts.fetch_product(barcode, priority=PRIORITY_BACKGROUND)
+        if product is None:
+            return False
+        self._barcode_cache[barcode] = product
+        await self._persist_products([product])
+        return True
+    
+    async def flush_scan_counts(self) -> None:
+        """Écrire les scans comptés depuis le dernier passage dans food_database"""
+        if not self._scan_counts:
+            return
+        counts, self._scan_counts = dict(self._scan_counts), Counter()
+        try:
+            await asyncio.to_thread(self.repository.record_scans, counts)
+        except Exception as e:
+            logger.warning(f"Impossible d'enregistrer {len(counts)} compteur(s) de scans: {e}")
+            self._scan_counts.update(counts)
+    
+    async def refresh_stale_products(self, limit: int) -> int:
+        """
+        Rafraîchir les fiches anciennes, les plus scannées et les plus anciennes d'abord
+        
+        Les requêtes partent une à une en priorité de fond : les scans des
+        utilisateurs passent devant. Le balayage s'arrête à la première
+        saturation d'OFF, les fiches restantes attendront le suivant.
+        
+        Returns:
+            Nombre de fiches mises à jour
+        """
+        max_age = timedelta(hours=settings.food_refresh_after_hours)
+        cutoff = datetime.now(timezone.utc) - max_age
+        rows = await asyncio.to_thread(self.repository.list_stale_products, cutoff, limit * 4)
+        barcodes = refresh_order(rows, max_age, limit)
+        
+        refreshed = 0
+        for barcode in barcodes:
+            try:
+                refreshed += await self._refresh_product(barcode)
+            except OpenFoodFactsThrottled as e:
+                logger.warning(f"Balayage interrompu ({e}) après {refreshed}/{len(barcodes)} fiche(s)")
+                break
+            except OpenFoodFactsError as e:
+                logger.info(f"Rafraîchissement de {barcode} échoué: {e}")
+        logger.info(f"Balayage de fraîcheur : {refreshed}/{len(barcodes)} fiche(s) mise(s) à jour")
+        return refreshed
+    
+    async def run_freshness_maintenance(self) -> None:
+        """Boucle d'arrière-plan : compteurs de scans écrits régulièrement, balayage chaque nuit"""
+        sweep_at = next_run(settings.food_refresh_sweep_hour_utc)
+        while True:
+            await asyncio.sleep(settings.food_scan_flush_seconds)
+            await self.flush_scan_counts()
+            if datetime.now(timezone.utc) >= sweep_at:
+                sweep_at = next_run(settings.food_refresh_sweep_hour_utc)
+                try:
+                    await self.refresh_stale_products(settings.food_refresh_sweep_limit)
+                except Exception as e:
+                    logger.error(f"Échec du balayage de fraîcheur: {e}")
+    
+    async def _resolve_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Résoudre un code-barres absent du cache mémoire"""
+        try:
+            stored = await asyncio.to_thread(self.repository.get_by_barcodes, [barcode])
+        except Exception as e:
+            logger.warning(f"food_database indisponible pour {barcode}: {e}")
+            stored = {}
+        
+        product = stored.get(barcode)
+        if product is not None:
+            self._barcode_cache[barcode] = product
+            return product
+        return await self._fetch_remote(barcode)
+    
+    async def _fetch_remote(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Chercher un code inconnu de food_database sur OpenFoodFacts"""
+        product = await self.openfoodfacts.fetch_product(barcode)
+        if product is None:
+            self._unknown_barcodes[barcode] = True
+            return None
+        
+        self._barcode_cache[barcode] = product
+        self._spawn(self._persist_products([product]))
+        return product
+    
+    async def _persist_products(self, products: List[Dict[str, Any]]) -> None:
+        """Upsert des produits enrichis dans food_database"""
+        try:
+            await asyncio.to_thread(self.repository.upsert_products, products)
+        except Exception as e:
+            logger.warning(f"Impossible de persister {len(products)} produit(s): {e}")
+            return
+        
+        for listener in self._product_listeners:
+            try:
+                listener(products)
+            except Exception as e:
+                logger.warning(f"Mise à jour d'index échouée: {e}")
+    
+    async def aclose(self) -> None:
+        """Libérer les connexions HTTP (arrêt de l'application)"""
+        await self.openfoodfacts.aclose()
 
 
 # Instance globale du service
@@ -0,0 +1,147 @@
+"""
+Limitation du débit sortant vers les API externes
+Seau à jetons précédé d'une file d'attente par priorité : les scans de
+code-barres passent avant les recherches, elles-mêmes avant les tâches de
+fond. Une requête qui ne peut pas partir avant son échéance est refusée
+tout de suite avec un délai de nouvelle tentative, plutôt que d'attendre
+pour rien.
+"""
+
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priorités (la plus petite passe en premier)
+PRIORITY_SCAN = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+
+class RateLimited(Exception):
+    """Débit épuisé : la requête n'a pas été envoyée"""
+
+    def __init__(self, retry_after: float, message: str = "Limite de débit atteinte"):
+        super().__init__(f"{message}, réessayer dans {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Seau à jetons : `rate` jetons par seconde, au plus `capacity` en réserve"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Pause imposée par le serveur (HTTP 429 + Retry-After)
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        start = max(self.updated, self.paused_until)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = max(now, self.updated)
+
+    def delay(self, now: float, tokens: float = 1.0) -> float:
+        """Secondes avant que `tokens` jetons soient disponibles"""
+        self._refill(now)
+        pause = max(0.0, self.paused_until - now)
+        missing = tokens - self.tokens
+        return pause + (missing / self.rate if missing > 0 else 0.0)
+
+    def take(self, now: float) -> bool:
+        if self.delay(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    def pause(self, now: float, seconds: float) -> None:
+        """Suspendre le débit (le serveur nous a limités) et vider la réserve"""
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = now
+
+class RequestScheduler:
+    """File d'attente par priorité devant un seau à jetons
+
+    Chaque attente a une échéance. Si le débit ne permet pas de servir la
+    requête à temps (vu les requêtes de priorité égale ou supérieure déjà en
+    file), elle est refusée immédiatement ; sinon elle patiente et reçoit son
+    jeton à son tour, ou est refusée si l'échéance arrive avant.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int, max_queue: int = 100):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.max_queue = max_queue
+        # Entrées [priorité, ordre d'arrivée, échéance, future]
+        self._queue: List[list] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self, priority: int, timeout: float) -> None:
+        """Attendre un jeton, au plus `timeout` secondes
+
+        Raises:
+            RateLimited: si aucun jeton ne peut être obtenu dans le délai
+        """
+        now = time.monotonic()
+        if not self._queue and self.bucket.take(now):
+            return
+
+        ahead = sum(1 for entry in self._queue if entry[0] <= priority)
+        wait = self.bucket.delay(now, ahead + 1)
+        if wait > timeout or len(self._queue) >= self.max_queue:
+            raise RateLimited(wait, f"Débit {self.name} épuisé")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [priority, next(self._order), now + timeout, future])
+        self._schedule()
+        await future
+
+    def pause(self, seconds: float) -> None:
+        """Le serveur a répondu 429 : plus aucun envoi pendant `seconds`"""
+        logger.warning(f"Débit {self.name} suspendu {seconds:.0f}s par le serveur")
+        self.bucket.pause(time.monotonic(), seconds)
+        if self._queue:
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """Programmer le prochain passage : jeton disponible ou première échéance"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._queue:
+            return
+        now = time.monotonic()
+        first_deadline = min(entry[2] for entry in self._queue)
+        delay = min(self.bucket.delay(now), first_deadline - now)
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0.0), self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        now = time.monotonic()
+
+        # Attentes annulées ou arrivées à échéance : retirées de la file
+        alive = []
+        for entry in self._queue:
+            future = entry[3]
+            if future.done():
+                continue
+            if entry[2] <= now:
+                future.set_exception(RateLimited(self.bucket.delay(now), f"Débit {self.name} épuisé"))
+                continue
+            alive.append(entry)
+        if len(alive) != len(self._queue):
+            heapq.heapify(alive)
+            self._queue = alive
+
+        while self._queue and self.bucket.take(now):
+            heapq.heappop(self._queue)[3].set_result(None)
+        self._schedule()
@@ -3,34 +3,45 @@ KetoSansStress API Server with Supabase Integration
 Main FastAPI application with modern architecture
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging
 import uvicorn
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import math
 
 # Import application configuration
 from app.config import settings
 
 # Import integrations
-from integrations.openfoodfacts import food_search_service
+from integrations.openfoodfacts import OpenFoodFactsThrottled, food_search_service
+from app.foods.keto_catalogue import keto_catalogue
+from app.foods.barcodes import canonical_barcode
 
 # Import database connection
 from app.database.connection import get_supabase_client
 
 # Import authentication dependencies
-from app.auth.dependencies import get_current_user, get_current_user_optional
+from app.auth.dependencies import get_current_user, get_current_user_optional, require_admin
 
 # Import API routes
 from app.api.v1.auth import router as auth_router
 from app.api.v1.meals import router as meals_router
 from app.api.v1.preferences import router as preferences_router
+from app.api.v1.sync import router as sync_router
+from app.api.v1.dashboard import router as dashboard_router
+from app.api.v1.foods import router as foods_router
+from app.api.v1.foods import search_foods as search_foods_v1
+from app.core.compression import CompressionMiddleware
 
 # Legacy imports for meal analysis (will be migrated)
 from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent
 import json
 import base64
+from urllib.parse import quote
 from typing import List, Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -105,10 +116,28 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Supabase connection failed: {e}")
     
+    # Keto-friendly catalogue, refreshed in the background
+    background_tasks = [asyncio.create_task(keto_catalogue.run_periodic_refresh(
+        food_search_service.openfoodfacts,
+        timedelta(hours=settings.keto_catalogue_refresh_hours)
+    ))]
+    
+    # Local food index, built without delaying startup
+    if settings.food_index_enabled:
+        background_tasks.append(asyncio.create_task(food_search_service.load_local_index()))
+    
+    # Scan counts and nightly refresh of stale products
+    background_tasks.append(asyncio.create_task(food_search_service.run_freshness_maintenance()))
+    
     yield
     
     # Shutdown
     logger.info(f"Shutting down {settings.app_name}")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await food_search_service.flush_scan_counts()
+    await food_search_service.aclose()
 
 # Create FastAPI application
 app = FastAPI(
@@ -128,10 +157,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip compression (lower threshold for Save-Data clients)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    save_data_minimum_size=settings.compression_save_data_minimum_size,
+    offload_size=settings.compression_offload_size
+)
+
 # Include API routers
 app.include_router(auth_router, prefix=settings.api_v1_prefix)
 app.include_router(meals_router, prefix=settings.api_v1_prefix)
 app.include_router(preferences_router, prefix=settings.api_v1_prefix)
+app.include_router(sync_router, prefix=settings.api_v1_prefix)
+app.include_router(dashboard_router, prefix=settings.api_v1_prefix)
+app.include_router(foods_router, prefix=settings.api_v1_prefix)
+
+@app.exception_handler(OpenFoodFactsThrottled)
+async def openfoodfacts_throttled_handler(request: Request, exc: OpenFoodFactsThrottled):
+    """OpenFoodFacts rate limit reached: ask the client to retry instead of returning nothing."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "OpenFoodFacts est saturé, réessayez dans quelques instants"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
 
 # Legacy AI meal analysis function (will be migrated to separate service)
 async def analyze_meal_with_ai(image_base64: str) -> NutritionalInfo:
@@ -269,25 +318,6 @@ async def analyze_meal(analysis_request: MealAnalysis):
         logger.error(f"Meal analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'analyse: {str(e)}")
 
-@app.get("/api/foods/search/{query}")
-async def search_foods(query: str):
-    """Search French foods database."""
-    try:
-        results = []
-        query_lower = query.lower()
-        
-        for food_name, nutrition in FRENCH_FOODS_DB.items():
-            if query_lower in food_name.lower():
-                results.append({
-                    "name": food_name,
-                    "nutrition": nutrition
-                })
-        
-        return {"results": results}
-    except Exception as e:
-        logger.error(f"Food search error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche: {str(e)}")
-
 # Legacy user profile endpoint (will be migrated to new auth system)
 class LegacyUserProfile(BaseModel):
     name: str
@@ -451,40 +481,34 @@ async def get_weight_history(user_id: str, days: int = 30):
         logger.error(f"Weight history retrieval error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
-@app.get("/api/foods/search/{query}")
-async def search_foods_advanced(query: str, limit: int = 20):
-    """Advanced food search using OpenFoodFacts and local database."""
-    try:
-        # Utiliser le service de recherche OpenFoodFacts
-        results = food_search_service.search_foods(query, limit=limit)
-        
-        return {
-            "query": query,
-            "results": results,
-            "count": len(results),
-            "source": "openfoodfacts"
-        }
-    except Exception as e:
-        logger.error(f"Food search error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche: {str(e)}")
+@app.get("/api/foods/search/{query}", deprecated=True)
+async def search_foods_advanced(request: Request, query: str, limit: int = 20):
+    """Deprecated alias of GET /api/foods/search?q= (same ranking, at most 50 results)."""
+    response = await search_foods_v1(request, q=query, limit=max(1, min(limit, 50)), include=None, exclude=None)
+    response.headers["Deprecation"] = "true"
+    response.headers["Link"] = f'<{settings.api_v1_prefix}/foods/search?q={quote(query)}>; rel="successor-version"'
+    return response
 
 @app.get("/api/foods/barcode/{barcode}")
 async def get_food_by_barcode(barcode: str):
     """Get food information by barcode using OpenFoodFacts."""
+    code = canonical_barcode(barcode)
+    if code is None:
+        raise HTTPException(status_code=400, detail="Code-barres invalide")
     try:
-        # Rechercher par code-barres
-        result = food_search_service.get_food_by_barcode(barcode)
+        # Rechercher par code-barres (forme canonique : UPC-A et EAN-13 confondus)
+        result = await food_search_service.get_food_by_barcode(code)
         
         if result:
             return {
-                "barcode": barcode,
+                "barcode": code,
                 "product": result,
                 "found": True
             }
         else:
             raise HTTPException(status_code=404, detail="Produit non trouvé")
             
-    except HTTPException:
+    except (HTTPException, OpenFoodFactsThrottled):
         raise
     except Exception as e:
         logger.error(f"Barcode search error: {str(e)}")
@@ -497,18 +521,24 @@ async def analyze_meal_enhanced(analysis_request: MealAnalysis):
         # Analyse IA classique
         nutritional_info = await analyze_meal_with_ai(analysis_request.image_base64)
         
-        # Enrichir avec OpenFoodFacts si possible
+        # Enrichir avec OpenFoodFacts si possible, en parallèle et dans un budget de latence
+        foods = nutritional_info.foods_detected
+        matches = await food_search_service.search_foods_many(
+            foods,
+            limit=3,
+            concurrency=settings.meal_enrichment_concurrency,
+            budget=settings.meal_enrichment_budget_seconds
+        )
         enhanced_results = []
-        for food in nutritional_info.foods_detected:
-            # Rechercher des correspondances dans OpenFoodFacts
-            search_results = food_search_service.search_foods(food, limit=3)
-            if search_results:
-                enhanced_results.extend(search_results[:1])  # Prendre le meilleur résultat
+        for food in foods:
+            if matches.get(food):
+                enhanced_results.append(matches[food][0])  # Prendre le meilleur résultat
         
         return {
             "success": True,
             "ai_analysis": nutritional_info.dict(),
             "openfoodfacts_suggestions": enhanced_results,
+            "enrichment_complete": all(food in matches for food in foods),
             "meal_type": analysis_request.meal_type,
             "analyzed_at": datetime.now().isoformat()
         }
@@ -517,35 +547,34 @@ async def analyze_meal_enhanced(analysis_request: MealAnalysis):
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'analyse: {str(e)}")
 
 @app.get("/api/foods/keto-friendly")
-async def get_keto_friendly_foods(limit: int = 50):
-    """Get a list of keto-friendly foods."""
+async def get_keto_friendly_foods(limit: int = 50, offset: int = 0, category: Optional[str] = None):
+    """Get a page of the precomputed keto-friendly catalogue."""
+    limit = max(1, min(limit, 200))
+    offset = max(0, offset)
+    snapshot = keto_catalogue.snapshot
+    keto_foods, total = snapshot.page(offset, limit, category)
+    return {
+        "keto_foods": keto_foods,
+        "count": len(keto_foods),
+        "total": total,
+        "offset": offset,
+        "version": snapshot.version,
+        "built_at": snapshot.built_at
+    }
+
+@app.post("/api/foods/keto-friendly/refresh", dependencies=[Depends(require_admin)])
+async def refresh_keto_friendly_foods():
+    """Rebuild the keto-friendly catalogue now (admin only)."""
     try:
-        # Liste de recherches d'aliments keto-friendly
-        keto_searches = [
-            "avocat", "saumon", "huile olive", "fromage", "œuf", "beurre", 
-            "noix", "amandes", "brocoli", "épinards", "chou-fleur", "courgette"
-        ]
-        
-        all_results = []
-        for search_term in keto_searches:
-            results = food_search_service.search_foods(search_term, limit=5)
-            # Filtrer seulement les aliments avec un bon score keto
-            keto_results = [r for r in results if r.get('keto_score') is not None and r.get('keto_score') >= 7]
-            all_results.extend(keto_results)
-            
-            if len(all_results) >= limit:
-                break
-        
-        # Trier par score keto et limiter
-        sorted_results = sorted(all_results, key=lambda x: x.get('keto_score', 0), reverse=True)
-        
+        snapshot = await keto_catalogue.rebuild(food_search_service.openfoodfacts)
         return {
-            "keto_foods": sorted_results[:limit],
-            "count": len(sorted_results[:limit])
+            "version": snapshot.version,
+            "built_at": snapshot.built_at,
+            "total": len(snapshot.products)
         }
     except Exception as e:
-        logger.error(f"Keto foods error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
+        logger.error(f"Keto catalogue refresh error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la reconstruction: {str(e)}")
 
 if __name__ == "__main__":
     uvicorn.run(
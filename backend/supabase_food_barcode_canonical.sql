@@ -0,0 +1,51 @@
+-- =====================================================
+-- CODES-BARRES CANONIQUES pour KetoSansStress
+-- L'API ramène tout GTIN à une forme unique (UPC-A et
+-- GTIN-14 à zéro de tête écrits en EAN-13, EAN-8 sur 8
+-- chiffres) : même règle pour les produits déjà stockés
+-- =====================================================
+
+-- Forme canonique : aligné à droite sur 14 chiffres puis raccourci
+CREATE OR REPLACE FUNCTION canonical_gtin(code TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    gtin14 TEXT := lpad(code, 14, '0');
+BEGIN
+    IF code !~ '^[0-9]+$' OR length(code) NOT IN (8, 12, 13, 14) THEN
+        RETURN code;
+    END IF;
+    IF left(gtin14, 6) = '000000' THEN
+        RETURN right(gtin14, 8);
+    END IF;
+    IF left(gtin14, 1) = '0' THEN
+        RETURN right(gtin14, 13);
+    END IF;
+    RETURN gtin14;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Doublons (même produit sous deux formes) : on garde la fiche la plus récente,
+-- une fiche sans date passant après toutes les autres
+DELETE FROM public.food_database
+WHERE barcode IN (
+    SELECT barcode
+    FROM (
+        SELECT barcode,
+               row_number() OVER (
+                   PARTITION BY canonical_gtin(barcode)
+                   ORDER BY last_updated DESC NULLS LAST, barcode DESC
+               ) AS rank
+        FROM public.food_database
+    ) ranked
+    WHERE rank > 1
+);
+
+UPDATE public.food_database
+SET barcode = canonical_gtin(barcode)
+WHERE barcode <> canonical_gtin(barcode);
+
+-- Les recherches persistées pointent vers les anciennes clés : on les oublie
+TRUNCATE public.food_search_cache;
+
+-- Vérification finale
+SELECT '✅ Codes-barres ramenés à leur forme canonique!' as status;
@@ -0,0 +1,22 @@
+-- =====================================================
+-- CACHE PERSISTANT DES ALIMENTS pour KetoSansStress
+-- Produits OpenFoodFacts enrichis + résultats de recherche
+-- =====================================================
+
+-- Colonnes produites par l'enrichissement OpenFoodFacts
+ALTER TABLE public.food_database
+ADD COLUMN IF NOT EXISTS net_carbs_per_100g DECIMAL(8,2),
+ADD COLUMN IF NOT EXISTS image_url TEXT;
+
+-- Résultats de recherche par requête normalisée
+CREATE TABLE IF NOT EXISTS public.food_search_cache (
+    query_key TEXT PRIMARY KEY,
+    barcodes TEXT[] NOT NULL DEFAULT '{}',
+    fetched_limit INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_food_search_cache_created_at ON public.food_search_cache(created_at);
+
+-- Vérification finale
+SELECT '✅ Cache persistant des aliments configuré!' as status;
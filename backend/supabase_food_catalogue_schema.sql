@@ -0,0 +1,38 @@
+-- =====================================================
+-- CATALOGUES PRÉCALCULÉS pour KetoSansStress
+-- Instantanés versionnés (ex. catalogue keto-friendly)
+-- reconstruits par une tâche d'arrière-plan
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.food_catalogue_snapshots (
+    version BIGSERIAL PRIMARY KEY,
+    catalogue TEXT NOT NULL,
+    products JSONB NOT NULL DEFAULT '[]',
+    product_count INTEGER NOT NULL DEFAULT 0,
+    built_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_food_catalogue_snapshots_latest
+    ON public.food_catalogue_snapshots(catalogue, version DESC);
+
+-- Ne garder que les derniers instantanés de chaque catalogue
+CREATE OR REPLACE FUNCTION prune_food_catalogue_snapshots(keep INTEGER DEFAULT 5)
+RETURNS INTEGER AS $$
+DECLARE
+    pruned INTEGER;
+BEGIN
+    DELETE FROM public.food_catalogue_snapshots s
+    WHERE s.version NOT IN (
+        SELECT version FROM (
+            SELECT version, ROW_NUMBER() OVER (PARTITION BY catalogue ORDER BY version DESC) AS rank
+            FROM public.food_catalogue_snapshots
+        ) ranked
+        WHERE ranked.rank <= keep
+    );
+    GET DIAGNOSTICS pruned = ROW_COUNT;
+    RETURN pruned;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Vérification finale
+SELECT '✅ Table des catalogues précalculés créée!' as status;
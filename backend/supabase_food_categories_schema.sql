@@ -0,0 +1,28 @@
+-- =====================================================
+-- NAVIGATION PAR CATÉGORIE pour KetoSansStress
+-- Catégories des produits en slugs (app.foods.dietary.tag_key)
+-- indexés en GIN, pour lister une catégorie par score
+-- keto sans requête OFF
+-- =====================================================
+
+-- Slugs calculés par l'application à l'écriture (product_to_row) : une
+-- fonction SQL ne replierait pas les caractères exactement comme
+-- tag_key (ß, ligatures, formes compatibles Unicode). Lignes existantes :
+--     python ingest_openfoodfacts_dump.py --category-slugs
+-- (CASCADE retire l'ancienne colonne générée, recréée juste après)
+DROP FUNCTION IF EXISTS food_category_slugs(TEXT[]) CASCADE;
+DROP FUNCTION IF EXISTS food_category_slug(TEXT);
+
+ALTER TABLE public.food_database
+ADD COLUMN IF NOT EXISTS category_slugs TEXT[] NOT NULL DEFAULT '{}';
+
+-- Produits d'une catégorie (category_slugs @> '{pains}')
+CREATE INDEX IF NOT EXISTS idx_food_database_category_slugs
+    ON public.food_database USING GIN (category_slugs);
+
+-- Ordre de parcours d'une catégorie (pagination par curseur)
+CREATE INDEX IF NOT EXISTS idx_food_database_keto_browse
+    ON public.food_database(keto_score DESC NULLS LAST, barcode);
+
+-- Vérification finale
+SELECT '✅ Index des catégories configuré!' as status;
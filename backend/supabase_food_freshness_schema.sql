@@ -0,0 +1,32 @@
+-- =====================================================
+-- FRAÎCHEUR DES PRODUITS pour KetoSansStress
+-- Popularité des produits (scans) pour rafraîchir en
+-- priorité, chaque nuit, les fiches anciennes les plus scannées
+-- =====================================================
+
+ALTER TABLE public.food_database
+ADD COLUMN IF NOT EXISTS scan_count INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS last_scanned_at TIMESTAMPTZ;
+
+-- Produits anciens, du plus scanné au moins scanné
+CREATE INDEX IF NOT EXISTS idx_food_database_freshness
+    ON public.food_database(last_updated, scan_count DESC);
+
+-- Ajouter des scans comptés en mémoire par l'API (un appel par lot)
+CREATE OR REPLACE FUNCTION increment_food_scans(barcodes TEXT[], increments INTEGER[])
+RETURNS INTEGER AS $$
+DECLARE
+    updated INTEGER;
+BEGIN
+    UPDATE public.food_database f
+    SET scan_count = f.scan_count + s.increment,
+        last_scanned_at = NOW()
+    FROM unnest(barcodes, increments) AS s(barcode, increment)
+    WHERE f.barcode = s.barcode;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Vérification finale
+SELECT '✅ Suivi de fraîcheur des produits configuré!' as status;
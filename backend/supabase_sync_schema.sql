@@ -0,0 +1,70 @@
+-- =====================================================
+-- SYNCHRONISATION DIFFÉRENTIELLE pour KetoSansStress
+-- Index updated_at + journal des suppressions (tombstones)
+-- Utilisé par GET /api/sync?since=<token>
+-- =====================================================
+
+-- Journal des suppressions
+CREATE TABLE IF NOT EXISTS public.deletion_log (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    table_name TEXT NOT NULL CHECK (table_name IN ('meals', 'daily_summaries', 'user_preferences')),
+    record_id UUID NOT NULL,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Activer RLS sur la table
+ALTER TABLE public.deletion_log ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own deletions" ON public.deletion_log
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- Index pour les lectures "modifié depuis"
+CREATE INDEX IF NOT EXISTS idx_deletion_log_user_deleted_at ON public.deletion_log(user_id, deleted_at);
+CREATE INDEX IF NOT EXISTS idx_meals_user_updated_at ON public.meals(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_daily_summaries_user_updated_at ON public.daily_summaries(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_user_preferences_user_updated_at ON public.user_preferences(user_id, updated_at);
+
+-- Trigger pour updated_at (manquant sur certains schémas)
+CREATE OR REPLACE TRIGGER update_user_preferences_updated_at
+    BEFORE UPDATE ON public.user_preferences
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Enregistrer chaque suppression dans le journal
+CREATE OR REPLACE FUNCTION log_row_deletion()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.deletion_log (user_id, table_name, record_id)
+    VALUES (OLD.user_id, TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE TRIGGER log_meals_deletion
+    AFTER DELETE ON public.meals
+    FOR EACH ROW EXECUTE FUNCTION log_row_deletion();
+
+CREATE OR REPLACE TRIGGER log_daily_summaries_deletion
+    AFTER DELETE ON public.daily_summaries
+    FOR EACH ROW EXECUTE FUNCTION log_row_deletion();
+
+CREATE OR REPLACE TRIGGER log_user_preferences_deletion
+    AFTER DELETE ON public.user_preferences
+    FOR EACH ROW EXECUTE FUNCTION log_row_deletion();
+
+-- Purge des tombstones trop anciens (à planifier, ex. pg_cron quotidien)
+-- Doit rester aligné avec SYNC_TOMBSTONE_RETENTION_DAYS côté API
+CREATE OR REPLACE FUNCTION purge_deletion_log(retention_days INTEGER DEFAULT 90)
+RETURNS INTEGER AS $$
+DECLARE
+    purged INTEGER;
+BEGIN
+    DELETE FROM public.deletion_log
+    WHERE deleted_at < NOW() - make_interval(days => retention_days);
+    GET DIAGNOSTICS purged = ROW_COUNT;
+    RETURN purged;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Vérification finale
+SELECT '✅ Journal des suppressions et index de synchronisation créés!' as status;
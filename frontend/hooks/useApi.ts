@@ -157,7 +157,7 @@ export const useApi = () => {
   // Food search API calls
   const searchFoods = useCallback(
     async (query: string, limit: number = 20) => {
-      const endpoint = `/api/foods/search/${encodeURIComponent(query)}?limit=${limit}`;
+      const endpoint = `/api/foods/search?q=${encodeURIComponent(query)}&limit=${limit}`;
       return await makeRequest(endpoint);
     },
     [makeRequest]
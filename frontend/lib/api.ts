@@ -109,7 +109,7 @@ export const getWeightHistory = async (userId: string, days: number = 30) => {
 };
 
 export const searchFoods = async (query: string) => {
-  const response = await api.get(`/api/foods/search/${query}`);
+  const response = await api.get('/api/foods/search', { params: { q: query } });
   return response.data;
 };
 
@@ -0,0 +1,51 @@
+from app.foods.alternatives import keto_alternatives, nutrient_vector
+from app.foods.nutrient_index import NutrientIndex
+
+
+def product(barcode, keto_score, categories, **per_100g):
+    return {
+        "barcode": barcode,
+        "keto_score": keto_score,
+        "categories": categories,
+        **{f"{name}_per_100g": value for name, value in per_100g.items()},
+    }
+
+
+PAIN = product("pain", 1, ["en:breads"], calories=260, protein=9, fat=3, net_carbs=48)
+CATALOGUE = [
+    PAIN,
+    product("pain-keto", 8, ["en:breads", "en:keto"], calories=280, protein=20, fat=18, net_carbs=4),
+    product("pain-lin", 7, ["en:breads"], calories=420, protein=18, fat=30, net_carbs=3),
+    product("brioche", 2, ["en:breads"], calories=380, protein=8, fat=14, net_carbs=50),
+    product("beurre", 9, ["en:dairies"], calories=745, fat=82, net_carbs=1),
+]
+
+
+def test_nutrient_vector_is_normalized():
+    vector = nutrient_vector({"calories_per_100g": 450, "fat_per_100g": 50, "protein_per_100g": None})
+    assert vector.tolist() == [0.5, 0.0, 0.5, 0.0, 0.0, 0.0]
+
+
+def test_nearest_keto_products_in_shared_categories():
+    index = NutrientIndex.build(CATALOGUE)
+    alternatives = keto_alternatives(index, PAIN)
+    # Non-keto breads and keto products from other categories are left out
+    assert [barcode for barcode, _ in alternatives] == ["pain-keto", "pain-lin"]
+    assert alternatives[0][1] <= alternatives[1][1]
+    assert keto_alternatives(index, PAIN, limit=1) == alternatives[:1]
+
+
+def test_threshold_and_product_itself_are_excluded():
+    index = NutrientIndex.build(CATALOGUE)
+    assert [barcode for barcode, _ in keto_alternatives(index, PAIN, min_keto_score=8)] == ["pain-keto"]
+    keto = CATALOGUE[1]
+    assert [barcode for barcode, _ in keto_alternatives(index, keto)] == ["pain-lin"]
+
+
+def test_without_categories_the_whole_catalogue_is_searched():
+    index = NutrientIndex.build(CATALOGUE)
+    fat = {"barcode": "huile", "calories_per_100g": 800, "fat_per_100g": 90}
+    assert keto_alternatives(index, fat)[0][0] == "beurre"
+    index.remove("beurre")
+    assert "beurre" not in [barcode for barcode, _ in keto_alternatives(index, fat)]
+    assert keto_alternatives(index, {**PAIN, "categories": ["en:soups"]}) == []
@@ -0,0 +1,41 @@
+import pytest
+
+from app.foods.barcodes import InvalidBarcode, canonical_barcode, check_digit, normalize_barcode
+
+
+def test_check_digit():
+    assert check_digit("301762042200") == 3
+    assert check_digit("9638507") == 4
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("3017620422003", "3017620422003"),      # EAN-13
+    ("036000291452", "0036000291452"),       # UPC-A, same key as its EAN-13 form
+    ("0036000291452", "0036000291452"),
+    ("96385074", "96385074"),                # EAN-8
+    ("00000096385074", "96385074"),          # EAN-8 padded to GTIN-14
+    ("03017620422003", "3017620422003"),     # EAN-13 padded to GTIN-14
+    ("10036000291459", "10036000291459"),    # GTIN-14 with a packaging indicator
+    (" 3017620 422003 ", "3017620422003"),   # separators
+    ("3-017620-422003", "3017620422003"),
+])
+def test_normalize_barcode(raw, expected):
+    assert normalize_barcode(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [
+    "",
+    "3017620422004",      # wrong check digit
+    "301762042200",       # 12 digits, wrong check digit
+    "30176204220",        # not a GTIN length
+    "30176204220O3",      # letter O
+    "３０１７６２０４２２００３",  # full-width digits
+])
+def test_invalid_barcodes(raw):
+    with pytest.raises(InvalidBarcode):
+        normalize_barcode(raw)
+    assert canonical_barcode(raw) is None
+
+
+def test_canonical_barcode_none():
+    assert canonical_barcode(None) is None
@@ -0,0 +1,53 @@
+import base64
+
+import pytest
+
+from app.foods.category_index import CategoryIndex, decode_cursor, encode_cursor, sort_key
+
+
+def raw_cursor(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("keto_score, barcode", [
+    (9, "3017620422003"),
+    (0, "96385074"),
+    (-3, "0036000291452"),
+    (None, "3017620422003"),
+])
+def test_cursor_round_trip(keto_score, barcode):
+    key = sort_key(keto_score, barcode)
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "%%%",
+    raw_cursor("inf:3017620422003"),
+    raw_cursor("nan:3017620422003"),
+    raw_cursor("8.5:3017620422003"),
+    raw_cursor("12345:3017620422003"),
+    raw_cursor("9:3017620422004"),                      # wrong check digit
+    raw_cursor("9:036000291452"),                       # valid, but not canonical
+    raw_cursor("9:3017620422003,keto_score.gt.0"),      # PostgREST filter injection
+    raw_cursor("9),barcode.gt.(0:3017620422003"),
+    raw_cursor("9"),
+])
+def test_cursor_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_follow_cursor():
+    barcodes = ["3017620422003", "0036000291452", "96385074", "40000411"]
+    index = CategoryIndex.build(
+        {"barcode": barcode, "categories": ["en:Pains"], "keto_score": score}
+        for barcode, score in zip(barcodes, (5, 8, None, 8))
+    )
+    seen, after = [], None
+    while True:
+        page, following = index.page("pains", 1, decode_cursor(encode_cursor(after)) if after else None)
+        seen += page
+        if following is None:
+            break
+        after = following
+    assert seen == ["0036000291452", "40000411", "3017620422003", "96385074"]
@@ -0,0 +1,75 @@
+import math
+
+from app.foods.compact_product import (
+    IMAGE_PREFIX, CompactProduct, CompactProductCache, compact_products, expand_products, tag_vocabulary,
+)
+
+PRODUCT = {
+    "openfoodfacts_id": "3017620422003",
+    "barcode": "3017620422003",
+    "product_name": "Pâte à tartiner",
+    "brand": "Marque",
+    "calories_per_100g": 539,
+    "protein_per_100g": 6.3,
+    "carbohydrates_per_100g": 57.5,
+    "fat_per_100g": 30.9,
+    "fiber_per_100g": None,
+    "sugar_per_100g": 56.3,
+    "sodium_per_100g": 0.0,
+    "net_carbs_per_100g": 57.5,
+    "categories": ["en:spreads", "en:sweet-spreads"],
+    "labels": [],
+    "allergens": ["en:milk", "en:nuts"],
+    "ingredients_text": "sucre, huile de palme",
+    "image_url": IMAGE_PREFIX + "301/762/042/2003/front_fr.jpg",
+    "keto_score": 12,
+    "is_keto_friendly": False,
+    "data_source": "openfoodfacts",
+    "data_quality_score": 0.8,
+    "last_updated": "2026-10-01T00:00:00+00:00",
+}
+
+
+def test_round_trip_is_lossless():
+    assert CompactProduct(PRODUCT).to_dict() == PRODUCT
+
+
+def test_distinct_identifiers_and_foreign_images_survive():
+    product = {**PRODUCT, "openfoodfacts_id": "autre", "image_url": "https://exemple.fr/image.jpg"}
+    assert CompactProduct(product).to_dict() == product
+
+
+def test_missing_fields_come_back_empty():
+    expanded = CompactProduct({"barcode": "123"}).to_dict()
+    assert expanded["openfoodfacts_id"] == "123"
+    assert expanded["categories"] == expanded["labels"] == expanded["allergens"] == []
+    assert expanded["fiber_per_100g"] is None and expanded["calories_per_100g"] is None
+
+
+def test_tags_share_the_vocabulary():
+    before = len(tag_vocabulary)
+    compact_products([PRODUCT, {**PRODUCT, "barcode": "autre"}])
+    CompactProduct(PRODUCT)
+    # Known tags are not added again
+    assert len(tag_vocabulary) == before
+
+
+def test_compact_and_expand_lists():
+    products = [PRODUCT, {**PRODUCT, "barcode": "autre", "openfoodfacts_id": "autre"}]
+    assert expand_products(compact_products(products)) == products
+
+
+def test_nan_nutrients_read_back_as_unknown():
+    expanded = CompactProduct({**PRODUCT, "fat_per_100g": math.nan}).to_dict()
+    assert expanded["fat_per_100g"] is None
+
+
+def test_cache_stores_compact_and_returns_dicts():
+    cache = CompactProductCache(maxsize=2, ttl=60)
+    cache["a"] = PRODUCT
+    assert "a" in cache and len(cache) == 1
+    assert cache["a"] == PRODUCT and cache.get("a") == PRODUCT
+    assert cache.get("b") is None and cache.get("b", {}) == {}
+    # The cached copy is independent of the caller's dict
+    cache["a"]["categories"].append("modifié")
+    assert cache["a"] == PRODUCT
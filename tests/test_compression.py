@@ -0,0 +1,102 @@
+import gzip
+
+import brotli
+import msgpack
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, choose_encoding, parse_accept_encoding
+from app.core.responses import negotiated_response, wants_msgpack
+
+
+def request(accept):
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"accept", accept.encode())]})
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip;q=0.5, br, identity;q=x") == {"gzip": 0.5, "br": 1.0, "identity": 0.0}
+
+
+@pytest.mark.parametrize("header, encoding", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0.4, gzip;q=0.8", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(header, encoding):
+    assert choose_encoding(header) == encoding
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", True),
+    ("application/x-msgpack;q=0.5, application/json", True),
+    ("Application/MsgPack; charset=binary; q=0.1", True),
+    ("application/json", False),
+    ("application/msgpack;q=0", False),
+    ("application/msgpack;q=0.0", False),
+    ("application/msgpack; q=0.00", False),
+    ("application/msgpack;q=zero", False),
+    ("*/*", False),
+])
+def test_wants_msgpack(accept, expected):
+    assert wants_msgpack(request(accept)) is expected
+
+
+def test_negotiated_response():
+    content = {"meals": [{"id": 1, "food_name": "Omelette"}]}
+    packed = negotiated_response(request("application/msgpack"), content)
+    assert packed.media_type == "application/msgpack"
+    assert msgpack.unpackb(packed.body) == content
+    refused = negotiated_response(request("application/msgpack;q=0.0, application/json"), content)
+    assert refused.media_type == "application/json"
+    assert refused.headers["vary"] == "Accept"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(size: int):
+        return {"data": "a" * size}
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, save_data_minimum_size=256, offload_size=4096)
+    return TestClient(app)
+
+
+def test_compresses_above_threshold(client):
+    response = client.get("/items", params={"size": 2000}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == {"data": "a" * 2000}
+
+
+def test_brotli_preferred(client):
+    with client.stream("GET", "/items", params={"size": 2000}, headers={"Accept-Encoding": "gzip, br"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(raw) == b'{"data":"' + b"a" * 2000 + b'"}'
+
+
+def test_small_bodies_untouched(client):
+    response = client.get("/items", params={"size": 500}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_save_data_lowers_threshold(client):
+    response = client.get("/items", params={"size": 500}, headers={"Accept-Encoding": "gzip", "Save-Data": "on"})
+    assert response.headers["content-encoding"] == "gzip"
+    response = client.get("/items", params={"size": 100}, headers={"Accept-Encoding": "gzip", "Save-Data": "on"})
+    assert "content-encoding" not in response.headers
+
+
+def test_large_bodies_compressed_off_loop(client):
+    with client.stream("GET", "/items", params={"size": 100_000}, headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw) == b'{"data":"' + b"a" * 100_000 + b'"}'
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+from starlette.requests import Request
+
+from app.core.conditional import (
+    VersionStampCache, is_not_modified, make_version_stamp, not_modified_response,
+    stamp_from_payload, stamp_from_rows, stamp_headers,
+)
+
+ROWS = [
+    {"id": 1, "updated_at": "2026-10-01T08:00:00.250000+00:00"},
+    {"id": 2, "updated_at": "2026-10-02T09:30:00Z"},
+]
+
+
+def request(**headers):
+    return Request({
+        "type": "http", "method": "GET", "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_stamp_from_rows():
+    stamp = stamp_from_rows(ROWS, scope="meals:u1")
+    assert stamp.last_modified == datetime(2026, 10, 2, 9, 30, tzinfo=timezone.utc)
+    assert stamp.etag.startswith('W/"')
+    assert stamp == stamp_from_rows(reversed(ROWS), scope="meals:u1")
+    # Row count, latest change and scope all change the ETag
+    assert stamp.etag != stamp_from_rows(ROWS[:1] + ROWS, scope="meals:u1").etag
+    assert stamp.etag != stamp_from_rows(ROWS[:1], scope="meals:u1").etag
+    assert stamp.etag != stamp_from_rows(ROWS, scope="meals:u2").etag
+
+
+def test_empty_resources_differ_by_scope():
+    assert stamp_from_rows([], scope="meals:u1").etag != stamp_from_rows([], scope="meals:u2").etag
+    assert stamp_from_rows([]).last_modified is None
+
+
+def test_stamp_from_payload_ignores_key_order():
+    assert stamp_from_payload({"a": 1, "b": [2]}).etag == stamp_from_payload({"b": [2], "a": 1}).etag
+    assert stamp_from_payload({"a": 1}).etag != stamp_from_payload({"a": 2}).etag
+
+
+def test_if_none_match():
+    stamp = stamp_from_rows(ROWS)
+    strong = stamp.etag[2:]
+    assert is_not_modified(request(if_none_match=stamp.etag), stamp)
+    assert is_not_modified(request(if_none_match=strong), stamp)
+    assert is_not_modified(request(if_none_match=f'W/"other", {strong}'), stamp)
+    assert is_not_modified(request(if_none_match="*"), stamp)
+    assert not is_not_modified(request(if_none_match='W/"other"'), stamp)
+    # If-None-Match wins over a matching If-Modified-Since
+    assert not is_not_modified(
+        request(if_none_match='W/"other"', if_modified_since="Fri, 02 Oct 2026 09:30:00 GMT"), stamp
+    )
+    assert not is_not_modified(request(), stamp)
+
+
+def test_if_modified_since_has_second_resolution():
+    stamp = make_version_stamp(1, "2026-10-02T09:30:00.900000+00:00")
+    assert is_not_modified(request(if_modified_since="Fri, 02 Oct 2026 09:30:00 GMT"), stamp)
+    assert not is_not_modified(request(if_modified_since="Fri, 02 Oct 2026 09:29:59 GMT"), stamp)
+    assert not is_not_modified(request(if_modified_since="not a date"), stamp)
+    assert not is_not_modified(request(if_modified_since="Fri, 02 Oct 2026 09:30:00 GMT"), stamp_from_payload({}))
+
+
+def test_headers_and_304():
+    stamp = stamp_from_rows(ROWS)
+    headers = stamp_headers(stamp)
+    assert headers["Last-Modified"] == "Fri, 02 Oct 2026 09:30:00 GMT"
+    assert headers["Cache-Control"] == "private, no-cache"
+    response = not_modified_response(stamp)
+    assert response.status_code == 304
+    assert response.headers["etag"] == stamp.etag
+
+
+def test_version_stamp_cache_invalidates_per_user():
+    cache = VersionStampCache(ttl=60)
+    stamp = stamp_from_rows(ROWS)
+    cache.set("u1", "meals", stamp)
+    cache.set("u1", "summary", stamp)
+    cache.set("u2", "meals", stamp)
+    cache.invalidate("u1")
+    assert cache.get("u1", "meals") is None and cache.get("u1", "summary") is None
+    assert cache.get("u2", "meals") == stamp
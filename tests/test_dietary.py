@@ -0,0 +1,53 @@
+import pytest
+
+from app.foods.dietary import (
+    ALLERGENS_KNOWN, FLAG_BITS, matches, parse_flags, product_flags, required_flags, tag_key,
+)
+from app.foods.nutrient_index import NutrientIndex
+
+
+def test_tag_key():
+    assert tag_key("en:Sulphur dioxide and sulphites") == "sulphur-dioxide-and-sulphites"
+    assert tag_key("Œufs frais") == "oeufs-frais"
+    assert tag_key("de:Weißbier") == "weissbier"
+
+
+def test_product_flags():
+    flags = product_flags({"allergens": ["en:gluten", "Lait"], "labels": ["AB Agriculture Biologique"]})
+    assert flags == FLAG_BITS["gluten"] | FLAG_BITS["lait"] | FLAG_BITS["bio"] | ALLERGENS_KNOWN
+    assert product_flags({"allergens": [], "labels": []}) == 0
+
+
+def test_parse_flags():
+    assert parse_flags("gluten, Sans gluten,") == FLAG_BITS["gluten"] | FLAG_BITS["sans-gluten"]
+    assert parse_flags("") == 0
+    with pytest.raises(ValueError):
+        parse_flags("gluten,inconnu")
+
+
+def test_allergen_exclusion_requires_known_allergens():
+    gluten = FLAG_BITS["gluten"]
+    assert required_flags(0, gluten) == ALLERGENS_KNOWN
+    # Labels only: no allergen data needed
+    assert required_flags(0, FLAG_BITS["bio"]) == 0
+
+    unknown = product_flags({"allergens": []})
+    free = product_flags({"allergens": ["en:milk"]})
+    with_gluten = product_flags({"allergens": ["en:gluten"]})
+    assert not matches(unknown, exclude=gluten)
+    assert matches(free, exclude=gluten)
+    assert not matches(with_gluten, exclude=gluten)
+    assert matches(unknown, exclude=FLAG_BITS["bio"])
+
+
+def test_nutrient_index_allergen_exclusion():
+    index = NutrientIndex.build([
+        {"barcode": "3017620422003", "allergens": [], "keto_score": 9},
+        {"barcode": "0036000291452", "allergens": ["en:milk"], "keto_score": 8},
+        {"barcode": "96385074", "allergens": ["en:gluten"], "keto_score": 7},
+    ])
+    barcodes, total = index.query(exclude=parse_flags("gluten"))
+    assert barcodes == ["0036000291452"]
+    assert total == 1
+    barcodes, total = index.query()
+    assert total == 3
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app.foods.dietary import FLAG_BITS
+from app.foods.search_index import FoodSearchIndex
+from integrations.openfoodfacts import FoodSearchService, OpenFoodFactsThrottled
+
+LOCAL = [
+    {"barcode": "3017620422003", "product_name": "Brocoli surgelé", "keto_score": 9, "labels": ["en:organic"]},
+    {"barcode": "0036000291452", "product_name": "Pain de mie", "keto_score": 2},
+]
+HONEY = {"barcode": "96385074", "product_name": "Miel de fleurs", "keto_score": 0, "labels": ["Bio"]}
+ORGANIC = FLAG_BITS["bio"]
+
+
+class StubRepository:
+    """food_database without persisted searches"""
+
+    def __init__(self, products):
+        self.products = {product["barcode"]: product for product in products}
+
+    def get_by_barcodes(self, barcodes):
+        return {code: self.products[code] for code in barcodes if code in self.products}
+
+    def get_search(self, query_key, max_age):
+        return None
+
+    def save_search(self, query_key, barcodes, limit):
+        pass
+
+    def upsert_products(self, products):
+        return 0
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = FoodSearchService(StubRepository(LOCAL))
+    service.local_index = FoodSearchIndex.build(LOCAL)
+    service.off_queries = []
+
+    async def search_products(query, limit=20):
+        service.off_queries.append(query)
+        return [HONEY] if "miel" in query else []
+
+    monkeypatch.setattr(service.openfoodfacts, "search_products", search_products)
+    return service
+
+
+def test_off_answers_before_fuzzy_correction(service):
+    # « miel » is one typo away from the local « mie », but is spelt correctly
+    assert service.local_index.fuzzy_search("miel", 5, 1)
+    results = asyncio.run(service.search_foods("miel", 5))
+    assert [product["barcode"] for product in results] == ["96385074"]
+    assert service.off_queries == ["miel"]
+
+
+def test_fuzzy_only_when_every_exact_source_is_empty(service):
+    results = asyncio.run(service.search_foods("brocolli", 5))
+    assert [product["barcode"] for product in results] == ["3017620422003"]
+    assert service.off_queries == ["brocolli"]
+    # The correction is not cached under the misspelt query
+    assert "brocolli" not in service._search_cache
+
+
+def test_fuzzy_when_off_is_throttled(service, monkeypatch):
+    async def throttled(query, limit=20):
+        raise OpenFoodFactsThrottled(1.0)
+
+    monkeypatch.setattr(service.openfoodfacts, "search_products", throttled)
+    results = asyncio.run(service.search_foods("brocolli", 5))
+    assert [product["barcode"] for product in results] == ["3017620422003"]
+
+
+def test_filtered_search_is_exact_first(service):
+    results = asyncio.run(service.search_foods_filtered("miel", 5, include=ORGANIC))
+    assert [product["barcode"] for product in results] == ["96385074"]
+    assert asyncio.run(service.search_foods_filtered("miel", 5, include=FLAG_BITS["vegan"])) == []
+
+
+def test_filtered_fuzzy_correction_is_not_cached(service):
+    results = asyncio.run(service.search_foods_filtered("brocolli", 5, include=ORGANIC))
+    assert [product["barcode"] for product in results] == ["3017620422003"]
+    assert service.off_queries == ["brocolli"]
+    assert not any(key.startswith("brocolli") for key in service._search_cache)
+
+
+def test_filtered_search_when_off_is_throttled(service, monkeypatch):
+    async def throttled(query, limit=20):
+        raise OpenFoodFactsThrottled(1.0)
+
+    monkeypatch.setattr(service.openfoodfacts, "search_products", throttled)
+    results = asyncio.run(service.search_foods_filtered("brocolli", 5, include=ORGANIC))
+    assert [product["barcode"] for product in results] == ["3017620422003"]
+    with pytest.raises(OpenFoodFactsThrottled):
+        asyncio.run(service.search_foods_filtered("miel", 5, include=ORGANIC))
+
+
+def test_search_many_cancels_late_searches(service, monkeypatch):
+    started, finished = [], []
+
+    async def search_foods(query, limit=20):
+        started.append(query)
+        if query == "lent":
+            await asyncio.sleep(5)
+        if query == "erreur":
+            raise OpenFoodFactsThrottled(1.0)
+        finished.append(query)
+        return [{"barcode": query}]
+
+    async def run():
+        results = await service.search_foods_many(["miel", "Miel ", "lent", "erreur"], 3, 2, 0.2)
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        return results, pending
+
+    monkeypatch.setattr(service, "search_foods", search_foods)
+    results, pending = asyncio.run(run())
+    assert results == {"miel": [{"barcode": "miel"}], "Miel ": [{"barcode": "miel"}]}
+    assert sorted(started) == ["erreur", "lent", "miel"] and finished == ["miel"]
+    assert pending == []
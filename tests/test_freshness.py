@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+from app.foods.freshness import is_stale, next_run, parse_timestamp, product_age, refresh_order
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+MAX_AGE = timedelta(days=30)
+
+
+def ago(**delta):
+    return (datetime.now(timezone.utc) - timedelta(**delta)).isoformat()
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("2026-10-19T12:00:00Z") == NOW
+    assert parse_timestamp("2026-10-19T12:00:00") == NOW
+    assert parse_timestamp("hier") is None and parse_timestamp(None) is None
+
+
+def test_staleness():
+    assert product_age({"last_updated": "2026-10-18T12:00:00+00:00"}, NOW) == timedelta(days=1)
+    assert not is_stale({"last_updated": "2026-10-01T12:00:00+00:00"}, MAX_AGE, NOW)
+    assert is_stale({"last_updated": "2026-09-01T12:00:00+00:00"}, MAX_AGE, NOW)
+    # Never dated: always stale
+    assert is_stale({}, MAX_AGE, NOW)
+
+
+def test_refresh_order_weighs_popularity_and_age():
+    rows = [
+        {"barcode": "rare-ancien", "scan_count": 0, "last_updated": ago(days=60)},
+        {"barcode": "populaire-recent", "scan_count": 9, "last_updated": ago(days=10)},
+        {"barcode": "populaire-ancien", "scan_count": 9, "last_updated": ago(days=40)},
+        {"barcode": "jamais-date", "scan_count": 0},
+    ]
+    assert refresh_order(rows, MAX_AGE, 3) == ["populaire-ancien", "populaire-recent", "rare-ancien"]
+    assert refresh_order(rows, MAX_AGE, 10)[-1] == "jamais-date"
+    assert refresh_order([], MAX_AGE, 5) == []
+
+
+def test_next_run():
+    assert next_run(3, NOW) == datetime(2026, 10, 20, 3, tzinfo=timezone.utc)
+    assert next_run(18, NOW) == datetime(2026, 10, 19, 18, tzinfo=timezone.utc)
+    assert next_run(12, NOW) == datetime(2026, 10, 20, 12, tzinfo=timezone.utc)
@@ -0,0 +1,34 @@
+import pytest
+
+from app.foods.fuzzy import FuzzyVocabulary, edit_distance, max_typos
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("brocoli", "brocoli", 0),
+    ("brocolli", "brocoli", 1),     # insertion
+    ("epinard", "epinards", 1),     # deletion
+    ("beure", "beurre", 1),
+    ("saumno", "saumon", 1),        # adjacent transposition
+    ("poulet", "boulet", 1),        # substitution
+    ("fromage", "formage", 1),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 2) == distance
+
+
+def test_edit_distance_stops_past_bound():
+    assert edit_distance("avocat", "saumon", 2) == 3
+    assert edit_distance("pain", "painsdemie", 2) == 3
+    assert edit_distance("beurre", "beurre", 0) == 0
+    assert edit_distance("beure", "beurre", 0) == 1
+
+
+def test_max_typos():
+    assert [max_typos(word) for word in ("the", "pain", "saumon", "brocoli", "epinards")] == [0, 1, 1, 2, 2]
+
+
+def test_closest_respects_typo_allowance():
+    vocabulary = FuzzyVocabulary(["brocoli", "pain", "beurre", "paon"])
+    assert [word for word, _ in vocabulary.closest("brocolli", budget=1)] == ["brocoli"]
+    # Under 4 letters no typo is tolerated
+    assert vocabulary.closest("pin", budget=1) == []
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.foods.keto_catalogue import KETO_SEARCHES, KetoCatalogue, KetoCatalogueSnapshot
+from app.foods.text import fold_text
+
+PRODUCTS = [
+    {"barcode": "1", "keto_score": 8, "data_quality_score": 0.5, "categories": ["Fromages", "Produits laitiers"]},
+    {"barcode": "2", "keto_score": 10, "data_quality_score": 0.2, "categories": ["Huiles d'olive"]},
+    {"barcode": "3", "keto_score": 8, "data_quality_score": 0.9, "categories": ["fromages"]},
+]
+
+
+def test_fold_text():
+    assert fold_text("  Œufs   frais  ÉPINARDS ") == "oeufs frais epinards"
+    assert fold_text("Huile d'Olive\t") == "huile d'olive"
+
+
+def test_snapshot_orders_by_keto_score_then_quality():
+    snapshot = KetoCatalogueSnapshot(3, "2026-10-01T00:00:00+00:00", PRODUCTS)
+    assert [product["barcode"] for product in snapshot.products] == ["2", "3", "1"]
+    page, total = snapshot.page(1, 1)
+    assert [product["barcode"] for product in page] == ["3"] and total == 3
+
+
+def test_snapshot_category_pages():
+    snapshot = KetoCatalogueSnapshot(3, None, PRODUCTS)
+    page, total = snapshot.page(0, 10, category="FROMAGES")
+    assert [product["barcode"] for product in page] == ["3", "1"] and total == 2
+    assert snapshot.page(0, 10, category="inconnue") == ([], 0)
+    assert snapshot.categories()[0] == ("fromages", 2)
+
+
+class Repository:
+    def __init__(self):
+        self.saved = []
+
+    def save_catalogue_snapshot(self, name, products):
+        self.saved.append(products)
+        return {"version": len(self.saved), "built_at": datetime.now(timezone.utc).isoformat()}
+
+
+class OpenFoodFacts:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def search_products(self, term, limit, priority):
+        if self.fail or term == "beurre":
+            raise RuntimeError("OFF indisponible")
+        return [{"barcode": f"{term}-keto", "keto_score": 9}, {"barcode": f"{term}-sucre", "keto_score": 2},
+                {"barcode": "shared", "keto_score": 7}]
+
+
+def test_rebuild_keeps_keto_products_once():
+    catalogue = KetoCatalogue(Repository())
+    assert catalogue.is_stale(timedelta(hours=6))
+    snapshot = asyncio.run(catalogue.rebuild(OpenFoodFacts()))
+    barcodes = [product["barcode"] for product in snapshot.products]
+    assert len(barcodes) == len(KETO_SEARCHES)  # one per search but « beurre », plus « shared » once
+    assert "shared" in barcodes and "beurre-keto" not in barcodes
+    assert not any(barcode.endswith("-sucre") for barcode in barcodes)
+    assert snapshot.version == 1 and not catalogue.is_stale(timedelta(hours=6))
+
+
+def test_failed_rebuild_keeps_current_version():
+    catalogue = KetoCatalogue(Repository())
+    current = asyncio.run(catalogue.rebuild(OpenFoodFacts()))
+    assert asyncio.run(catalogue.rebuild(OpenFoodFacts(fail=True))) is current
+    assert catalogue.repository.saved and len(catalogue.repository.saved) == 1
@@ -0,0 +1,91 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from app.foods.keto_scoring import column, keto_scores
+from integrations.openfoodfacts import OpenFoodFactsAPI
+
+
+@pytest.fixture(scope="module")
+def api():
+    return OpenFoodFactsAPI()
+
+
+def scalar_scores(api, rows):
+    return [api._calculate_keto_score(*row) for row in rows]
+
+
+def batch_scores(rows):
+    calories, carbs, fat, fiber = (column(values) for values in zip(*rows))
+    scores, valid = keto_scores(calories, carbs, fat, fiber)
+    return [int(score) if ok else None for score, ok in zip(scores.tolist(), valid.tolist())]
+
+
+def test_threshold_edges_match_scalar_rules(api):
+    # 100 kcal: 1 g of net carbs is 4 %, 1 g of fat 9 % of the calories
+    rows = []
+    for carbs_percentage in (0, 2, 5, 8, 12, 15, 20, 30, 40, 50, 51):
+        for fat_percentage in (0, 29.7, 30.6, 39.6, 40.5, 49.5, 50.4, 59.4, 60.3, 69.3, 70.2, 79.2, 80.1):
+            rows.append((100.0, carbs_percentage / 4, fat_percentage / 9, 0.0))
+    # Exact fat minimums
+    rows += [(900.0, 0.0, fat, None) for fat in (30, 40, 50, 60, 70, 80)]
+    assert batch_scores(rows) == scalar_scores(api, rows)
+
+
+def test_missing_values_match_scalar_rules(api):
+    values = (None, 0.0, -5.0, 3.0, 60.0)
+    rows = list(itertools.product((None, 0.0, -10.0, 250.0), values, values, (None, 0.0, 4.0, 80.0)))
+    assert batch_scores(rows) == scalar_scores(api, rows)
+
+
+def test_nan_nutrients_are_unknown(api):
+    assert api._safe_float("nan") is None
+    assert api._safe_float(float("inf")) is None
+    rows = [
+        (math.nan, 5.0, 30.0, 1.0),
+        (500.0, math.nan, 30.0, 1.0),
+        (500.0, 5.0, math.nan, 1.0),
+        (500.0, 5.0, 30.0, math.nan),
+    ]
+    assert batch_scores(rows) == [None, None, 4, 7]
+
+
+def test_random_products_match_scalar_rules(api):
+    rng = np.random.default_rng(40)
+    rows = [
+        (float(calories), float(carbs), float(fat), float(fiber))
+        for calories, carbs, fat, fiber in zip(
+            rng.uniform(-50, 900, 2000), rng.uniform(0, 100, 2000),
+            rng.uniform(0, 100, 2000), rng.uniform(0, 30, 2000),
+        )
+    ]
+    assert batch_scores(rows) == scalar_scores(api, rows)
+
+
+def raw_product(code, nutriments, **fields):
+    return {"code": code, "product_name": "Produit", "nutriments": nutriments, **fields}
+
+
+def test_enrich_products_matches_enrich_product_data(api):
+    products = [
+        raw_product("3017620422003", {"energy-kcal_100g": 539, "carbohydrates_100g": 57.5,
+                                      "fat_100g": 30.9, "proteins_100g": 6.3, "fiber_100g": ""},
+                    brands="Ferrero, Nutella", categories="Pâtes à tartiner", image_url="x"),
+        raw_product("96385074", {"energy-kcal_100g": "717", "carbohydrates_100g": "0.06", "fat_100g": "81"}),
+        raw_product("0036000291452", {"energy-kcal_100g": "nan", "carbohydrates_100g": 3}),
+        raw_product("1", {"energy-kcal_100g": 100, "carbohydrates_100g": None, "fat_100g": 9}),
+        raw_product("2", {"energy-kcal_100g": 100, "carbohydrates_100g": 2, "fiber_100g": 5}),
+        raw_product("3", {}, allergens="en:milk", labels="Bio"),
+        raw_product("4", None),
+        raw_product("5", "malformed"),
+    ]
+    batch = api.enrich_products(products)
+    for product, enriched in zip(products, batch):
+        single = api._enrich_product_data(product)
+        if single is None:
+            assert enriched is None
+            continue
+        single.pop("last_updated"), enriched.pop("last_updated")
+        assert enriched == single
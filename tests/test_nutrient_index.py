@@ -0,0 +1,90 @@
+import pytest
+
+from app.foods import nutrient_index
+from app.foods.nutrient_index import NutrientIndex, parse_ranges
+
+
+def product(barcode, keto_score=None, quality=0.5, categories=(), **per_100g):
+    return {
+        "barcode": barcode,
+        "keto_score": keto_score,
+        "data_quality_score": quality,
+        "categories": list(categories),
+        **{f"{name}_per_100g": value for name, value in per_100g.items()},
+    }
+
+
+CATALOGUE = [
+    product("beurre", 9, categories=["en:Dairies"], fat=82, net_carbs=0.6, protein=0.7, calories=745),
+    product("fromage", 8, categories=["en:dairies", "en:cheeses"], fat=28, net_carbs=1, protein=25, calories=350),
+    product("pain", 1, categories=["en:breads"], fat=3, net_carbs=48, protein=9, calories=260),
+    product("avocat", 9, quality=0.9, categories=["en:fruits"], fat=15, net_carbs=2, protein=2, calories=160),
+    product("inconnu", categories=["en:fruits"]),
+]
+
+
+def test_parse_ranges():
+    assert parse_ranges({"fat_min": "10", "net_carbs_max": "5", "q": "x", "sort": "fat"}) == {
+        "fat": (10.0, float("inf")),
+        "net_carbs": (float("-inf"), 5.0),
+    }
+    for params in ({"salt_max": "1"}, {"fat_min": "beaucoup"}, {"fat_min": "nan"}, {"fat_min": "5", "fat_max": "1"}):
+        with pytest.raises(ValueError):
+            parse_ranges(params)
+
+
+def test_ranges_are_inclusive_and_combined():
+    index = NutrientIndex.build(CATALOGUE)
+    barcodes, total = index.query({"fat": (15, 82), "net_carbs": (0, 2)})
+    assert total == 3 and set(barcodes) == {"beurre", "fromage", "avocat"}
+    # Unknown values never match a range
+    assert "inconnu" not in index.query({"fat": (float("-inf"), float("inf"))})[0]
+    assert index.query({"net_carbs": (100, 200)}) == ([], 0)
+
+
+def test_categories_match_any_normalized_tag():
+    index = NutrientIndex.build(CATALOGUE)
+    assert sorted(index.query(categories=["Dairies"])[0]) == ["beurre", "fromage"]
+    assert sorted(index.query(categories=["fr:cheeses", "en:breads"])[0]) == ["fromage", "pain"]
+    assert index.query(categories=["en:inconnue"]) == ([], 0)
+
+
+def test_sort_order_ties_and_limit():
+    index = NutrientIndex.build(CATALOGUE)
+    # Ties on keto score are broken by data quality; unknown scores come last
+    assert index.query()[0] == ["avocat", "beurre", "fromage", "pain", "inconnu"]
+    assert index.query(sort="protein", descending=False)[0][:2] == ["beurre", "avocat"]
+    barcodes, total = index.query(sort="fat", limit=2)
+    assert barcodes == ["beurre", "fromage"] and total == 5
+    with pytest.raises(ValueError):
+        index.query(sort="prix")
+
+
+def test_reindexing_and_unsorted_additions():
+    index = NutrientIndex.build(CATALOGUE)
+    index.add(product("pain", 2, categories=["en:breads"], fat=20, net_carbs=1))
+    index.add(product("noix", 7, categories=["en:nuts"], fat=60, net_carbs=4))
+    assert len(index) == 6
+    barcodes, _ = index.query({"fat": (18, 70)})
+    assert set(barcodes) == {"fromage", "pain", "noix"}
+    index.remove("noix")
+    index.remove("absent")
+    assert "noix" not in index.query()[0] and len(index) == 5
+
+
+def test_compaction_after_many_removals(monkeypatch):
+    monkeypatch.setattr(nutrient_index, "MAX_DEAD", 4)
+    index = NutrientIndex.build(
+        product(f"p{i}", i % 10, categories=["en:odd" if i % 2 else "en:even"], fat=i) for i in range(40)
+    )
+    for i in range(30):
+        index.remove(f"p{i}")
+    # Dead documents were dropped along the way; at most MAX_DEAD remain
+    assert len(index.barcodes) - len(index) <= 4
+    assert len(index) == 10 and set(index.doc_ids) == {f"p{i}" for i in range(30, 40)}
+    barcodes, total = index.query({"fat": (34, 37)}, categories=["even"], sort="fat", descending=False)
+    assert (barcodes, total) == (["p34", "p36"], 2)
+    assert index.query(limit=100)[1] == 10
+    index.compact()
+    assert index.barcodes == [f"p{i}" for i in range(30, 40)]
+    assert index.query({"fat": (34, 37)}, categories=["even"], sort="fat", descending=False)[0] == ["p34", "p36"]
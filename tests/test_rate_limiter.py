@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from integrations.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_SCAN, RateLimited, RequestScheduler, TokenBucket,
+)
+
+
+def test_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    bucket.updated = 100.0
+    assert [bucket.take(100.0) for _ in range(4)] == [True, True, True, False]
+    assert bucket.delay(100.0) == pytest.approx(0.5)
+    assert bucket.delay(100.0, tokens=3) == pytest.approx(1.5)
+    assert bucket.take(100.5)
+    # Refill never exceeds the capacity
+    assert bucket.delay(200.0, tokens=3) == 0 and bucket.tokens == 3
+
+
+def test_bucket_pause_drains_and_delays():
+    bucket = TokenBucket(rate=1.0, capacity=5)
+    bucket.updated = 10.0
+    bucket.pause(10.0, 30)
+    assert bucket.delay(10.0) == pytest.approx(31.0)
+    assert not bucket.take(39.0)
+    assert bucket.delay(41.0) == pytest.approx(0.0)
+    # No tokens accrue during the pause
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_rejects_immediately_when_deadline_cannot_be_met():
+    async def scenario():
+        scheduler = RequestScheduler("test", rate_per_minute=60, burst=1)
+        await scheduler.acquire(PRIORITY_INTERACTIVE, timeout=0)
+        with pytest.raises(RateLimited) as error:
+            await scheduler.acquire(PRIORITY_INTERACTIVE, timeout=0.5)
+        return error.value.retry_after, len(scheduler)
+
+    retry_after, queued = run(scenario())
+    assert retry_after == pytest.approx(1.0, abs=0.05)
+    assert queued == 0
+
+
+def test_higher_priority_served_first():
+    async def scenario():
+        scheduler = RequestScheduler("test", rate_per_minute=600, burst=1)
+        await scheduler.acquire(PRIORITY_SCAN, timeout=0)
+        served = []
+
+        async def request(name, priority):
+            await scheduler.acquire(priority, timeout=2)
+            served.append(name)
+
+        await asyncio.gather(
+            request("fond", PRIORITY_BACKGROUND),
+            request("recherche", PRIORITY_INTERACTIVE),
+            request("scan", PRIORITY_SCAN),
+        )
+        return served
+
+    assert run(scenario()) == ["scan", "recherche", "fond"]
+
+
+def test_queued_request_expires_at_its_deadline():
+    async def scenario():
+        scheduler = RequestScheduler("test", rate_per_minute=60, burst=1)
+        await scheduler.acquire(PRIORITY_SCAN, timeout=0)
+        waiting = asyncio.create_task(scheduler.acquire(PRIORITY_INTERACTIVE, timeout=1.5))
+        await asyncio.sleep(0)
+        scheduler.pause(10)
+        with pytest.raises(RateLimited):
+            await waiting
+        return len(scheduler)
+
+    assert run(scenario()) == 0
+
+
+def test_full_queue_rejected():
+    async def scenario():
+        scheduler = RequestScheduler("test", rate_per_minute=60, burst=1, max_queue=1)
+        await scheduler.acquire(PRIORITY_SCAN, timeout=0)
+        first = asyncio.create_task(scheduler.acquire(PRIORITY_SCAN, timeout=5))
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimited):
+            await scheduler.acquire(PRIORITY_SCAN, timeout=5)
+        first.cancel()
+
+    run(scenario())
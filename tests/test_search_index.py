@@ -0,0 +1,103 @@
+import math
+import random
+
+from app.foods.dietary import parse_flags
+from app.foods.search_index import BM25_B, BM25_K1, FIELD_WEIGHTS, FoodSearchIndex
+from app.foods.text import analyze, stem
+
+PRODUCTS = [
+    {"barcode": "1", "product_name": "Amandes grillées", "brand": "Vahiné", "keto_score": 8},
+    {"barcode": "2", "product_name": "Poudre d'amande", "brand": "Alnatura", "keto_score": 9},
+    {"barcode": "3", "product_name": "Lait d'amande", "brand": "Bjorg", "keto_score": 4},
+    {"barcode": "4", "product_name": "Chocolat noir", "brand": "Amande & Co", "keto_score": 6},
+    {"barcode": "5", "product_name": "Beurre doux", "categories": ["Produits laitiers", "Beurres"], "keto_score": 10},
+]
+
+
+def barcodes(hits):
+    return [barcode for barcode, _ in hits]
+
+
+def test_stemming():
+    assert stem("amandes") == stem("amande")
+    assert stem("courgettes") == stem("courgette")
+    assert stem("chevaux") == "cheval"
+    assert analyze("Les amandes et le lait") == ["amand", "lait"]
+
+
+def test_name_outweighs_brand_and_keto_score_breaks_ties():
+    index = FoodSearchIndex.build(PRODUCTS)
+    # Same name match for 1, 2 and 3: keto score decides, the brand-only match comes last
+    assert barcodes(index.search("amandes")) == ["2", "1", "3", "4"]
+
+
+def test_every_word_required():
+    index = FoodSearchIndex.build(PRODUCTS)
+    assert barcodes(index.search("lait amande")) == ["3"]
+    assert index.search("lait chocolat") == []
+    assert set(barcodes(index.search("lait chocolat", match_all=False))) == {"3", "4"}
+    assert barcodes(index.search("beurres laitiers")) == ["5"]
+
+
+def test_reindex_and_remove():
+    index = FoodSearchIndex.build(PRODUCTS)
+    index.add({"barcode": "3", "product_name": "Lait de coco", "keto_score": 7})
+    assert barcodes(index.search("amande")) == ["2", "1", "4"]
+    assert barcodes(index.search("coco")) == ["3"]
+    index.remove("3")
+    assert index.search("coco") == [] and len(index) == 4
+
+
+def naive_bm25(products, query):
+    documents = {}
+    for product in products:
+        terms = {}
+        for field, weight in FIELD_WEIGHTS:
+            value = product.get(field)
+            value = " ".join(value) if isinstance(value, list) else value
+            for term in analyze(value or ""):
+                terms[term] = terms.get(term, 0) + weight
+        documents[product["barcode"]] = terms
+    average = sum(sum(terms.values()) for terms in documents.values()) / len(documents)
+    query_terms = list(dict.fromkeys(analyze(query)))
+    scores = {}
+    for barcode, terms in documents.items():
+        if not all(term in terms for term in query_terms):
+            continue
+        length, score = sum(terms.values()), 0.0
+        for term in query_terms:
+            df = sum(term in other for other in documents.values())
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            frequency = terms[term]
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average))
+        scores[barcode] = score
+    return scores
+
+
+def test_scores_match_reference_bm25():
+    rng = random.Random(37)
+    words = ["pain", "beurre", "amande", "chocolat", "noir", "lait", "coco", "miel", "bio", "sans"]
+    products = [
+        {"barcode": str(number), "product_name": " ".join(rng.choices(words, k=rng.randint(1, 4))),
+         "brand": rng.choice(words), "keto_score": rng.randint(1, 10)}
+        for number in range(300)
+    ]
+    index = FoodSearchIndex.build(products)
+    for query in ("pain", "beurre amande", "chocolat noir lait"):
+        expected = naive_bm25(products, query)
+        hits = index.search(query, limit=len(products))
+        assert {barcode for barcode, _ in hits} == set(expected)
+        for barcode, score in hits:
+            assert math.isclose(score, expected[barcode], rel_tol=1e-9)
+        scores = [round(score, 3) for _, score in hits]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_allergen_and_label_filters():
+    index = FoodSearchIndex.build([
+        {"barcode": "1", "product_name": "Pain sans gluten", "labels": ["en:no-gluten"], "allergens": ["en:eggs"]},
+        {"barcode": "2", "product_name": "Pain complet", "allergens": ["en:gluten"]},
+        {"barcode": "3", "product_name": "Pain de mie", "allergens": []},
+    ])
+    assert barcodes(index.search("pain", exclude=parse_flags("gluten"))) == ["1"]
+    assert barcodes(index.search("pain", include=parse_flags("sans-gluten"))) == ["1"]
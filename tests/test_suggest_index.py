@@ -0,0 +1,55 @@
+from app.foods.suggest_index import RecentFoods, SuggestIndex
+
+PRODUCTS = [
+    {"product_name": "Beurre demi-sel doux", "keto_score": 8},
+    {"product_name": "Beurre doux, bio", "keto_score": 9},
+    {"product_name": "Beurre de cacahuète", "keto_score": 5},
+    {"product_name": "Pain de mie", "keto_score": 2},
+]
+
+
+def texts(suggestions):
+    return [suggestion["text"] for suggestion in suggestions]
+
+
+def test_matches_uses_index_tokens():
+    assert SuggestIndex._matches("beurre demi-sel doux", ["demi"], "se")
+    assert SuggestIndex._matches("beurre doux, bio", ["doux"], "bi")
+    assert not SuggestIndex._matches("beurre doux, bio", ["demi"], "se")
+
+
+def test_prefix_suggestions_by_keto_score():
+    index = SuggestIndex.build(PRODUCTS)
+    assert texts(index.suggest("beu")) == ["Beurre doux, bio", "Beurre demi-sel doux", "Beurre de cacahuète"]
+    assert texts(index.suggest("cacahue")) == ["Beurre de cacahuète"]
+
+
+def test_multi_word_suggestions_across_punctuation():
+    index = SuggestIndex.build(PRODUCTS)
+    assert texts(index.suggest("demi se")) == ["Beurre demi-sel doux"]
+    assert texts(index.suggest("doux bi")) == ["Beurre doux, bio"]
+
+
+def test_recent_and_popular_names_first():
+    index = SuggestIndex.build(PRODUCTS)
+    index.record_use("Beurre de cacahuète")
+    suggestions = index.suggest("beurre d", recent=["Beurre demi-sel doux"])
+    assert texts(suggestions) == ["Beurre demi-sel doux", "Beurre de cacahuète", "Beurre doux, bio"]
+    assert suggestions[0]["source"] == "recent"
+    # Recent names with punctuation match multi-word queries too
+    assert texts(index.suggest("doux bi", recent=["Beurre doux, bio"]))[0] == "Beurre doux, bio"
+
+
+def test_rescored_name_moves_up():
+    index = SuggestIndex.build(PRODUCTS)
+    index.add({"product_name": "Beurre de cacahuète", "keto_score": 10})
+    assert texts(index.suggest("beu"))[0] == "Beurre de cacahuète"
+
+
+def test_recent_foods_deduplicates():
+    recent = RecentFoods()
+    recent.remember("user", "Pain")
+    assert recent.get("user") is None
+    recent.set("user", ["Pain de mie", "pain de mie", "Œufs"])
+    recent.remember("user", "Oeufs")
+    assert recent.get("user") == ["Oeufs", "Pain de mie"]
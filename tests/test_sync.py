@@ -0,0 +1,139 @@
+import base64
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.v1 import sync
+from app.api.v1.sync import decode_sync_token, encode_sync_token
+from app.auth.dependencies import get_authenticated_supabase_client, get_current_user
+from app.database.schemas import User
+
+MEAL_ID = "{:08x}-0000-0000-0000-000000000000"
+
+
+def raw_token(text):
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def test_token_round_trip():
+    token = encode_sync_token("2026-10-01T11:00:00+00:00", {"meals": MEAL_ID.format(3)})
+    since, after_ids = decode_sync_token(token)
+    assert since == datetime(2026, 10, 1, 11, tzinfo=timezone.utc)
+    assert after_ids == {"meals": MEAL_ID.format(3)}
+    assert decode_sync_token(encode_sync_token("2026-10-01T11:00:00Z"))[1] == {}
+
+
+def test_legacy_token_accepted():
+    since, after_ids = decode_sync_token(raw_token("v1:2026-10-01T10:30:00"))
+    assert since == datetime(2026, 10, 1, 10, 30, tzinfo=timezone.utc)
+    assert after_ids == {}
+
+
+@pytest.mark.parametrize("token", [
+    "%%%",
+    raw_token("v9:2026-10-01T10:30:00+00:00"),
+    raw_token("v2:yesterday"),
+    raw_token("v2:2026-10-01T11:00:00+00:00|users=1"),
+    raw_token('v2:2026-10-01T11:00:00+00:00|meals=x"),id.gt.(0'),
+])
+def test_invalid_tokens_rejected(token):
+    with pytest.raises(HTTPException) as error:
+        decode_sync_token(token)
+    assert error.value.status_code == 400
+
+
+class Table:
+    """The subset of the PostgREST query builder used by _fetch_changed"""
+
+    def __init__(self, rows):
+        self.rows, self.filters, self.orders, self.count = rows, [], [], None
+
+    def select(self, *columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def or_(self, expression):
+        column, since, after_id = re.fullmatch(
+            r'(\w+)\.gt\."([^"]+)",and\(\w+\.eq\."[^"]+",id\.gt\."([^"]+)"\)', expression
+        ).groups()
+        self.filters.append(lambda row: row[column] > since or (row[column] == since and row["id"] > after_id))
+        return self
+
+    def order(self, column):
+        self.orders.append(column)
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        rows = [row for row in self.rows if all(check(row) for check in self.filters)]
+        rows.sort(key=lambda row: tuple(row[column] for column in self.orders))
+        return type("Result", (), {"data": rows[:self.count]})
+
+
+class Client:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return Table(self.tables.setdefault(name, []))
+
+
+def meal(number, stamp):
+    return {"id": MEAL_ID.format(number), "user_id": "u1", "meal_type": "lunch", "food_name": "Omelette",
+            "quantity": 1, "unit": "g", "created_at": stamp, "updated_at": stamp}
+
+
+@pytest.fixture
+def client_and_tables():
+    tables = {"meals": [meal(1, "2026-10-01T10:00:00+00:00")]}
+    tables["meals"] += [meal(number, "2026-10-01T11:00:00+00:00") for number in range(2, 9)]
+    tables["meals"].append(meal(9, "2026-10-02T11:00:00+00:00"))
+    user = User(id="u1", email="a@b.fr", full_name="A", age=30, gender="male", height=170, weight=70,
+                activity_level="sedentary", goal="maintenance",
+                created_at="2026-01-01T00:00:00Z", updated_at="2026-01-01T00:00:00Z")
+    app = FastAPI()
+    app.include_router(sync.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_authenticated_supabase_client] = lambda: Client(tables)
+    return TestClient(app), tables
+
+
+def sync_all(client, token=None, limit=3):
+    seen = []
+    while True:
+        body = client.get("/api/sync", params={"limit": limit, **({"since": token} if token else {})}).json()
+        seen += [row["id"] for row in body["changes"]["meals"]]
+        token = body["next_token"]
+        if not body["has_more"]:
+            return seen, token, body
+
+
+def test_pages_through_rows_sharing_a_timestamp(client_and_tables):
+    client, _ = client_and_tables
+    seen, _, _ = sync_all(client)
+    assert seen == [MEAL_ID.format(number) for number in range(1, 10)]
+
+
+def test_late_commit_inside_safety_window_is_sent(client_and_tables):
+    client, tables = client_and_tables
+    _, token, _ = sync_all(client)
+    late = (datetime.now(timezone.utc) - timedelta(seconds=30)).isoformat()
+    tables["meals"].append(meal(10, late))
+    tables["deletion_log"] = [{"id": 1, "user_id": "u1", "table_name": "meals",
+                               "record_id": MEAL_ID.format(2), "deleted_at": late}]
+    seen, _, body = sync_all(client, token)
+    assert seen == [MEAL_ID.format(10)]
+    assert body["deleted"] == [{"table_name": "meals", "record_id": MEAL_ID.format(2), "deleted_at": late}]